@@ -1,16 +1,31 @@
 from flask import Flask, render_template, request
-from tensorflow.keras.models import load_model
 import numpy as np
 import os
 import base64
 import cv2
+import sys
+
+# Shared inference helpers live with the server AI modules
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'server', 'src', 'ai'))
+from inference import BatchingPredictor, backend_model_path, load_predictor
+from face_tracking import detect_faces
 
 # Initialize Flask app
 app = Flask(__name__)
 app.template_folder = '.'
 
-# Load the trained model
-model = load_model('basic_model.h5')
+# Inference backend: keras, tflite, tflite_int8 or onnx. The matching artifact next to
+# basic_model.h5 must exist (server/tools/convert-models.py writes .tflite and .onnx,
+# server/tools/quantize-model.py writes .int8.tflite); a missing one fails at startup
+MODEL_BACKEND = os.environ.get('EMOTION_MODEL_BACKEND', 'keras')
+
+# Load the trained model with the selected backend
+model = load_predictor(backend_model_path('basic_model.h5', MODEL_BACKEND), MODEL_BACKEND)
+
+# Batch predictions of concurrent requests, waiting up to this many ms (0 disables)
+INFERENCE_BATCH_WAIT_MS = float(os.environ.get('INFERENCE_BATCH_WAIT_MS', 0))
+if INFERENCE_BATCH_WAIT_MS:
+    model = BatchingPredictor(model, max_wait_ms=INFERENCE_BATCH_WAIT_MS)
 
 # Define class names
 class_names = ['angry', 'disgust', 'fear', 'happy', 'neutral', 'sad', 'surprise']
@@ -23,14 +38,17 @@ app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 # Initialize face cascade
 face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
 
+# Longest image side face detection runs on (0, the default, for full resolution)
+FACE_DETECTION_MAX_DIMENSION = int(os.environ.get('FACE_DETECTION_MAX_DIMENSION', 0))
+
 # Emotion detection function with face detection
 def detect_emotion(img_path):
     # Read the image
     img = cv2.imread(img_path)
     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
     
-    # Detect faces
-    faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5)
+    # Detect faces, on a downscaled copy if capped; boxes come back in full-resolution coordinates
+    faces = detect_faces(face_cascade, gray, FACE_DETECTION_MAX_DIMENSION, min_size=None)
     
     if len(faces) > 0:
         # Use the first detected face
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark the shared single-STFT audio feature engine against the previous
+per-feature librosa calls
+
+Usage: python benchmarks/bench-audio-features.py [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import librosa
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'ai'))
+from audio_features import extract_voice_features
+
+SAMPLE_RATE = 22050
+CLIP_DURATIONS = {'30s': 30, '10min': 600}
+
+
+def legacy_voice_features(y, sr):
+    """Previous implementation: every feature computes its own transform"""
+    mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
+    spectral_centroids = librosa.feature.spectral_centroid(y=y, sr=sr)
+    zcr = librosa.feature.zero_crossing_rate(y)
+    chroma = librosa.feature.chroma_stft(y=y, sr=sr)
+    features = np.concatenate([
+        np.mean(mfccs, axis=1),
+        [np.mean(spectral_centroids)],
+        [np.mean(zcr)],
+        np.mean(chroma, axis=1)
+    ])
+
+    pitches, magnitudes = librosa.piptrack(y=y, sr=sr)
+    pitch_values = []
+    for t in range(pitches.shape[1]):
+        index = magnitudes[:, t].argmax()
+        pitch = pitches[index, t]
+        if pitch > 0:
+            pitch_values.append(pitch)
+
+    return features, float(np.mean(pitch_values) if pitch_values else 0)
+
+
+def synthetic_speech(duration, sr=SAMPLE_RATE, seed=0):
+    """Generate a speech-like signal: a gliding voiced tone with noise bursts"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration * sr)) / sr
+    pitch = 180 + 40 * np.sin(2 * np.pi * 0.5 * t)
+    voiced = np.sin(2 * np.pi * np.cumsum(pitch) / sr)
+    envelope = (np.sin(2 * np.pi * 3 * t) > -0.3).astype(np.float32)
+    noise = 0.05 * rng.standard_normal(t.size)
+    return (0.5 * voiced * envelope + noise).astype(np.float32)
+
+
+def time_call(func, repeat):
+    """Return the best wall-clock time of ``repeat`` calls"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per clip (best is reported)')
+    args = parser.parse_args()
+
+    print(f"{'clip':>6} {'legacy (s)':>11} {'shared (s)':>11} {'speedup':>8}")
+    for name, duration in CLIP_DURATIONS.items():
+        y = synthetic_speech(duration)
+
+        legacy_features, legacy_pitch = legacy_voice_features(y, SAMPLE_RATE)
+        shared_features, characteristics = extract_voice_features(y, SAMPLE_RATE)
+        assert np.allclose(legacy_features, shared_features)
+        assert np.isclose(legacy_pitch, characteristics['average_pitch'])
+
+        legacy = time_call(lambda: legacy_voice_features(y, SAMPLE_RATE), args.repeat)
+        shared = time_call(lambda: extract_voice_features(y, SAMPLE_RATE), args.repeat)
+        print(f"{name:>6} {legacy:>11.3f} {shared:>11.3f} {legacy / shared:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
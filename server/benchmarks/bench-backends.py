@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Compare the keras, tflite and onnx inference backends on the facial CNN
+
+The notebook CNN (random weights) is saved as .h5 and exported with
+tools/convert-models.py. Each backend then runs in a fresh interpreter so
+load time and peak RSS include the runtime it imports.
+
+Usage: python benchmarks/bench-backends.py [--calls N]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+AI_DIR = os.path.join(BENCH_DIR, '..', 'src', 'ai')
+CONVERT_SCRIPT = os.path.join(BENCH_DIR, '..', 'tools', 'convert-models.py')
+
+BUILD_TEMPLATE = '''
+import importlib.util
+spec = importlib.util.spec_from_file_location('bench_inference', {bench_path!r})
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+module.build_facial_cnn().save({model_path!r})
+'''
+
+SCENARIO_TEMPLATE = '''
+import json, resource, sys, time
+import numpy as np
+sys.path.append({ai_dir!r})
+start = time.perf_counter()
+from inference import load_predictor
+predictor = load_predictor({model_path!r}, {backend!r})
+load_seconds = time.perf_counter() - start
+sample = np.random.rand(1, 48, 48, 1).astype(np.float32)
+predictor.predict(sample)
+timings = []
+for _ in range({calls}):
+    call_start = time.perf_counter()
+    predictor.predict(sample)
+    timings.append((time.perf_counter() - call_start) * 1000)
+print(json.dumps({{
+    'load_seconds': load_seconds,
+    'p50_ms': float(np.percentile(timings, 50)),
+    'p95_ms': float(np.percentile(timings, 95)),
+    'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+}}))
+'''
+
+
+def run_backend(model_path, backend, calls):
+    """Benchmark one backend in a fresh interpreter"""
+    script = SCENARIO_TEMPLATE.format(ai_dir=AI_DIR, model_path=model_path, backend=backend, calls=calls)
+    output = subprocess.run(
+        [sys.executable, '-c', script], capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--calls', type=int, default=200, help='timed calls per backend')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        h5_path = os.path.join(directory, 'facial_emotion_model.h5')
+        subprocess.run([sys.executable, '-c', BUILD_TEMPLATE.format(
+            bench_path=os.path.join(BENCH_DIR, 'bench-inference.py'), model_path=h5_path
+        )], capture_output=True, check=True)
+        subprocess.run([sys.executable, CONVERT_SCRIPT, h5_path], capture_output=True, check=True)
+
+        print(f"{'backend':>8} {'file (MB)':>10} {'load (s)':>9} {'p50 (ms)':>9} {'p95 (ms)':>9} {'peak RSS (MB)':>14}")
+        for backend, extension in [('keras', '.h5'), ('tflite', '.tflite'), ('onnx', '.onnx')]:
+            model_path = os.path.splitext(h5_path)[0] + extension
+            result = run_backend(model_path, backend, args.calls)
+            size_mb = os.path.getsize(model_path) / 1e6
+            print(f"{backend:>8} {size_mb:>10.1f} {result['load_seconds']:>9.2f} {result['p50_ms']:>9.2f} "
+                  f"{result['p95_ms']:>9.2f} {result['peak_rss_mb']:>14.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Throughput and tail latency of direct versus micro-batched inference
+
+Closed-loop synthetic load on the notebook facial CNN: every client scores
+one face, waits for the answer and immediately sends the next, for a fixed
+duration. "direct" clients call CompiledPredictor.predict from their own
+thread; "batched" clients share one BatchingPredictor. The asyncio rows run
+the clients as coroutines on one event loop.
+
+Usage: python benchmarks/bench-batching.py [--clients N ...] [--seconds S] [--max-wait-ms MS]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+from bench_common import AI_DIR, BENCH_DIR, load_module
+
+sys.path.append(AI_DIR)
+from inference import BatchingPredictor, CompiledPredictor
+
+
+def load_model_builders():
+    """Reuse the model definitions of bench-inference.py"""
+    return load_module('bench_inference', os.path.join(BENCH_DIR, 'bench-inference.py'))
+
+
+def thread_load(predict, clients, seconds):
+    """Run closed-loop clients on threads and return all request latencies"""
+    sample = np.random.rand(1, 48, 48, 1).astype(np.float32)
+    latencies = [[] for _ in range(clients)]
+    deadline = time.perf_counter() + seconds
+
+    def client(index):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            predict(sample)
+            latencies[index].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [latency for client_latencies in latencies for latency in client_latencies]
+
+
+def asyncio_load(apredict, clients, seconds):
+    """Run closed-loop clients as coroutines and return all request latencies"""
+    sample = np.random.rand(1, 48, 48, 1).astype(np.float32)
+    latencies = []
+
+    async def client(deadline):
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await apredict(sample)
+            latencies.append(time.perf_counter() - start)
+
+    async def run():
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(*(client(deadline) for _ in range(clients)))
+
+    asyncio.run(run())
+    return latencies
+
+
+def report(mode, clients, latencies, seconds, batcher=None):
+    """Print throughput, latency percentiles and mean batch size"""
+    latencies_ms = np.array(latencies) * 1000
+    mean_batch = batcher.samples / batcher.batches if batcher and batcher.batches else 1.0
+    print(f"{mode:>14} {clients:>8} {len(latencies) / seconds:>10.0f} {np.percentile(latencies_ms, 50):>8.1f} "
+          f"{np.percentile(latencies_ms, 99):>8.1f} {mean_batch:>11.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', nargs='+', type=int, default=[1, 4, 16, 64])
+    parser.add_argument('--seconds', type=float, default=5.0, help='load duration per row')
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    parser.add_argument('--max-batch-size', type=int, default=32)
+    args = parser.parse_args()
+
+    compiled = CompiledPredictor(load_model_builders().build_facial_cnn())
+
+    print(f"{'mode':>14} {'clients':>8} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'mean batch':>11}")
+    for clients in args.clients:
+        report('direct', clients, thread_load(compiled.predict, clients, args.seconds), args.seconds)
+
+        batcher = BatchingPredictor(compiled, args.max_batch_size, args.max_wait_ms)
+        report('batched', clients, thread_load(batcher.predict, clients, args.seconds), args.seconds, batcher)
+        batcher.close()
+
+        async def executor_predict(sample):
+            return await asyncio.get_running_loop().run_in_executor(None, compiled.predict, sample)
+
+        report('asyncio direct', clients, asyncio_load(executor_predict, clients, args.seconds), args.seconds)
+
+        batcher = BatchingPredictor(compiled, args.max_batch_size, args.max_wait_ms)
+        report('asyncio batch', clients, asyncio_load(batcher.apredict, clients, args.seconds), args.seconds, batcher)
+        batcher.close()
+
+
+if __name__ == '__main__':
+    main()
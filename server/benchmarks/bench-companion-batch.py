@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Throughput of AISpaceCompanion.process_messages against calling
+process_message once per message
+
+Two seeded corpora are replayed round-robin across the crew: short crew
+messages like the ones in the companion's own demo, and the longer
+synthetic messages of bench-companion-keywords.py (5 to 120 words). Each
+timing starts from a fresh companion and the best of --repeat runs is
+reported. Before timing, the batch results are checked against the
+per-message loop: identical except for the randomly chosen template
+sentence and the timestamps.
+
+process_messages analyzes each distinct message text once and shares the
+response plan per primary emotion and urgency, so it gains most on
+repetitive input; on all-distinct messages keyword matching per message
+still dominates.
+
+Usage: python benchmarks/bench-companion-batch.py [--messages N] [--crew N] [--repeat N]
+"""
+
+import argparse
+import os
+import random
+import time
+
+from bench_common import BENCH_DIR, COMPANION_PATH, load_module
+
+SHORT_MESSAGES = [
+    "I'm feeling really stressed about the mission",
+    "I miss my family and feel so alone up here",
+    "I can't sleep and I'm exhausted",
+    "I'm worried about the docking procedure tomorrow",
+    "I'm feeling great today! The experiments are going well",
+    "Finished the water recycler maintenance, all nominal",
+]
+
+
+def short_corpus(count, seed=0):
+    rng = random.Random(seed)
+    return [f"{rng.choice(SHORT_MESSAGES)} (day {rng.randint(1, 180)})" for _ in range(count)]
+
+
+def build_batch(messages, crew):
+    return [(f'crew-{i % crew}', message, None) for i, message in enumerate(messages)]
+
+
+def strip_template(companion, response):
+    """Response without its randomly chosen template sentence"""
+    for templates in companion.support_templates.values():
+        for template in templates:
+            if response.startswith(template):
+                return response[len(template):]
+    return response
+
+
+def check_equivalent(module, batch):
+    loop_companion = module.AISpaceCompanion()
+    batch_companion = module.AISpaceCompanion()
+    expected = [loop_companion.process_message(message, crew_member_id, context)
+                for crew_member_id, message, context in batch]
+    results = batch_companion.process_messages(batch)
+
+    for one, batched in zip(expected, results):
+        assert strip_template(loop_companion, one.pop('response')) == \
+            strip_template(batch_companion, batched.pop('response'))
+        one.pop('timestamp')
+        batched.pop('timestamp')
+        assert one == batched
+    for crew_member_id, context in loop_companion.crew_context.items():
+        assert {**context, 'last_interaction': None} == \
+            {**batch_companion.crew_context[crew_member_id], 'last_interaction': None}
+        assert ([c['emotional_analysis'] for c in loop_companion.conversation_history[crew_member_id]] ==
+                [c['emotional_analysis'] for c in batch_companion.conversation_history[crew_member_id]])
+
+
+def best_time(run, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=20000, help='messages per corpus')
+    parser.add_argument('--crew', type=int, default=6, help='crew members the messages are spread over')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs (best is reported)')
+    args = parser.parse_args()
+
+    module = load_module('ai_companion', COMPANION_PATH)
+    keywords = load_module('bench_companion_keywords', os.path.join(BENCH_DIR, 'bench-companion-keywords.py'))
+
+    corpora = {
+        'short': short_corpus(args.messages),
+        'synthetic': keywords.build_corpus(module, args.messages),
+    }
+
+    print(f"{'corpus':>10} {'loop (us/msg)':>14} {'batch (us/msg)':>15} {'batch msgs/s':>13} {'speedup':>8}")
+    for name, messages in corpora.items():
+        batch = build_batch(messages, args.crew)
+        check_equivalent(module, batch[:2000])
+
+        def loop():
+            companion = module.AISpaceCompanion()
+            for crew_member_id, message, context in batch:
+                companion.process_message(message, crew_member_id, context)
+
+        def batched():
+            module.AISpaceCompanion().process_messages(batch)
+
+        loop_time = best_time(loop, args.repeat) / len(batch)
+        batch_time = best_time(batched, args.repeat) / len(batch)
+        print(f"{name:>10} {loop_time * 1e6:>14.2f} {batch_time * 1e6:>15.2f} "
+              f"{1 / batch_time:>13.0f} {loop_time / batch_time:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Stress test of one AISpaceCompanion shared by many threads: consistency
+checks and messages/sec for per-crew locking against one global lock
+
+Every thread sends the same number of messages round-robin across a shared
+crew, so threads constantly contend for the same crew members. After each
+run the companion must hold exactly the messages sent: conversation_count
+per crew member, the retained history length, each thread's messages in
+the order it sent them, and at most 10 recent emotions. The "global lock"
+column serializes whole process_message calls, the alternative per-crew
+locking replaces. The last line drives the same load through
+aprocess_message from concurrent asyncio tasks.
+
+CPython runs Python bytecode on one core at a time, so threads only gain
+where process_message releases the GIL; the point of the comparison is
+that per-crew locking adds no serialization of its own.
+
+Usage: python benchmarks/bench-companion-concurrency.py [--threads N ...] [--messages N] [--crew N]
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+from collections import Counter
+
+from bench_common import COMPANION_PATH, load_module
+
+MESSAGES = [
+    "I'm worried about the docking tomorrow",
+    "Feeling tired after the long EVA",
+    "All systems nominal, happy with today's experiments",
+    "I feel lonely up here some days",
+]
+
+
+def send(process, worker, messages, crew):
+    """One worker's messages, tagged so their order can be checked"""
+    for i in range(messages):
+        process(f"{MESSAGES[i % len(MESSAGES)]} [{worker}:{i}]", f'crew-{i % crew}')
+
+
+def check_consistency(module, companion, workers, messages, crew):
+    """Problems found in the companion's state after a run (empty if consistent)"""
+    sent = Counter(f'crew-{i % crew}' for i in range(messages))
+    problems = []
+    for crew_member_id in sent:
+        expected = sent[crew_member_id] * workers
+        context = companion.crew_context.get(crew_member_id, {})
+        if context.get('conversation_count') != expected:
+            problems.append(f"{crew_member_id}: count {context.get('conversation_count')} != {expected}")
+        if len(context.get('recent_emotions', [])) > 10:
+            problems.append(f"{crew_member_id}: {len(context['recent_emotions'])} recent emotions")
+
+        history = companion.get_conversation_history(crew_member_id)
+        if len(history) != min(expected, module.MAX_CONVERSATIONS_PER_CREW):
+            problems.append(f"{crew_member_id}: history length {len(history)}")
+        last_seen = {}
+        for conversation in history:
+            worker, index = conversation['user_message'].rsplit('[', 1)[1].rstrip(']').split(':')
+            if int(index) <= last_seen.get(worker, -1):
+                problems.append(f"{crew_member_id}: worker {worker} out of order")
+            last_seen[worker] = int(index)
+    return problems
+
+
+def run_threads(module, threads, messages, crew, global_lock):
+    """Messages per second for ``threads`` workers sharing one companion"""
+    companion = module.AISpaceCompanion()
+    process = companion.process_message
+    if global_lock:
+        lock = threading.Lock()
+
+        def process(message, crew_member_id, _process=companion.process_message):
+            with lock:
+                return _process(message, crew_member_id)
+
+    workers = [threading.Thread(target=send, args=(process, worker, messages, crew)) for worker in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    problems = check_consistency(module, companion, threads, messages, crew)
+    if problems:
+        raise AssertionError('; '.join(problems[:5]))
+    return threads * messages / elapsed
+
+
+def run_async(module, tasks, messages, crew):
+    """Messages per second for ``tasks`` asyncio tasks awaiting aprocess_message"""
+    companion = module.AISpaceCompanion()
+
+    async def task(worker):
+        for i in range(messages):
+            await companion.aprocess_message(f"{MESSAGES[i % len(MESSAGES)]} [{worker}:{i}]", f'crew-{i % crew}')
+
+    async def main():
+        await asyncio.gather(*(task(worker) for worker in range(tasks)))
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    elapsed = time.perf_counter() - start
+
+    problems = check_consistency(module, companion, tasks, messages, crew)
+    if problems:
+        raise AssertionError('; '.join(problems[:5]))
+    return tasks * messages / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', nargs='+', type=int, default=[1, 2, 4, 8, 16])
+    parser.add_argument('--messages', type=int, default=2000, help='messages per thread')
+    parser.add_argument('--crew', type=int, default=6, help='crew members shared by all threads')
+    args = parser.parse_args()
+
+    module = load_module('ai_companion', COMPANION_PATH)
+
+    print(f"{'threads':>7} {'per-crew msgs/s':>16} {'global lock msgs/s':>19}")
+    for threads in args.threads:
+        per_crew = run_threads(module, threads, args.messages, args.crew, global_lock=False)
+        global_lock = run_threads(module, threads, args.messages, args.crew, global_lock=True)
+        print(f"{threads:>7} {per_crew:>16.0f} {global_lock:>19.0f}")
+
+    tasks = max(args.threads)
+    throughput = run_async(module, tasks, args.messages // 4, args.crew)
+    print(f"aprocess_message, {tasks} tasks: {throughput:.0f} msgs/s; all runs consistent")
+
+
+if __name__ == '__main__':
+    main()
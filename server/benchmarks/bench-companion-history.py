@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Cost of storing companion conversations: per-crew bounded deques against
+the previous single list filtered and rebuilt on every message
+
+For each history size the store is filled to that many conversations (100
+per crew member, the retention cap), then further conversations are stored
+round-robin across the crew and timed. The legacy store is filled directly,
+since filling it through its own O(n) appends would take hours at 10^5.
+The last column times full process_message calls against the new store.
+
+Usage: python benchmarks/bench-companion-history.py [--sizes N ...] [--appends N]
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+from bench_common import COMPANION_PATH, load_module
+
+PER_CREW = 100
+ANALYSIS = {'primary_emotion': 'neutral', 'emotion_scores': {}, 'urgency': False}
+
+
+class LegacyHistory:
+    """Previous implementation: one global list, filtered and trimmed per message"""
+
+    def __init__(self):
+        self.conversation_history = []
+
+    def store(self, crew_member_id, message, response, emotional_analysis):
+        conversation = {
+            'crew_member_id': crew_member_id,
+            'timestamp': datetime.now().isoformat(),
+            'user_message': message,
+            'ai_response': response,
+            'emotional_analysis': emotional_analysis,
+            'conversation_id': f"{crew_member_id}_{datetime.now().timestamp()}"
+        }
+
+        self.conversation_history.append(conversation)
+
+        crew_conversations = [c for c in self.conversation_history if c['crew_member_id'] == crew_member_id]
+        if len(crew_conversations) > 100:
+            self.conversation_history = [c for c in self.conversation_history if c not in crew_conversations[:-100]]
+
+
+def fill_legacy(size):
+    """Legacy store holding ``size`` conversations, PER_CREW per crew member"""
+    history = LegacyHistory()
+    timestamp = datetime.now()
+    history.conversation_history = [
+        {
+            'crew_member_id': f'crew-{i % (size // PER_CREW)}',
+            'timestamp': timestamp.isoformat(),
+            'user_message': f'message {i}',
+            'ai_response': 'response',
+            'emotional_analysis': ANALYSIS,
+            'conversation_id': f'crew-{i % (size // PER_CREW)}_{i}'
+        }
+        for i in range(size)
+    ]
+    return history
+
+
+def time_appends(store, crew_count, appends):
+    """Mean seconds per stored conversation"""
+    start = time.perf_counter()
+    for i in range(appends):
+        store(f'crew-{i % crew_count}', f'message {i}', 'response', ANALYSIS)
+    return (time.perf_counter() - start) / appends
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 100000],
+                        help='stored conversations (multiples of 100)')
+    parser.add_argument('--appends', type=int, default=200, help='timed stores per size')
+    args = parser.parse_args()
+
+    module = load_module('ai_companion', COMPANION_PATH)
+
+    print(f"{'stored':>8} {'legacy (us)':>12} {'deque (us)':>11} {'speedup':>9} {'process_message (us)':>21}")
+    for size in args.sizes:
+        crew_count = size // PER_CREW
+
+        legacy = fill_legacy(size)
+        legacy_time = time_appends(legacy.store, crew_count, args.appends)
+
+        companion = module.AISpaceCompanion()
+        for i in range(size):
+            companion._store_conversation(f'crew-{i % crew_count}', f'message {i}', 'response', ANALYSIS)
+        assert sum(len(history) for history in companion.conversation_history.values()) == size
+        deque_time = time_appends(companion._store_conversation, crew_count, args.appends)
+
+        start = time.perf_counter()
+        for i in range(args.appends):
+            companion.process_message("I'm worried about the docking tomorrow", f'crew-{i % crew_count}')
+        message_time = (time.perf_counter() - start) / args.appends
+
+        print(f"{size:>8} {legacy_time * 1e6:>12.1f} {deque_time * 1e6:>11.2f} "
+              f"{legacy_time / deque_time:>8.0f}x {message_time * 1e6:>21.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Throughput of the companion's message keyword analysis: the compiled
+whole-word matcher against the previous per-keyword substring scans
+
+A seeded corpus of synthetic crew messages (mission chatter with emotion
+and urgency keywords mixed in, some of them inside longer words such as
+"download" or "hardware") is analysed with both implementations. The
+"differing" column counts messages whose emotions or urgency changed, i.e.
+the substring false hits the matcher no longer reports.
+
+Usage: python benchmarks/bench-companion-keywords.py [--messages N] [--repeat N]
+"""
+
+import argparse
+import random
+import time
+
+from bench_common import COMPANION_PATH, load_module
+
+FILLER = ('the crew finished the docking checklist and logged the orbit data before the next '
+          'experiment while the panel readings from the module stayed nominal today').split()
+# Words that contain a keyword without being one
+LOOKALIKES = ['download', 'hardware', 'made', 'bluetooth', 'contents', 'helpful', 'alarms', 'sadly']
+
+
+def legacy_analyze(message):
+    """Previous implementation: rebuilds the tables and scans once per keyword"""
+    message_lower = message.lower()
+
+    emotion_indicators = {
+        'stress': ['stressed', 'overwhelmed', 'pressure', 'difficult', 'hard', 'struggling'],
+        'anxiety': ['worried', 'anxious', 'nervous', 'scared', 'afraid', 'concerned'],
+        'sadness': ['sad', 'depressed', 'down', 'blue', 'miserable', 'hopeless'],
+        'anger': ['angry', 'mad', 'frustrated', 'irritated', 'annoyed', 'furious'],
+        'loneliness': ['alone', 'lonely', 'isolated', 'disconnected', 'separated'],
+        'fatigue': ['tired', 'exhausted', 'drained', 'fatigued', 'weary'],
+        'happiness': ['happy', 'joyful', 'excited', 'pleased', 'content', 'satisfied'],
+        'fear': ['fear', 'terrified', 'panic', 'alarm', 'dread']
+    }
+
+    detected_emotions = {}
+    for emotion, keywords in emotion_indicators.items():
+        score = sum(1 for keyword in keywords if keyword in message_lower)
+        if score > 0:
+            detected_emotions[emotion] = min(score / len(keywords), 1.0)
+
+    primary_emotion = max(detected_emotions, key=detected_emotions.get) if detected_emotions else 'neutral'
+
+    urgent_keywords = ['help', 'emergency', 'crisis', 'can\'t', 'unable', 'desperate']
+    is_urgent = any(keyword in message_lower for keyword in urgent_keywords)
+
+    return {
+        'primary_emotion': primary_emotion,
+        'emotion_scores': detected_emotions,
+        'urgency': is_urgent,
+        'message_length': len(message),
+        'complexity': len(message.split())
+    }
+
+
+def build_corpus(module, count, seed=0):
+    """Seeded synthetic messages of 5 to 120 words"""
+    rng = random.Random(seed)
+    keywords = [keyword for keywords in module.EMOTION_INDICATORS.values() for keyword in keywords]
+    keywords += module.URGENT_KEYWORDS
+    corpus = []
+    for _ in range(count):
+        words = []
+        for _ in range(rng.randint(5, 120)):
+            roll = rng.random()
+            if roll < 0.03:
+                word = rng.choice(keywords)
+            elif roll < 0.05:
+                word = rng.choice(LOOKALIKES)
+            else:
+                word = rng.choice(FILLER)
+            words.append(word.capitalize() if rng.random() < 0.1 else word)
+        corpus.append(' '.join(words) + rng.choice(['.', '!', '?']))
+    return corpus
+
+
+def best_time(func, corpus, repeat):
+    """Best wall-clock time of analysing the whole corpus ``repeat`` times"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for message in corpus:
+            func(message)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=100000, help='corpus size')
+    parser.add_argument('--repeat', type=int, default=3, help='timed passes (best is reported)')
+    args = parser.parse_args()
+
+    module = load_module('ai_companion', COMPANION_PATH)
+    companion = module.AISpaceCompanion()
+
+    corpus = build_corpus(module, args.messages)
+    megabytes = sum(len(message) for message in corpus) / 1e6
+
+    compiled_analyze = companion._analyze_message_emotion
+    differing = sum(legacy_analyze(message) != compiled_analyze(message) for message in corpus)
+
+    print(f"{len(corpus)} messages, {megabytes:.1f} MB; {differing} analyses differ (substring false hits)")
+    print(f"{'matcher':>10} {'time (s)':>9} {'msgs/s':>10} {'MB/s':>7}")
+    for name, func in (('legacy', legacy_analyze), ('compiled', compiled_analyze)):
+        elapsed = best_time(func, corpus, args.repeat)
+        print(f"{name:>10} {elapsed:>9.3f} {len(corpus) / elapsed:>10.0f} {megabytes / elapsed:>7.2f}")
+
+
+if __name__ == '__main__':
+    main()
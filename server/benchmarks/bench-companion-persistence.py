@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Cost of persisting companion conversations: write-behind batches against a
+synchronous SQLite write per message, and the cost of lazy rehydration
+
+Each mode sends the same messages round-robin across the crew. "memory" has
+no store; "sync" flushes the store after every message, which is what an
+inline INSERT and COMMIT per message would cost; "write-behind" only queues
+and lets the background thread batch, and its time includes the final
+flush. Rehydration is then timed as the first access to each crew member
+from a fresh companion on the written database.
+
+Usage: python benchmarks/bench-companion-persistence.py [--messages N] [--crew N]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from bench_common import AI_DIR, COMPANION_PATH, load_module
+
+sys.path.append(AI_DIR)
+from conversation_store import ConversationStore
+
+MESSAGES = [
+    "I'm worried about the docking tomorrow",
+    "Feeling tired after the long EVA",
+    "All systems nominal, happy with today's experiments",
+    "I feel lonely up here some days",
+]
+
+
+def time_messages(module, store, messages, crew, sync):
+    """Mean seconds per process_message, including the final flush"""
+    companion = module.AISpaceCompanion(conversation_store=store)
+    start = time.perf_counter()
+    for i in range(messages):
+        companion.process_message(MESSAGES[i % len(MESSAGES)], i % crew)
+        if sync:
+            store.flush()
+    if store is not None:
+        store.flush()
+    return (time.perf_counter() - start) / messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=2000, help='messages per mode')
+    parser.add_argument('--crew', type=int, default=20, help='crew members the messages are spread over')
+    args = parser.parse_args()
+
+    module = load_module('ai_companion', COMPANION_PATH)
+    temp_dir = tempfile.mkdtemp()
+    try:
+        print(f"{'mode':>13} {'per message (us)':>17} {'msgs/s':>9} {'batches':>8}")
+        for mode in ('memory', 'sync', 'write-behind'):
+            store = None
+            if mode != 'memory':
+                store = ConversationStore(os.path.join(temp_dir, f'{mode}.db'))
+            elapsed = time_messages(module, store, args.messages, args.crew, mode == 'sync')
+            batches = '-'
+            if store is not None:
+                store.close()
+                assert store.conversations_written == args.messages
+                batches = store.batches_written
+            print(f"{mode:>13} {elapsed * 1e6:>17.1f} {1 / elapsed:>9.0f} {batches:>8}")
+
+        store = ConversationStore(os.path.join(temp_dir, 'write-behind.db'))
+        companion = module.AISpaceCompanion(conversation_store=store)
+        start = time.perf_counter()
+        for crew_member_id in range(args.crew):
+            companion.get_crew_psychological_summary(crew_member_id)
+        elapsed = (time.perf_counter() - start) / args.crew
+        store.close()
+        restored = sum(len(history) for history in companion.conversation_history.values())
+        print(f"rehydration: {elapsed * 1e3:.2f} ms per crew member ({restored} conversations restored)")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Measure face detection latency and agreement across image sizes and resolution caps
+
+Two scenes are built from the repo photos in src/assets and resized to
+common upload sizes:
+  portrait  4:3 crops around each face of 80 px or more, with the face
+            about a quarter of the frame wide (webcam and selfie framing)
+  group     the full photos, with several small faces
+
+Boxes found at full resolution are the reference. For each cap the benchmark
+reports the detection time and the fraction of reference faces found again
+(IoU >= 0.5 after mapping back), overall and for large faces at least 10% of
+the image width, plus any extra boxes.
+
+Usage: python benchmarks/bench-face-detection.py [--caps N ...]
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+import cv2
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'ai'))
+from face_tracking import box_iou, detect_faces
+
+ASSETS_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'assets')
+
+# Output widths: 1080p, 8 MP and 12 MP uploads
+TARGET_WIDTHS = {'2MP': 1920, '8MP': 3840, '12MP': 4608}
+
+
+def build_scenes(cascade):
+    """Return {'portrait': [...], 'group': [...]} grayscale source images"""
+    scenes = {'portrait': [], 'group': []}
+    for path in sorted(glob.glob(os.path.join(ASSETS_DIR, '*.jpg'))):
+        gray = cv2.cvtColor(cv2.imread(path), cv2.COLOR_BGR2GRAY)
+        faces = detect_faces(cascade, gray, None)
+        if len(faces) == 0:
+            continue
+        scenes['group'].append(gray)
+        for x, y, w, h in faces:
+            if w < 80:
+                continue
+            cx, cy = x + w // 2, y + h // 2
+            x0, y0 = max(cx - 2 * w, 0), max(cy - int(1.5 * w), 0)
+            scenes['portrait'].append(gray[y0:y0 + 3 * w, x0:x0 + 4 * w])
+    return scenes
+
+
+def timed_detection(cascade, gray, max_dimension):
+    """Return (boxes, milliseconds) for one detection pass"""
+    start = time.perf_counter()
+    faces = detect_faces(cascade, gray, max_dimension)
+    return [tuple(face) for face in faces], (time.perf_counter() - start) * 1000
+
+
+def match_faces(reference, found):
+    """Count reference boxes recovered with IoU >= 0.5"""
+    remaining = list(found)
+    matched = 0
+    for box in reference:
+        best = max(remaining, key=lambda other: box_iou(box, other), default=None)
+        if best is not None and box_iou(box, best) >= 0.5:
+            matched += 1
+            remaining.remove(best)
+    return matched, len(remaining)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--caps', nargs='+', type=int, default=[1280, 960, 640])
+    args = parser.parse_args()
+
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    scenes = build_scenes(cascade)
+
+    print(f"{'scene':>8} {'size':>5} {'cap':>5} {'ms/image':>9} {'speedup':>8} {'recall':>7} "
+          f"{'large':>6} {'extra':>6}")
+    for scene, sources in scenes.items():
+        for size_name, width in TARGET_WIDTHS.items():
+            images = [cv2.resize(gray, (width, int(gray.shape[0] * width / gray.shape[1])),
+                                 interpolation=cv2.INTER_CUBIC) for gray in sources]
+
+            reference = [timed_detection(cascade, gray, None) for gray in images]
+            full_ms = sum(ms for _, ms in reference) / len(images)
+            total_faces = sum(len(boxes) for boxes, _ in reference)
+            large_reference = [[box for box in boxes if box[2] >= 0.1 * width] for boxes, _ in reference]
+            total_large = sum(map(len, large_reference))
+            print(f"{scene:>8} {size_name:>5} {'full':>5} {full_ms:>9.0f} {1.0:>7.1f}x {1.0:>7.2f} "
+                  f"{1.0:>6.2f} {0:>6}")
+
+            for cap in args.caps:
+                results = [timed_detection(cascade, gray, cap) for gray in images]
+                capped_ms = sum(ms for _, ms in results) / len(images)
+                matched, extra = map(sum, zip(*(
+                    match_faces(ref_boxes, boxes) for (ref_boxes, _), (boxes, _) in zip(reference, results)
+                )))
+                large_matched = sum(
+                    match_faces(ref_boxes, boxes)[0] for ref_boxes, (boxes, _) in zip(large_reference, results)
+                )
+                recall = matched / total_faces if total_faces else 1.0
+                large_recall = large_matched / total_large if total_large else 1.0
+                print(f"{scene:>8} {size_name:>5} {cap:>5} {capped_ms:>9.0f} {full_ms / capped_ms:>7.1f}x "
+                      f"{recall:>7.2f} {large_recall:>6.2f} {extra:>6}")
+
+
+if __name__ == '__main__':
+    main()
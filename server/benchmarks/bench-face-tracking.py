@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Compare per-frame face detection against FaceTracker on a panning sequence
+
+Frames are 1280x720 windows panning across a photo with several faces
+(src/assets/slideshow-1.jpg by default), standing in for sampled video
+frames. Full detection runs the Haar cascade on every frame; tracking runs it
+every --detect-interval frames and re-detects inside face windows otherwise.
+
+Usage: python benchmarks/bench-face-tracking.py [--image PATH] [--frames N] [--detect-interval N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'ai'))
+from face_tracking import FaceTracker, MIN_FACE_SIZE, MIN_NEIGHBORS, SCALE_FACTOR
+
+DEFAULT_IMAGE = os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'assets', 'slideshow-1.jpg')
+
+
+def panning_frames(image_path, frames, size=(1280, 720), step=4):
+    """Yield grayscale windows sliding right across the image"""
+    gray = cv2.cvtColor(cv2.imread(image_path), cv2.COLOR_BGR2GRAY)
+    width, height = size
+    max_x = gray.shape[1] - width
+    for i in range(frames):
+        x = (i * step) % max(max_x, 1)
+        yield gray[:height, x:x + width]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--image', default=DEFAULT_IMAGE, help='photo containing faces')
+    parser.add_argument('--frames', type=int, default=60)
+    parser.add_argument('--detect-interval', type=int, default=5)
+    args = parser.parse_args()
+
+    frames = list(panning_frames(args.image, args.frames))
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+
+    start = time.perf_counter()
+    full_faces = [len(cascade.detectMultiScale(
+        frame, scaleFactor=SCALE_FACTOR, minNeighbors=MIN_NEIGHBORS, minSize=MIN_FACE_SIZE
+    )) for frame in frames]
+    full_ms = (time.perf_counter() - start) * 1000 / len(frames)
+
+    tracker = FaceTracker(cascade, detect_interval=args.detect_interval)
+    start = time.perf_counter()
+    tracked_faces = [tracker.update(frame) for frame in frames]
+    tracked_ms = (time.perf_counter() - start) * 1000 / len(frames)
+
+    print(f"{'mode':>9} {'ms/frame':>9} {'full passes':>12} {'roi passes':>11} {'faces/frame':>12}")
+    print(f"{'full':>9} {full_ms:>9.1f} {len(frames):>12} {0:>11} {sum(full_faces) / len(frames):>12.2f}")
+    print(f"{'tracking':>9} {tracked_ms:>9.1f} {tracker.full_detections:>12} {tracker.roi_detections:>11} "
+          f"{sum(map(len, tracked_faces)) / len(frames):>12.2f}")
+    face_ids = {face_id for faces in tracked_faces for face_id, _ in faces}
+    print(f"speedup {full_ms / tracked_ms:.1f}x, {len(face_ids)} face IDs assigned")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Compare per-call latency of Keras model.predict against CompiledPredictor
+
+Uses the facial CNN architecture from moodtracker/basic_model.ipynb and a
+dense voice model, both with random weights, scoring one sample per call.
+
+Usage: python benchmarks/bench-inference.py [--calls N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import tensorflow as tf
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'ai'))
+from inference import CompiledPredictor
+
+
+def build_facial_cnn():
+    """Facial emotion CNN as trained in moodtracker/basic_model.ipynb"""
+    layers = tf.keras.layers
+    return tf.keras.Sequential([
+        layers.Input(shape=(48, 48, 1)),
+        layers.Conv2D(64, (3, 3), activation='relu'),
+        layers.BatchNormalization(),
+        layers.MaxPooling2D(2, 2),
+        layers.Dropout(0.25),
+        layers.Conv2D(128, (3, 3), activation='relu'),
+        layers.BatchNormalization(),
+        layers.MaxPooling2D(2, 2),
+        layers.Dropout(0.25),
+        layers.Conv2D(256, (3, 3), activation='relu'),
+        layers.BatchNormalization(),
+        layers.MaxPooling2D(2, 2),
+        layers.Dropout(0.25),
+        layers.Flatten(),
+        layers.Dense(512, activation='relu'),
+        layers.BatchNormalization(),
+        layers.Dropout(0.5),
+        layers.Dense(7, activation='softmax')
+    ])
+
+
+def build_voice_model():
+    """Dense voice emotion model over the 27-dim feature vector"""
+    layers = tf.keras.layers
+    return tf.keras.Sequential([
+        layers.Input(shape=(27,)),
+        layers.Dense(128, activation='relu'),
+        layers.Dropout(0.5),
+        layers.Dense(64, activation='relu'),
+        layers.Dropout(0.3),
+        layers.Dense(7, activation='softmax')
+    ])
+
+
+def latency_ms(predict, sample, calls):
+    """Return median and p95 per-call latency in milliseconds"""
+    predict(sample)
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        predict(sample)
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.percentile(timings, 50), np.percentile(timings, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--calls', type=int, default=200, help='timed calls per model')
+    args = parser.parse_args()
+
+    models = {
+        'facial': (build_facial_cnn(), np.random.rand(1, 48, 48, 1).astype(np.float32)),
+        'voice': (build_voice_model(), np.random.rand(1, 27).astype(np.float32))
+    }
+
+    print(f"{'model':>7} {'predict p50/p95 (ms)':>22} {'compiled p50/p95 (ms)':>23} {'speedup':>8}")
+    for name, (model, sample) in models.items():
+        compiled = CompiledPredictor(model)
+        assert np.allclose(model.predict(sample, verbose=0), compiled.predict(sample), atol=1e-5)
+
+        keras_p50, keras_p95 = latency_ms(lambda x: model.predict(x, verbose=0), sample, args.calls)
+        compiled_p50, compiled_p95 = latency_ms(compiled.predict, sample, args.calls)
+        print(f"{name:>7} {keras_p50:>12.2f} / {keras_p95:<7.2f} {compiled_p50:>13.2f} / {compiled_p95:<7.2f} "
+              f"{keras_p50 / compiled_p50:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Reproducible benchmark suite for the Python emotion subsystems
+
+Times the facial, voice, streaming voice, multimodal, AI companion and
+offline-system database paths at several input sizes. Media is synthetic:
+images, tones and videos come from the create_test_* helpers of
+tests/test-ai-ml.py and speech-like audio from bench-audio-features.py.
+Result caching is disabled so every run does the full work.
+
+Each case records its median/min/max wall time over ``--repeat`` runs
+(after one warm-up run), plus the model predict calls and temporary files
+per run. A temporary file is any path the run writes from Python, creates
+as a directory or removes (audit hooks on open, os.mkdir and os.remove),
+plus anything new in the temp or working directory after the run, which
+catches files written by OpenCV or an ffmpeg subprocess. Files still there
+after the whole case, warm-up included, are reported as leftover files.
+
+Results are written as JSON and can be compared against a stored baseline:
+a case regresses when its median exceeds the baseline median by more than
+``--threshold``, or when it makes more predict calls or creates more
+temporary or leftover files than the baseline run did. The exit status is
+1 when any case regressed.
+
+Usage: python benchmarks/bench-suite.py [--cases PATTERN ...] [--repeat N] [--output FILE]
+                                        [--baseline FILE] [--threshold FRACTION]
+"""
+
+import argparse
+import fnmatch
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from bench_common import BENCH_DIR, SERVER_DIR, load_module
+
+SAMPLE_RATE = 22050
+
+# Detector settings used by every case: no result cache, no batching delay
+DETECTOR_CONFIG = {'result_cache_entries': 0, 'inference_batch_wait_ms': 0, 'instrumentation': False}
+
+COMPANION_MESSAGES = [
+    "I'm feeling really stressed about the mission",
+    "I miss my family and feel so alone up here",
+    "I can't sleep and I'm exhausted",
+    "I'm worried about the docking procedure tomorrow",
+    "I'm feeling great today! The experiments are going well",
+    "Everything is fine, just finished the maintenance checklist"
+]
+
+# Model predict calls during the current run
+COUNTERS = {'predict_calls': 0}
+
+# Paths written, created or removed during the current run
+TOUCHED_PATHS = set()
+
+# os.open flags that write to a file
+WRITE_FLAGS = os.O_WRONLY | os.O_RDWR | os.O_CREAT
+
+
+def record_file_events(event, args):
+    """Audit hook recording paths opened for writing, made as directories or removed"""
+    if event == 'open':
+        path, mode, flags = args
+        if not isinstance(path, (str, bytes)):
+            return
+        if not (mode and set(mode) & set('wxa+')) and not flags & WRITE_FLAGS:
+            return
+    elif event in ('os.mkdir', 'os.remove'):
+        path = args[0]
+    else:
+        return
+    TOUCHED_PATHS.add(os.path.abspath(os.fsdecode(path)))
+
+
+def list_files(workdir):
+    """Paths in the temp directory and anywhere under the working directory"""
+    paths = {entry.path for entry in os.scandir(tempfile.gettempdir())}
+    for root, dirnames, filenames in os.walk(workdir):
+        paths.update(os.path.join(root, name) for name in dirnames + filenames)
+    return paths
+
+
+class CountingPredictor:
+    """Predictor wrapper counting predict calls"""
+
+    def __init__(self, predictor):
+        self.predictor = predictor
+
+    def predict(self, *args, **kwargs):
+        COUNTERS['predict_calls'] += 1
+        return self.predictor.predict(*args, **kwargs)
+
+
+class Fixtures:
+    """Synthetic media and shared systems, created on first use"""
+
+    def __init__(self, workdir):
+        self.workdir = workdir
+        self.tests = load_module('test_ai_ml', os.path.join(SERVER_DIR, 'tests', 'test-ai-ml.py'))
+        self.audio_bench = load_module('bench_audio_features', os.path.join(BENCH_DIR, 'bench-audio-features.py'))
+        self._detector = None
+        self._offline_systems = {}
+
+    def path(self, name):
+        return os.path.join(self.workdir, name)
+
+    def image(self, size):
+        return self.tests.create_test_image(self.path(f'face-{size}.jpg'), size=size)
+
+    def tone(self, seconds):
+        return self.tests.create_test_audio(self.path(f'tone-{seconds}s.wav'), duration=seconds)
+
+    def speech(self, seconds):
+        import soundfile as sf
+        path = self.path(f'speech-{seconds}s.wav')
+        sf.write(path, self.audio_bench.synthetic_speech(seconds, SAMPLE_RATE), SAMPLE_RATE)
+        return path
+
+    def video(self, seconds, size=320):
+        return self.tests.create_test_video(self.path(f'video-{seconds}s.mp4'), frames=seconds, size=size)
+
+    def detector(self):
+        """Warm detector whose models count their predict calls"""
+        if self._detector is None:
+            module = load_module('emotion_detector', os.path.join(SERVER_DIR, 'src', 'ai', 'emotion-detector.py'))
+            self._detector = module.MultimodalEmotionDetector(config=DETECTOR_CONFIG)
+            self._detector.preload_models()
+            self._detector.models = {
+                name: CountingPredictor(model) for name, model in self._detector.models.items()
+            }
+        return self._detector
+
+    def companion(self):
+        module = load_module('ai_companion', os.path.join(SERVER_DIR, 'src', 'ai', 'ai-companion.py'))
+        return module.AISpaceCompanion()
+
+    def offline_system(self, rows):
+        """Offline system whose database holds ``rows`` analyses from the last week"""
+        if rows not in self._offline_systems:
+            self._offline_systems[rows] = self._create_offline_system(rows)
+        return self._offline_systems[rows]
+
+    def _create_offline_system(self, rows):
+        module = load_module('offline_system', os.path.join(SERVER_DIR, 'src', 'standalone', 'offline-system.py'))
+        system = module.OfflineSpaceStationSystem(
+            self.path(f'offline-{rows}'), config={**DETECTOR_CONFIG, 'result_cache_disk': False}
+        )
+        system.facial_model = CountingPredictor(system.facial_model)
+        system.voice_model = CountingPredictor(system.voice_model)
+
+        rng = random.Random(rows)
+        now = datetime.now()
+        emotions = ['angry', 'disgust', 'fear', 'happy', 'neutral', 'sad', 'surprise']
+        conn = sqlite3.connect(system.db_path)
+        conn.executemany('''
+            INSERT INTO emotion_analysis
+            (crew_member_id, timestamp, emotion_type, primary_emotion, confidence,
+             emotion_scores, analysis_data, file_path)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [
+            (rng.randint(1, 6), (now - timedelta(minutes=rng.randint(0, 7 * 24 * 60))).isoformat(),
+             'facial', rng.choice(emotions), rng.random(), '{}', '{}', 'synthetic.jpg')
+            for _ in range(rows)
+        ])
+        conn.executemany('''
+            INSERT INTO critical_issues
+            (crew_member_id, issue_type, severity, description, timestamp, auto_detected)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [
+            (rng.randint(1, 6), 'emotional_distress', 'medium', 'synthetic',
+             (now - timedelta(minutes=rng.randint(0, 7 * 24 * 60))).isoformat(), True)
+            for _ in range(rows // 100)
+        ])
+        conn.commit()
+        conn.close()
+        return system
+
+
+def detector_case(fixtures, method, make_input):
+    """Case factory calling a detector method on one generated input"""
+    def factory():
+        analyze = getattr(fixtures.detector(), method)
+        path = make_input()
+        return lambda: analyze(path)
+    return factory
+
+
+def companion_case(fixtures, messages, history=600, words=None):
+    """
+    Case factory processing ``messages`` companion messages after ``history`` earlier ones
+
+    The history is spread over history / 100 crew members (at least 6), which
+    fills the companion's 100-conversation-per-crew cap, so every timed run
+    starts from the same steady state.
+    """
+    def factory():
+        companion = fixtures.companion()
+        crew_count = max(history // 100, 6)
+        random.seed(0)
+        for i in range(history):
+            companion.process_message(COMPANION_MESSAGES[i % len(COMPANION_MESSAGES)], f'crew-{i % crew_count}')
+
+        texts = COMPANION_MESSAGES
+        if words:
+            texts = [' '.join(itertools.islice(itertools.cycle(text.split()), words)) for text in texts]
+
+        def run():
+            random.seed(0)
+            for i in range(messages):
+                companion.process_message(texts[i % len(texts)], f'crew-{i % crew_count}')
+        return run
+    return factory
+
+
+def build_cases(fixtures, has_ffmpeg):
+    """Return {case name: factory}; a factory prepares its inputs and returns the timed callable"""
+    cases = {}
+
+    for size in (100, 720, 2160):
+        cases[f'facial/{size}px'] = detector_case(
+            fixtures, 'detect_facial_emotions', lambda size=size: fixtures.image(size)
+        )
+
+    for seconds in (2, 30):
+        cases[f'voice/tone-{seconds}s'] = detector_case(
+            fixtures, 'detect_voice_emotions', lambda seconds=seconds: fixtures.tone(seconds)
+        )
+        cases[f'voice/speech-{seconds}s'] = detector_case(
+            fixtures, 'detect_voice_emotions', lambda seconds=seconds: fixtures.speech(seconds)
+        )
+
+    cases['voice-stream/speech-120s'] = detector_case(
+        fixtures, 'detect_voice_emotions_streaming', lambda: fixtures.speech(120)
+    )
+
+    # The audio branch of video analysis needs ffmpeg
+    for seconds in (10, 30):
+        cases[f'multimodal/{seconds}s'] = None if not has_ffmpeg else detector_case(
+            fixtures, 'detect_multimodal_emotions', lambda seconds=seconds: fixtures.video(seconds)
+        )
+
+    cases['companion/200-short-messages-after-600'] = companion_case(fixtures, 200)
+    cases['companion/200-long-messages-after-600'] = companion_case(fixtures, 200, words=400)
+    cases['companion/200-messages-after-5000'] = companion_case(fixtures, 200, history=5000)
+
+    def analyze_media():
+        system, path = fixtures.offline_system(0), fixtures.image(720)
+        return lambda: system.analyze_media(path, 1)
+    cases['offline/analyze-facial-720px'] = analyze_media
+
+    for rows in (1000, 20000):
+        def store_results(rows=rows):
+            system = fixtures.offline_system(rows)
+            result = {'type': 'facial', 'primary_emotion': 'happy', 'confidence': 0.9, 'emotion_scores': {}}
+            return lambda: [system._store_analysis_result(1, result, 'synthetic.jpg') for _ in range(50)]
+        cases[f'offline/store-50-results-{rows}-rows'] = store_results
+        cases[f'offline/crew-status-{rows}-rows'] = lambda rows=rows: fixtures.offline_system(rows).get_crew_status
+        cases[f'offline/report-{rows}-rows'] = lambda rows=rows: fixtures.offline_system(rows).generate_report
+
+    return cases
+
+
+def time_case(run, repeat, workdir):
+    """Warm up once, then time ``repeat`` runs and count their side effects"""
+    initial_files = list_files(workdir)
+    first = run()
+    error = isinstance(first, dict) and bool(first.get('error'))
+
+    COUNTERS.update(predict_calls=0)
+    times = []
+    temp_files = 0
+    for _ in range(repeat):
+        before = list_files(workdir)
+        TOUCHED_PATHS.clear()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+        temp_files += len(TOUCHED_PATHS | (list_files(workdir) - before))
+
+    return {
+        'median_ms': float(np.median(times)) * 1000,
+        'min_ms': min(times) * 1000,
+        'max_ms': max(times) * 1000,
+        'runs': repeat,
+        'predict_calls': COUNTERS['predict_calls'] / repeat,
+        'temp_files': temp_files / repeat,
+        'leftover_files': len(list_files(workdir) - initial_files),
+        'error': error
+    }
+
+
+def environment():
+    """Describe the machine and code the results were measured on"""
+    import cv2
+    import tensorflow as tf
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BENCH_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'opencv': cv2.__version__,
+        'tensorflow': tf.__version__,
+        'backend': os.environ.get('EMOTION_MODEL_BACKEND', 'keras'),
+        'timestamp': datetime.now().isoformat()
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print current against baseline results and return the names of regressed cases"""
+    regressions = []
+    if baseline.get('repeat') != results['repeat']:
+        print(f"\nWarning: baseline used {baseline.get('repeat')} runs per case, this run {results['repeat']}")
+    print(f"\n{'case':<42} {'baseline ms':>12} {'current ms':>11} {'change':>8}  status")
+    for name, current in results['cases'].items():
+        previous = baseline['cases'].get(name)
+        if 'skipped' in current or previous is None or 'skipped' in previous:
+            status = 'skipped' if 'skipped' in current else 'new'
+            print(f"{name:<42} {'-':>12} {current.get('median_ms', 0):>11.2f} {'-':>8}  {status}")
+            continue
+
+        change = current['median_ms'] / previous['median_ms'] - 1
+        reasons = []
+        if change > threshold:
+            reasons.append('slower')
+        if current['predict_calls'] > previous['predict_calls']:
+            reasons.append(f"predict calls {previous['predict_calls']:g} -> {current['predict_calls']:g}")
+        if current['temp_files'] > previous['temp_files']:
+            reasons.append(f"temp files {previous['temp_files']:g} -> {current['temp_files']:g}")
+        if current['leftover_files'] > previous.get('leftover_files', 0):
+            reasons.append(f"leftover files {previous.get('leftover_files', 0)} -> {current['leftover_files']}")
+        if reasons:
+            regressions.append(name)
+        status = 'REGRESSED (' + ', '.join(reasons) + ')' if reasons else 'ok'
+        print(f"{name:<42} {previous['median_ms']:>12.2f} {current['median_ms']:>11.2f} {change:>+8.1%}  {status}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cases', nargs='+', default=['*'], help='glob patterns of case names to run')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per case (median is compared)')
+    parser.add_argument('--output', default='bench-results.json', help='where to write the JSON results')
+    parser.add_argument('--baseline', help='earlier results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='allowed median slowdown before a case counts as regressed (0.2 = 20%%)')
+    args = parser.parse_args()
+    output_path = os.path.abspath(args.output)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    sys.addaudithook(record_file_events)
+    has_ffmpeg = shutil.which('ffmpeg') is not None
+
+    with tempfile.TemporaryDirectory() as workdir:
+        # The offline system logs to its working directory
+        os.chdir(workdir)
+        fixtures = Fixtures(workdir)
+        cases = build_cases(fixtures, has_ffmpeg)
+        selected = [name for name in cases if any(fnmatch.fnmatch(name, pattern) for pattern in args.cases)]
+
+        results = {'environment': environment(), 'repeat': args.repeat, 'cases': {}}
+        print(f"{'case':<42} {'median ms':>10} {'min ms':>9} {'predicts':>9} {'tmpfiles':>9} {'leftover':>9}")
+        for name in selected:
+            if cases[name] is None:
+                results['cases'][name] = {'skipped': 'ffmpeg not installed'}
+                print(f"{name:<42} skipped (ffmpeg not installed)")
+                continue
+            result = results['cases'][name] = time_case(cases[name](), args.repeat, workdir)
+            print(f"{name:<42} {result['median_ms']:>10.2f} {result['min_ms']:>9.2f} "
+                  f"{result['predict_calls']:>9g} {result['temp_files']:>9g} {result['leftover_files']:>9}"
+                  + ('  (analysis returned an error)' if result['error'] else ''))
+
+    with open(output_path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output_path}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) regressed beyond {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Compare peak memory of whole-file and streaming voice emotion analysis
+
+Each run happens in a fresh interpreter. The voice model is loaded before the
+baseline is taken, so the reported growth is what the analysis itself adds
+on top of the loaded detector.
+
+Usage: python benchmarks/bench-voice-streaming.py [--minutes N ...]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import soundfile as sf
+
+DETECTOR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'ai', 'emotion-detector.py')
+
+SCENARIO_TEMPLATE = '''
+import importlib.util, json, resource, time
+spec = importlib.util.spec_from_file_location('emotion_detector', {detector_path!r})
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+detector = module.MultimodalEmotionDetector()
+detector.preload_models(['voice_emotion'])
+baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+result = detector.{method}({audio_path!r})
+print(json.dumps({{
+    'seconds': time.perf_counter() - start,
+    'growth_mb': (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline) / 1024,
+    'windows': result.get('window_count', 1)
+}}))
+'''
+
+MODES = {
+    'whole-file': 'detect_voice_emotions',
+    'streaming': 'detect_voice_emotions_streaming'
+}
+
+
+def write_recording(path, minutes, sr=44100):
+    """Write a speech-like test recording block by block (16-bit PCM)"""
+    rng = np.random.default_rng(0)
+    with sf.SoundFile(path, 'w', samplerate=sr, channels=1, subtype='PCM_16') as f:
+        for second in range(int(minutes * 60)):
+            t = np.arange(sr) / sr
+            pitch = 120 + 40 * np.sin(second / 7)
+            tone = 0.3 * np.sin(2 * np.pi * pitch * t) + 0.05 * rng.standard_normal(sr)
+            f.write(tone.astype(np.float32))
+
+
+def run_mode(method, audio_path):
+    """Analyze one recording in a fresh interpreter"""
+    script = SCENARIO_TEMPLATE.format(detector_path=DETECTOR_PATH, method=method, audio_path=audio_path)
+    output = subprocess.run(
+        [sys.executable, '-c', script], capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--minutes', nargs='+', type=float, default=[1, 10, 30], help='recording lengths')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'minutes':>8} {'mode':>11} {'seconds':>8} {'RSS growth (MB)':>16} {'windows':>8}")
+        for minutes in args.minutes:
+            audio_path = os.path.join(directory, f'debrief-{minutes:g}min.wav')
+            write_recording(audio_path, minutes)
+            for mode, method in MODES.items():
+                result = run_mode(method, audio_path)
+                print(f"{minutes:>8g} {mode:>11} {result['seconds']:>8.1f} {result['growth_mb']:>16.0f} "
+                      f"{result['windows']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,22 @@
+"""
+Helpers shared by the benchmark scripts
+
+The scripts import this module by name, which works because Python puts a
+script's own directory on sys.path when it is run directly.
+"""
+
+import importlib.util
+import os
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.join(BENCH_DIR, '..')
+AI_DIR = os.path.join(SERVER_DIR, 'src', 'ai')
+COMPANION_PATH = os.path.join(AI_DIR, 'ai-companion.py')
+
+
+def load_module(module_name, path):
+    """Load a source file by path (the repo's scripts have hyphenated names)"""
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
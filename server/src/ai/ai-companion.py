@@ -3,9 +3,13 @@
 AI Companion System for Space Station Crew Psychological Support
 """
 
+import asyncio
 import json
 import random
 import re
+import threading
+from collections import deque
+from itertools import islice
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 import logging
@@ -14,10 +18,111 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Emotional keywords and patterns
+EMOTION_INDICATORS = {
+    'stress': ['stressed', 'overwhelmed', 'pressure', 'difficult', 'hard', 'struggling'],
+    'anxiety': ['worried', 'anxious', 'nervous', 'scared', 'afraid', 'concerned'],
+    'sadness': ['sad', 'depressed', 'down', 'blue', 'miserable', 'hopeless'],
+    'anger': ['angry', 'mad', 'frustrated', 'irritated', 'annoyed', 'furious'],
+    'loneliness': ['alone', 'lonely', 'isolated', 'disconnected', 'separated'],
+    'fatigue': ['tired', 'exhausted', 'drained', 'fatigued', 'weary'],
+    'happiness': ['happy', 'joyful', 'excited', 'pleased', 'content', 'satisfied'],
+    'fear': ['fear', 'terrified', 'panic', 'alarm', 'dread']
+}
+
+# Keywords that mark a message as urgent
+URGENT_KEYWORDS = ['help', 'emergency', 'crisis', 'can\'t', 'unable', 'desperate']
+
+class KeywordMatcher:
+    """
+    Whole-word matcher for several keyword categories, compiled once
+    
+    All keywords share one regex with word boundaries, so a message is
+    scanned once for every category and keywords inside longer words
+    ("down" in "download") do not match. The alternation is factored into a
+    prefix trie ("a(?:fraid|l(?:arm|one))|..."), so each word start is
+    checked against a few branches instead of every keyword.
+    """
+    
+    def __init__(self, categories: Dict[str, List[str]]):
+        """
+        Args:
+            categories: Mapping of category name to its keywords
+        """
+        self.keyword_categories = {}
+        for category, keywords in categories.items():
+            for keyword in keywords:
+                self.keyword_categories.setdefault(keyword.lower(), []).append(category)
+        
+        trie = {}
+        for keyword in self.keyword_categories:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[''] = {}
+        self.pattern = re.compile(r"\b" + self._trie_pattern(trie) + r"\b")
+    
+    @classmethod
+    def _trie_pattern(cls, node: Dict) -> str:
+        """Regex matching the keyword suffixes stored below a trie node"""
+        branches = []
+        for char, child in sorted(node.items()):
+            if not char:
+                continue
+            # Collapse single-child chains into one literal
+            literal = char
+            while len(child) == 1 and '' not in child:
+                (char, child), = child.items()
+                literal += char
+            branches.append(re.escape(literal) + cls._trie_pattern(child))
+        
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            # A keyword ends here and longer ones continue
+            pattern = f'(?:{pattern})?'
+        return pattern
+    
+    def match(self, text: str) -> Dict[str, set]:
+        """
+        Find the keywords present in a text
+        
+        Returns:
+            Mapping of category to the set of its distinct keywords found
+        """
+        found = {}
+        for keyword in set(self.pattern.findall(text.lower())):
+            for category in self.keyword_categories[keyword]:
+                found.setdefault(category, set()).add(keyword)
+        return found
+
+# Matcher for the emotion keywords plus the 'urgent' category
+MESSAGE_KEYWORD_MATCHER = KeywordMatcher({**EMOTION_INDICATORS, 'urgent': URGENT_KEYWORDS})
+
+# Conversations kept per crew member; older ones are dropped
+MAX_CONVERSATIONS_PER_CREW = 100
+
 class AISpaceCompanion:
-    def __init__(self):
-        """Initialize the AI companion system"""
-        self.conversation_history = []
+    def __init__(self, conversation_store=None):
+        """
+        Initialize the AI companion system
+        
+        Args:
+            conversation_store: Optional ConversationStore (see conversation_store.py)
+                that persists conversations and crew context in the background;
+                a crew member's state is read back on first access
+        """
+        self.conversation_store = conversation_store
+        self._rehydrated_crew = set()
+        
+        # One lock per crew member: messages from different crew members run
+        # in parallel, messages from the same one are applied in turn
+        self._crew_locks = {}
+        self._crew_locks_guard = threading.Lock()
+        
+        # Crew member ID -> deque of that member's most recent conversations
+        self.conversation_history = {}
         self.crew_context = {}
         self.mission_phase = "mission_operations"
         self.psychological_profiles = {}
@@ -129,66 +234,225 @@ class AISpaceCompanion:
             # Analyze the message for emotional content
             emotional_analysis = self._analyze_message_emotion(message)
             
-            # Update crew context
-            self._update_crew_context(crew_member_id, emotional_analysis, emotional_context)
-            
-            # Determine appropriate response strategy
-            response_strategy = self._determine_response_strategy(
-                message, emotional_analysis, crew_member_id
-            )
+            with self._crew_lock(crew_member_id):
+                # Restore the crew member's persisted state before first use
+                self._rehydrate_crew(crew_member_id)
+                
+                # Update crew context
+                self._update_crew_context(crew_member_id, emotional_analysis, emotional_context)
+                
+                # Determine appropriate response strategy
+                response_strategy = self._determine_response_strategy(
+                    message, emotional_analysis, crew_member_id
+                )
+                
+                # Generate response
+                response = self._generate_response(message, response_strategy, crew_member_id)
+                
+                # Generate recommendations
+                recommendations = self._generate_recommendations(
+                    emotional_analysis, response_strategy, crew_member_id
+                )
+                
+                # Store conversation
+                self._store_conversation(crew_member_id, message, response, emotional_analysis)
+                
+                # Queue both for the background writer
+                if self.conversation_store is not None:
+                    self.conversation_store.record_conversation(self.conversation_history[crew_member_id][-1])
+                    self.conversation_store.record_context(crew_member_id, self.crew_context[crew_member_id])
+                
+                return {
+                    'response': response,
+                    'recommendations': recommendations,
+                    'emotional_support': self._determine_emotional_support_level(emotional_analysis),
+                    'intervention_needed': self._assess_intervention_need(emotional_analysis),
+                    'timestamp': datetime.now().isoformat(),
+                    'crew_member_id': crew_member_id
+                }
+                
+        except Exception as e:
+            logger.error(f"Error processing message: {e}")
+            return self._generate_error_response()
+    
+    async def aprocess_message(self, message: str, crew_member_id: str,
+                               emotional_context: Optional[Dict] = None) -> Dict:
+        """
+        Asyncio version of process_message
+        
+        The message is processed on the default executor, so waiting for a
+        busy crew member's lock does not block the event loop.
+        
+        Args:
+            message: The crew member's message
+            crew_member_id: ID of the crew member
+            emotional_context: Optional emotional context from monitoring system
             
-            # Generate response
-            response = self._generate_response(message, response_strategy, crew_member_id)
+        Returns:
+            Dictionary containing AI response and recommendations
+        """
+        return await asyncio.to_thread(self.process_message, message, crew_member_id, emotional_context)
+    
+    def process_messages(self, batch: List[Tuple[str, str, Optional[Dict]]]) -> List[Dict]:
+        """
+        Process a batch of messages, e.g. when replaying logs or backfilling
+        
+        Gives the same results as calling process_message on each message in
+        order, but each distinct message text is analyzed once, strategy,
+        response closing, support level and intervention need are worked out
+        once per primary emotion and urgency, and a crew member's context is
+        updated once per run of messages without emotional context. The
+        batch shares one timestamp and conversation IDs end with the
+        message's batch position to stay unique. The savings come from this
+        memoization, so they grow with how often messages repeat.
+        
+        Args:
+            batch: (crew_member_id, message, emotional_context) tuples, where
+                emotional_context may be None
             
-            # Generate recommendations
-            recommendations = self._generate_recommendations(
-                emotional_analysis, response_strategy, crew_member_id
-            )
+        Returns:
+            List of response dictionaries, in batch order
+        """
+        try:
+            # Replayed logs repeat messages, so each distinct text is analyzed once
+            analyses = {}
+            plans = {}
+            for _, message, _ in batch:
+                if message not in analyses:
+                    analysis = analyses[message] = self._analyze_message_emotion(message)
+                    plan_key = (analysis['primary_emotion'], analysis['urgency'])
+                    if plan_key not in plans:
+                        plans[plan_key] = self._response_plan(analysis)
+        except Exception as e:
+            logger.error(f"Error analyzing message batch: {e}")
+            return [self._generate_error_response() for _ in batch]
+        
+        now = datetime.now()
+        results = [None] * len(batch)
+        
+        positions_by_crew = {}
+        for position, (crew_member_id, _, _) in enumerate(batch):
+            positions_by_crew.setdefault(crew_member_id, []).append(position)
+        
+        for crew_member_id, positions in positions_by_crew.items():
+            try:
+                with self._crew_lock(crew_member_id):
+                    self._rehydrate_crew(crew_member_id)
+                    self._process_crew_messages(crew_member_id, positions, batch, analyses, plans, now, results)
+            except Exception as e:
+                logger.error(f"Error processing messages of crew member {crew_member_id}: {e}")
+                for position in positions:
+                    if results[position] is None:
+                        results[position] = self._generate_error_response()
+        
+        return results
+    
+    def _process_crew_messages(self, crew_member_id: str, positions: List[int], batch: List[Tuple],
+                               analyses: Dict[str, Dict], plans: Dict[Tuple, Tuple],
+                               now: datetime, results: List):
+        """Process one crew member's messages of a batch, in order (crew lock held)"""
+        timestamp = now.isoformat()
+        conversation_prefix = f"{crew_member_id}_{now.timestamp()}"
+        if crew_member_id not in self.crew_context:
+            self.crew_context[crew_member_id] = self._new_crew_context()
+        context = self.crew_context[crew_member_id]
+        
+        # Without a store only the conversations the history keeps are needed
+        conversations = []
+        first_kept = 0
+        if self.conversation_store is None:
+            first_kept = len(positions) - MAX_CONVERSATIONS_PER_CREW
+        
+        pending_emotions = []
+        phase_sentence = self._phase_sentence(context)
+        for index, position in enumerate(positions):
+            _, message, emotional_context = batch[position]
+            analysis = analyses[message]
+            strategy, templates, closing, support_level, intervention_needed = plans[
+                (analysis['primary_emotion'], analysis['urgency'])
+            ]
             
-            # Store conversation
-            self._store_conversation(crew_member_id, message, response, emotional_analysis)
+            if emotional_context:
+                # External context may change anything, so this message takes the full path
+                self._apply_emotions(crew_member_id, pending_emotions, timestamp)
+                pending_emotions = []
+                self._update_crew_context(crew_member_id, analysis, emotional_context)
+                response = self._generate_response(message, strategy, crew_member_id)
+                phase_sentence = self._phase_sentence(context)
+            else:
+                # The message's own emotion is the most recent one, as in _generate_response
+                pending_emotions.append(analysis['primary_emotion'])
+                response = random.choice(templates) + phase_sentence + closing
             
-            return {
+            if index >= first_kept:
+                # Identical messages share an analysis; each conversation gets its own copy
+                conversations.append({
+                    'crew_member_id': crew_member_id,
+                    'timestamp': timestamp,
+                    'user_message': message,
+                    'ai_response': response,
+                    'emotional_analysis': {**analysis, 'emotion_scores': dict(analysis['emotion_scores'])},
+                    'conversation_id': f"{conversation_prefix}_{position}"
+                })
+            results[position] = {
                 'response': response,
-                'recommendations': recommendations,
-                'emotional_support': self._determine_emotional_support_level(emotional_analysis),
-                'intervention_needed': self._assess_intervention_need(emotional_analysis),
-                'timestamp': datetime.now().isoformat(),
+                'recommendations': self._generate_recommendations(analysis, strategy, crew_member_id),
+                'emotional_support': support_level,
+                'intervention_needed': intervention_needed,
+                'timestamp': timestamp,
                 'crew_member_id': crew_member_id
             }
-            
-        except Exception as e:
-            logger.error(f"Error processing message: {e}")
-            return self._generate_error_response()
+        
+        self._apply_emotions(crew_member_id, pending_emotions, timestamp)
+        
+        history = self.conversation_history.get(crew_member_id)
+        if history is None:
+            history = self.conversation_history[crew_member_id] = deque(maxlen=MAX_CONVERSATIONS_PER_CREW)
+        history.extend(conversations)
+        
+        if self.conversation_store is not None:
+            self.conversation_store.record_conversations(conversations)
+            self.conversation_store.record_context(crew_member_id, self.crew_context[crew_member_id])
+    
+    def _phase_sentence(self, crew_context: Dict) -> str:
+        """Mission phase remark _generate_response adds for a crew member's context"""
+        if crew_context.get('mission_phase'):
+            return f" I know you're in the {crew_context['mission_phase']} phase of your mission."
+        return ''
+    
+    def _response_plan(self, emotional_analysis: Dict) -> Tuple:
+        """Everything about a response that depends only on the primary emotion and urgency"""
+        strategy = self._determine_response_strategy(None, emotional_analysis, None)
+        primary_emotion = emotional_analysis['primary_emotion']
+        
+        closing = ''
+        if primary_emotion != 'neutral':
+            closing += f" I've noticed you've been feeling {primary_emotion} recently."
+        closing += self._strategy_guidance(strategy)
+        
+        return (
+            strategy,
+            self.support_templates.get(strategy, self.support_templates['greeting']),
+            closing,
+            self._determine_emotional_support_level(emotional_analysis),
+            self._assess_intervention_need(emotional_analysis)
+        )
     
     def _analyze_message_emotion(self, message: str) -> Dict:
         """Analyze the emotional content of a message"""
-        message_lower = message.lower()
-        
-        # Emotional keywords and patterns
-        emotion_indicators = {
-            'stress': ['stressed', 'overwhelmed', 'pressure', 'difficult', 'hard', 'struggling'],
-            'anxiety': ['worried', 'anxious', 'nervous', 'scared', 'afraid', 'concerned'],
-            'sadness': ['sad', 'depressed', 'down', 'blue', 'miserable', 'hopeless'],
-            'anger': ['angry', 'mad', 'frustrated', 'irritated', 'annoyed', 'furious'],
-            'loneliness': ['alone', 'lonely', 'isolated', 'disconnected', 'separated'],
-            'fatigue': ['tired', 'exhausted', 'drained', 'fatigued', 'weary'],
-            'happiness': ['happy', 'joyful', 'excited', 'pleased', 'content', 'satisfied'],
-            'fear': ['fear', 'terrified', 'panic', 'alarm', 'dread']
-        }
+        # One pass finds the emotion and urgency keywords as whole words
+        found = MESSAGE_KEYWORD_MATCHER.match(message)
         
         detected_emotions = {}
-        for emotion, keywords in emotion_indicators.items():
-            score = sum(1 for keyword in keywords if keyword in message_lower)
-            if score > 0:
-                detected_emotions[emotion] = min(score / len(keywords), 1.0)
+        for emotion, keywords in EMOTION_INDICATORS.items():
+            if emotion in found:
+                detected_emotions[emotion] = min(len(found[emotion]) / len(keywords), 1.0)
         
         # Determine primary emotion
         primary_emotion = max(detected_emotions, key=detected_emotions.get) if detected_emotions else 'neutral'
         
         # Assess urgency
-        urgent_keywords = ['help', 'emergency', 'crisis', 'can\'t', 'unable', 'desperate']
-        is_urgent = any(keyword in message_lower for keyword in urgent_keywords)
+        is_urgent = 'urgent' in found
         
         return {
             'primary_emotion': primary_emotion,
@@ -228,8 +492,7 @@ class AISpaceCompanion:
         crew_context = self.crew_context.get(crew_member_id, {})
         
         # Add personalized elements
-        if crew_context.get('mission_phase'):
-            base_response += f" I know you're in the {crew_context['mission_phase']} phase of your mission."
+        base_response += self._phase_sentence(crew_context)
         
         if crew_context.get('recent_emotions'):
             recent_emotion = crew_context['recent_emotions'][-1] if crew_context['recent_emotions'] else None
@@ -237,16 +500,21 @@ class AISpaceCompanion:
                 base_response += f" I've noticed you've been feeling {recent_emotion} recently."
         
         # Add specific guidance based on strategy
+        base_response += self._strategy_guidance(strategy)
+        
+        return base_response
+    
+    def _strategy_guidance(self, strategy: str) -> str:
+        """Closing guidance sentence of a response, per strategy"""
         if strategy == 'crisis_support':
-            base_response += " Let's talk about what's happening and how I can help you right now."
+            return " Let's talk about what's happening and how I can help you right now."
         elif strategy == 'stress_support':
-            base_response += " Would you like to try some stress management techniques?"
+            return " Would you like to try some stress management techniques?"
         elif strategy == 'isolation_support':
-            base_response += " I'm here to provide companionship and support."
+            return " I'm here to provide companionship and support."
         elif strategy == 'relaxation_guidance':
-            base_response += " I can guide you through some relaxation exercises."
-        
-        return base_response
+            return " I can guide you through some relaxation exercises."
+        return ''
     
     def _generate_recommendations(self, emotional_analysis: Dict, strategy: str, 
                                 crew_member_id: str) -> List[Dict]:
@@ -259,7 +527,7 @@ class AISpaceCompanion:
             recommendations.append({
                 'type': 'breathing_exercise',
                 'priority': 'high',
-                'technique': self.intervention_strategies['breathing_exercises'],
+                'technique': self._intervention_technique('breathing_exercises'),
                 'reason': 'To help manage stress and anxiety'
             })
         
@@ -283,12 +551,17 @@ class AISpaceCompanion:
         recommendations.append({
             'type': 'mindfulness',
             'priority': 'medium',
-            'technique': self.intervention_strategies['mindfulness_meditation'],
+            'technique': self._intervention_technique('mindfulness_meditation'),
             'reason': 'To promote overall well-being and stress resilience'
         })
         
         return recommendations
     
+    def _intervention_technique(self, name: str) -> Dict:
+        """Copy of an intervention strategy, so a caller editing its response cannot change later ones"""
+        return {key: list(value) if isinstance(value, list) else value
+                for key, value in self.intervention_strategies[name].items()}
+    
     def _determine_emotional_support_level(self, emotional_analysis: Dict) -> str:
         """Determine the level of emotional support needed"""
         primary_emotion = emotional_analysis['primary_emotion']
@@ -317,12 +590,7 @@ class AISpaceCompanion:
                            external_context: Optional[Dict] = None):
         """Update the psychological context for a crew member"""
         if crew_member_id not in self.crew_context:
-            self.crew_context[crew_member_id] = {
-                'recent_emotions': [],
-                'conversation_count': 0,
-                'last_interaction': None,
-                'psychological_profile': 'baseline'
-            }
+            self.crew_context[crew_member_id] = self._new_crew_context()
         
         # Update recent emotions
         self.crew_context[crew_member_id]['recent_emotions'].append(
@@ -345,6 +613,29 @@ class AISpaceCompanion:
         if external_context:
             self.crew_context[crew_member_id].update(external_context)
     
+    def _new_crew_context(self) -> Dict:
+        """Context of a crew member before their first message"""
+        return {
+            'recent_emotions': [],
+            'conversation_count': 0,
+            'last_interaction': None,
+            'psychological_profile': 'baseline'
+        }
+    
+    def _apply_emotions(self, crew_member_id: str, emotions: List[str], timestamp: str):
+        """Update a crew member's context for several messages without external context at once"""
+        if not emotions:
+            return
+        context = self.crew_context[crew_member_id]
+        context['recent_emotions'].extend(emotions)
+        if len(context['recent_emotions']) > 10:
+            context['recent_emotions'] = context['recent_emotions'][-10:]
+        context['conversation_count'] += len(emotions)
+        context['last_interaction'] = timestamp
+        
+        # The profile only depends on the final recent emotions
+        self._update_psychological_profile(crew_member_id)
+    
     def _update_psychological_profile(self, crew_member_id: str):
         """Update the psychological profile based on emotional patterns"""
         recent_emotions = self.crew_context[crew_member_id]['recent_emotions']
@@ -368,21 +659,63 @@ class AISpaceCompanion:
     def _store_conversation(self, crew_member_id: str, message: str, response: str, 
                           emotional_analysis: Dict):
         """Store conversation for analysis and improvement"""
+        now = datetime.now()
         conversation = {
             'crew_member_id': crew_member_id,
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now.isoformat(),
             'user_message': message,
             'ai_response': response,
             'emotional_analysis': emotional_analysis,
-            'conversation_id': f"{crew_member_id}_{datetime.now().timestamp()}"
+            'conversation_id': f"{crew_member_id}_{now.timestamp()}"
         }
         
-        self.conversation_history.append(conversation)
+        # Bounded per-crew deque: appending drops the oldest conversation in O(1)
+        history = self.conversation_history.get(crew_member_id)
+        if history is None:
+            history = self.conversation_history[crew_member_id] = deque(maxlen=MAX_CONVERSATIONS_PER_CREW)
+        history.append(conversation)
+    
+    def _crew_lock(self, crew_member_id: str) -> threading.RLock:
+        """Lock guarding one crew member's context and history"""
+        lock = self._crew_locks.get(crew_member_id)
+        if lock is None:
+            with self._crew_locks_guard:
+                lock = self._crew_locks.setdefault(crew_member_id, threading.RLock())
+        return lock
+    
+    def _rehydrate_crew(self, crew_member_id: str):
+        """Load a crew member's persisted context and history on first access (crew lock held)"""
+        if self.conversation_store is None or crew_member_id in self._rehydrated_crew:
+            return
+        
+        context, conversations = self.conversation_store.load_crew(crew_member_id, MAX_CONVERSATIONS_PER_CREW)
+        # Only marked once loaded, so a failed read is retried on the next access
+        self._rehydrated_crew.add(crew_member_id)
+        if context is not None and crew_member_id not in self.crew_context:
+            self.crew_context[crew_member_id] = context
+        if conversations and crew_member_id not in self.conversation_history:
+            self.conversation_history[crew_member_id] = deque(conversations, maxlen=MAX_CONVERSATIONS_PER_CREW)
+    
+    def get_conversation_history(self, crew_member_id: str, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Get the stored conversations of a crew member, oldest first
         
-        # Keep only last 100 conversations per crew member
-        crew_conversations = [c for c in self.conversation_history if c['crew_member_id'] == crew_member_id]
-        if len(crew_conversations) > 100:
-            self.conversation_history = [c for c in self.conversation_history if c not in crew_conversations[:-100]]
+        Args:
+            crew_member_id: ID of the crew member
+            limit: Return only the most recent ``limit`` conversations
+            
+        Returns:
+            List of conversation dictionaries
+        """
+        with self._crew_lock(crew_member_id):
+            self._rehydrate_crew(crew_member_id)
+            history = self.conversation_history.get(crew_member_id, ())
+            if limit is None or limit >= len(history):
+                return list(history)
+            if limit <= 0:
+                return []
+            # Walk back from the newest entry so only ``limit`` items are touched
+            return list(islice(reversed(history), limit))[::-1]
     
     def _generate_error_response(self) -> Dict:
         """Generate a response for error cases"""
@@ -402,11 +735,14 @@ class AISpaceCompanion:
     
     def get_crew_psychological_summary(self, crew_member_id: str) -> Dict:
         """Get a psychological summary for a crew member"""
-        if crew_member_id not in self.crew_context:
-            return {'error': 'Crew member not found'}
-        
-        context = self.crew_context[crew_member_id]
-        recent_emotions = context.get('recent_emotions', [])
+        with self._crew_lock(crew_member_id):
+            self._rehydrate_crew(crew_member_id)
+            if crew_member_id not in self.crew_context:
+                return {'error': 'Crew member not found'}
+            
+            # Snapshot, so the summary is consistent while new messages arrive
+            context = dict(self.crew_context[crew_member_id])
+            recent_emotions = list(context.get('recent_emotions', []))
         
         # Analyze emotional trends
         emotion_counts = {}
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Shared audio feature extraction for voice emotion detection
+
+Every spectral feature is derived from a single STFT of the signal instead of
+each librosa feature computing its own transform.
+"""
+
+import numpy as np
+import librosa
+
+# STFT parameters matching the librosa defaults the voice model was built on
+N_FFT = 2048
+HOP_LENGTH = 512
+
+
+def magnitude_spectrogram(y):
+    """Compute the magnitude spectrogram shared by all spectral features"""
+    return np.abs(librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH))
+
+
+def extract_feature_vector(y, sr, S=None):
+    """
+    Build the 27-dim feature vector fed to the voice emotion model
+
+    Args:
+        y: Mono audio signal
+        sr: Sample rate of the signal
+        S: Optional precomputed magnitude spectrogram of ``y``
+
+    Returns:
+        13 MFCC means, spectral centroid mean, zero crossing rate mean and
+        12 chroma means
+    """
+    if S is None:
+        S = magnitude_spectrogram(y)
+    power = S ** 2
+
+    # Extract MFCC features
+    mel = librosa.feature.melspectrogram(S=power, sr=sr)
+    mfccs = librosa.feature.mfcc(S=librosa.power_to_db(mel), n_mfcc=13)
+    mfccs_mean = np.mean(mfccs, axis=1)
+
+    # Extract spectral features
+    spectral_centroids = librosa.feature.spectral_centroid(S=S, sr=sr)
+    spectral_centroids_mean = np.mean(spectral_centroids)
+
+    # Extract zero crossing rate (time domain, no transform needed)
+    zcr = librosa.feature.zero_crossing_rate(y, frame_length=N_FFT, hop_length=HOP_LENGTH)
+    zcr_mean = np.mean(zcr)
+
+    # Extract chroma features
+    chroma = librosa.feature.chroma_stft(S=power, sr=sr)
+    chroma_mean = np.mean(chroma, axis=1)
+
+    # Combine features
+    return np.concatenate([
+        mfccs_mean,
+        [spectral_centroids_mean],
+        [zcr_mean],
+        chroma_mean
+    ])
+
+
+def analyze_voice_characteristics(y, sr, S=None, return_pitch_contour=False):
+    """
+    Estimate pitch, energy and duration of a voice signal
+
+    Args:
+        y: Mono audio signal
+        sr: Sample rate of the signal
+        S: Optional precomputed magnitude spectrogram of ``y``
+        return_pitch_contour: Also return the per-frame pitch estimates
+
+    Returns:
+        Dictionary with average pitch, energy and speaking rate, plus a
+        float32 ``pitch_contour`` array (0 for unvoiced frames) if requested
+    """
+    if S is None:
+        S = magnitude_spectrogram(y)
+
+    # Calculate pitch from the strongest bin of every frame
+    pitches, magnitudes = librosa.piptrack(S=S, sr=sr)
+    strongest_bins = magnitudes.argmax(axis=0)
+    pitch_contour = pitches[strongest_bins, np.arange(pitches.shape[1])]
+    voiced_pitches = pitch_contour[pitch_contour > 0]
+
+    avg_pitch = np.mean(voiced_pitches) if voiced_pitches.size else 0
+
+    # Calculate energy
+    energy = np.sum(y**2) / len(y)
+
+    # Calculate speaking rate (approximate)
+    speaking_rate = len(y) / sr
+
+    characteristics = {
+        'average_pitch': float(avg_pitch),
+        'energy': float(energy),
+        'speaking_rate': float(speaking_rate)
+    }
+    if return_pitch_contour:
+        characteristics['pitch_contour'] = pitch_contour.astype(np.float32)
+
+    return characteristics
+
+
+def extract_voice_features(y, sr, return_pitch_contour=False):
+    """
+    Compute the model feature vector and voice characteristics in one pass
+
+    Returns:
+        (features, characteristics) tuple sharing a single STFT
+    """
+    S = magnitude_spectrogram(y)
+    features = extract_feature_vector(y, sr, S)
+    characteristics = analyze_voice_characteristics(
+        y, sr, S, return_pitch_contour=return_pitch_contour
+    )
+    return features, characteristics
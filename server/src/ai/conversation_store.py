@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Write-behind SQLite persistence for the AI companion
+
+process_message only queues its conversation and the crew member's updated
+context; a background thread writes the queue to SQLite in one transaction
+once ``max_batch`` conversations are pending, ``flush_interval`` seconds
+after the oldest pending update, on ``flush()`` and on ``close()`` (also
+registered at interpreter exit). Context updates for the same crew member
+are coalesced, so only the latest snapshot is written.
+
+Conversations go to the offline system's ``ai_conversations`` table and
+contexts to ``ai_companion_context``; both are created if missing. Updates
+still queued when the process is killed are lost, which is the trade-off for
+keeping SQLite off the message path.
+"""
+
+import atexit
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class ConversationStore:
+    """Batched background writer and lazy reader of companion state"""
+
+    def __init__(self, db_path, flush_interval=1.0, max_batch=256):
+        """
+        Open the store and start its writer thread
+
+        Args:
+            db_path: SQLite database file (e.g. the offline system's crew_monitoring.db)
+            flush_interval: Longest time an update waits in the queue, in seconds
+            max_batch: Pending conversations that trigger an immediate write
+        """
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+
+        self._condition = threading.Condition()
+        self._pending_conversations = []
+        self._pending_contexts = {}
+        self._oldest_pending = None
+        self._sequence = 0
+        self._written_sequence = 0
+        self._flush_requested = False
+        self._closed = False
+        self._writer_stopped = False
+
+        # Write statistics, useful for tuning the batch triggers
+        self.batches_written = 0
+        self.conversations_written = 0
+
+        self._init_schema()
+        self._writer = threading.Thread(target=self._run, name='conversation-store', daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _init_schema(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS ai_conversations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    crew_member_id INTEGER NOT NULL,
+                    user_message TEXT NOT NULL,
+                    ai_response TEXT NOT NULL,
+                    timestamp DATETIME NOT NULL,
+                    emotional_context TEXT,
+                    FOREIGN KEY (crew_member_id) REFERENCES crew_members(id)
+                )
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_ai_conversations_crew_member
+                ON ai_conversations(crew_member_id, id)
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS ai_companion_context (
+                    crew_member_id TEXT PRIMARY KEY,
+                    context TEXT NOT NULL,
+                    updated_at DATETIME NOT NULL
+                )
+            ''')
+            conn.commit()
+        finally:
+            conn.close()
+
+    def record_conversation(self, conversation):
+        """Queue a conversation dictionary (it must not be modified afterwards)"""
+        with self._condition:
+            if self._is_closed():
+                return
+            self._pending_conversations.append(conversation)
+            self._mark_pending()
+
+    def record_conversations(self, conversations):
+        """Queue several conversation dictionaries as one update"""
+        with self._condition:
+            if self._is_closed():
+                return
+            self._pending_conversations.extend(conversations)
+            self._mark_pending()
+
+    def record_context(self, crew_member_id, context):
+        """Queue a snapshot of a crew member's context, replacing any queued one"""
+        # Serialized now, so later changes to the live context are not written
+        snapshot = json.dumps(context, default=str)
+        with self._condition:
+            if self._is_closed():
+                return
+            self._pending_contexts[str(crew_member_id)] = snapshot
+            self._mark_pending()
+
+    def _is_closed(self):
+        """Whether the store is closed; updates arriving after close are dropped (lock held)"""
+        if self._closed:
+            logger.warning("Conversation store is closed, update not persisted")
+        return self._closed
+
+    def _mark_pending(self):
+        """Account for one queued update and wake the writer if needed (lock held)"""
+        self._sequence += 1
+        if self._oldest_pending is None:
+            self._oldest_pending = time.monotonic()
+            self._condition.notify_all()
+        elif len(self._pending_conversations) >= self.max_batch:
+            self._condition.notify_all()
+
+    def flush(self, timeout=None):
+        """
+        Write everything queued so far and wait for it
+
+        Returns:
+            True if the queued updates were written within ``timeout``
+        """
+        with self._condition:
+            if self._writer_stopped:
+                logger.error("Conversation store writer has stopped, queued updates not written")
+                return False
+            target = self._sequence
+            self._flush_requested = True
+            self._condition.notify_all()
+            self._condition.wait_for(lambda: self._written_sequence >= target or self._writer_stopped, timeout)
+            return self._written_sequence >= target
+
+    def close(self):
+        """Write the remaining updates and stop the writer thread"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+        self._writer.join()
+        atexit.unregister(self.close)
+
+    def load_crew(self, crew_member_id, max_conversations):
+        """
+        Read a crew member's persisted state
+
+        Args:
+            crew_member_id: ID of the crew member
+            max_conversations: Most recent conversations to return
+
+        Returns:
+            (context dictionary or None, list of conversations oldest first)
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            row = conn.execute(
+                'SELECT context FROM ai_companion_context WHERE crew_member_id = ?', (str(crew_member_id),)
+            ).fetchone()
+            rows = conn.execute('''
+                SELECT user_message, ai_response, timestamp, emotional_context
+                FROM ai_conversations
+                WHERE crew_member_id = ?
+                ORDER BY id DESC
+                LIMIT ?
+            ''', (crew_member_id, max_conversations)).fetchall()
+        finally:
+            conn.close()
+
+        conversations = []
+        for user_message, ai_response, timestamp, emotional_context in reversed(rows):
+            extra = json.loads(emotional_context) if emotional_context else {}
+            conversations.append({
+                'crew_member_id': crew_member_id,
+                'timestamp': timestamp,
+                'user_message': user_message,
+                'ai_response': ai_response,
+                'emotional_analysis': extra.get('emotional_analysis', {}),
+                'conversation_id': extra.get('conversation_id')
+            })
+        return (json.loads(row[0]) if row else None), conversations
+
+    def _run(self):
+        """Writer thread: run the write loop, then release anyone waiting on it"""
+        try:
+            self._write_loop()
+        except Exception as e:
+            logger.error(f"Conversation store writer stopped: {e}")
+        finally:
+            with self._condition:
+                self._writer_stopped = True
+                self._condition.notify_all()
+
+    def _write_loop(self):
+        """Writer loop: wait for a trigger, take the queue, write it"""
+        while True:
+            with self._condition:
+                while not self._should_write():
+                    timeout = None
+                    if self._oldest_pending is not None:
+                        timeout = self._oldest_pending + self.flush_interval - time.monotonic()
+                    self._condition.wait(timeout)
+
+                conversations, self._pending_conversations = self._pending_conversations, []
+                contexts, self._pending_contexts = self._pending_contexts, {}
+                sequence = self._sequence
+                self._oldest_pending = None
+                self._flush_requested = False
+                closing = self._closed
+
+            if conversations or contexts:
+                try:
+                    self._write(conversations, contexts)
+                except Exception as e:
+                    # A batch that cannot be written is dropped; the writer keeps going
+                    logger.error(f"Error persisting {len(conversations)} conversations "
+                                 f"and {len(contexts)} contexts: {e}")
+
+            with self._condition:
+                self._written_sequence = sequence
+                self._condition.notify_all()
+                if closing and self._sequence == sequence:
+                    return
+
+    def _should_write(self):
+        """Whether any flush trigger has fired (lock held)"""
+        if self._closed or self._flush_requested:
+            return True
+        if self._oldest_pending is None:
+            return False
+        return (len(self._pending_conversations) >= self.max_batch
+                or time.monotonic() - self._oldest_pending >= self.flush_interval)
+
+    def _write(self, conversations, contexts):
+        """Write one batch in a single transaction"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                conn.executemany('''
+                    INSERT INTO ai_conversations
+                    (crew_member_id, user_message, ai_response, timestamp, emotional_context)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', [
+                    (
+                        conversation['crew_member_id'],
+                        conversation['user_message'],
+                        conversation['ai_response'],
+                        conversation['timestamp'],
+                        json.dumps({
+                            'emotional_analysis': conversation['emotional_analysis'],
+                            'conversation_id': conversation['conversation_id']
+                        }, default=str)
+                    )
+                    for conversation in conversations
+                ])
+                updated_at = datetime.now().isoformat()
+                conn.executemany('''
+                    INSERT INTO ai_companion_context (crew_member_id, context, updated_at)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT(crew_member_id) DO UPDATE
+                    SET context = excluded.context, updated_at = excluded.updated_at
+                ''', [(crew_member_id, context, updated_at) for crew_member_id, context in contexts.items()])
+        finally:
+            conn.close()
+        self.batches_written += 1
+        self.conversations_written += len(conversations)
@@ -6,25 +6,46 @@ Advanced Multimodal Emotion Detection System for Space Station Crew Monitoring
 import cv2
 import numpy as np
 import librosa
-import tensorflow as tf
-from tensorflow.keras.models import load_model
 import json
 import os
 import sys
+import threading
+import socketserver
+import io
+import glob
+import time
+import argparse
+import multiprocessing
+import contextvars
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
 from datetime import datetime
 import logging
 
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from media_io import iter_audio_windows, iter_sampled_frames, load_audio_track
+from audio_features import extract_voice_features
+from face_tracking import DEFAULT_MAX_DIMENSION, FaceTracker, build_face_timelines, detect_faces
+from result_cache import ResultCache, model_file_version
+from instrumentation import PipelineInstrumentation, timed_analysis
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class MultimodalEmotionDetector:
-    def __init__(self, model_paths=None):
+    # Input shapes of the development stand-in models, per modality
+    DUMMY_INPUT_SHAPES = {
+        'facial_emotion': (48, 48, 1),
+        'voice_emotion': (27,)
+    }
+    
+    def __init__(self, model_paths=None, config=None):
         """
         Initialize the multimodal emotion detection system
         
         Args:
             model_paths: Dictionary containing paths to pre-trained models
+            config: Optional dictionary overriding runtime settings
         """
         self.model_paths = model_paths or {
             'facial_emotion': 'models/facial_emotion_model.h5',
@@ -32,6 +53,52 @@ class MultimodalEmotionDetector:
             'multimodal_fusion': 'models/multimodal_fusion_model.h5'
         }
         
+        self.config = {
+            # Worker threads for the visual and audio branches of video analysis
+            'multimodal_workers': 2,
+            # Inference backend: keras, tflite, tflite_int8 or onnx (see tools/convert-models.py)
+            'backend': os.environ.get('EMOTION_MODEL_BACKEND', 'keras'),
+            # Per-model backend overrides, e.g. {'facial_emotion': 'tflite_int8'}
+            # (tools/quantize-model.py only produces the facial model's int8 artifact)
+            'model_backends': {},
+            # Track faces across video frames instead of detecting on every frame
+            'face_tracking': True,
+            # Sampled frames between full-frame face detections while tracking
+            'face_detect_interval': 5,
+            # Longest image side face detection runs on; None (the default) keeps
+            # full resolution, since a cap loses small faces in group photos
+            'detection_max_dimension': DEFAULT_MAX_DIMENSION,
+            # Results kept in memory per content hash (0 disables the cache)
+            'result_cache_entries': 128,
+            # Optional on-disk cache tier and its size bound
+            'result_cache_dir': None,
+            'result_cache_max_bytes': 64 * 1024 * 1024,
+            # Merge concurrent predict calls into batched forward passes,
+            # waiting up to this long for a batch to fill (0 disables)
+            'inference_batch_wait_ms': float(os.environ.get('INFERENCE_BATCH_WAIT_MS', 0)),
+            'inference_batch_max_size': 32,
+            # Record per-stage timings into results and in-process histograms
+            'instrumentation': os.environ.get('EMOTION_PIPELINE_TIMINGS', '') not in ('', '0'),
+            # Periodically write the histograms here (.prom for Prometheus text, JSON otherwise)
+            'metrics_export_path': os.environ.get('EMOTION_METRICS_EXPORT'),
+            'metrics_export_interval': 60.0
+        }
+        self.config.update(config or {})
+        
+        self.instrumentation = PipelineInstrumentation('detector', enabled=self.config['instrumentation'])
+        if self.instrumentation.enabled and self.config['metrics_export_path']:
+            self.instrumentation.start_export(
+                self.config['metrics_export_path'], self.config['metrics_export_interval']
+            )
+        
+        self.result_cache = None
+        if self.config['result_cache_entries']:
+            self.result_cache = ResultCache(
+                max_entries=self.config['result_cache_entries'],
+                disk_dir=self.config['result_cache_dir'],
+                max_disk_bytes=self.config['result_cache_max_bytes']
+            )
+        
         self.emotion_labels = ['angry', 'disgust', 'fear', 'happy', 'neutral', 'sad', 'surprise']
         self.crew_stress_indicators = {
             'high_stress': ['angry', 'fear'],
@@ -41,36 +108,106 @@ class MultimodalEmotionDetector:
             'alert': ['happy', 'surprise']
         }
         
-        # Initialize models
+        # Models are loaded on first use of their modality
         self.models = {}
-        self._load_models()
+        # Models replaced by a randomly initialized dummy, whose results are not cached
+        self.dummy_models = set()
+        self._model_locks = {model_name: threading.Lock() for model_name in self.model_paths}
         
         # Initialize face detection
         self.face_cascade = cv2.CascadeClassifier(
             cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
         )
         
-    def _load_models(self):
-        """Load pre-trained emotion detection models"""
+    def preload_models(self, model_names=None):
+        """
+        Load models ahead of their first use
+        
+        Args:
+            model_names: Models to load (defaults to the facial and voice models)
+        """
+        for model_name in model_names or ['facial_emotion', 'voice_emotion']:
+            self._get_model(model_name)
+    
+    def _get_model(self, model_name):
+        """Return a model, loading it on first use (thread-safe)"""
+        model = self.models.get(model_name)
+        if model is not None:
+            return model
+        
+        with self._model_locks[model_name]:
+            # Another thread may have finished loading while we waited
+            if model_name not in self.models:
+                with self.instrumentation.stage('model_load'):
+                    model = self._load_model(model_name)
+                if self.config['inference_batch_wait_ms']:
+                    from inference import BatchingPredictor
+                    model = BatchingPredictor(
+                        model,
+                        max_batch_size=self.config['inference_batch_max_size'],
+                        max_wait_ms=self.config['inference_batch_wait_ms']
+                    )
+                self.models[model_name] = model
+            return self.models[model_name]
+    
+    def _load_model(self, model_name):
+        """Load a pre-trained emotion detection model, compiled for inference"""
+        # Inference runtimes are imported here so that startup does not pay for them
+        from inference import CompiledPredictor, backend_model_path, load_predictor
+        
+        backend = self.config['model_backends'].get(model_name, self.config['backend'])
+        model_path = backend_model_path(self.model_paths[model_name], backend)
+        if backend != 'keras' and not os.path.exists(model_path):
+            # Only missing Keras models fall back to a dummy; random weights must
+            # not stand in for an explicitly selected tflite or onnx artifact
+            raise FileNotFoundError(f"No {backend} artifact for the {model_name} model: {model_path}")
         try:
-            for model_name, model_path in self.model_paths.items():
-                if os.path.exists(model_path):
-                    self.models[model_name] = load_model(model_path)
-                    logger.info(f"Loaded {model_name} model from {model_path}")
-                else:
-                    logger.warning(f"Model file not found: {model_path}")
-                    # Create a dummy model for development
-                    self.models[model_name] = self._create_dummy_model()
+            if os.path.exists(model_path):
+                model = load_predictor(model_path, backend)
+                logger.info(f"Loaded {model_name} model from {model_path} ({backend} backend)")
+                return model
+            logger.warning(f"Model file not found: {model_path}")
         except Exception as e:
-            logger.error(f"Error loading models: {e}")
-            # Create dummy models for development
-            for model_name in self.model_paths.keys():
-                self.models[model_name] = self._create_dummy_model()
+            logger.error(f"Error loading {model_name} model: {e}")
+        
+        # Create a dummy model for development
+        self.dummy_models.add(model_name)
+        return CompiledPredictor(
+            self._create_dummy_model(self.DUMMY_INPUT_SHAPES.get(model_name, (48, 48, 1)))
+        )
+    
+    def _result_cache_key(self, file_path, analysis_type, model_name, settings=''):
+        """Cache key for analysing a file, or None if caching is off or cannot apply"""
+        if self.result_cache is None or model_name in self.dummy_models:
+            return None
+        
+        from inference import backend_model_path
+        
+        backend = self.config['model_backends'].get(model_name, self.config['backend'])
+        model_version = model_file_version(
+            backend_model_path(self.model_paths[model_name], backend), backend
+        )
+        if model_version is None:
+            return None
+        try:
+            return self.result_cache.key_for_file(file_path, analysis_type, f"{model_version}|{settings}")
+        except OSError:
+            return None
+    
+    def _cache_result(self, cache_key, result, model_name):
+        """Store a successful result under its cache key, unless it came from a dummy model"""
+        if cache_key and not result.get('error') and model_name not in self.dummy_models:
+            with self.instrumentation.stage('cache_store'):
+                self.result_cache.put(cache_key, result)
     
-    def _create_dummy_model(self):
+    def _create_dummy_model(self, input_shape):
         """Create a dummy model for development/testing"""
+        import tensorflow as tf
+        
         model = tf.keras.Sequential([
-            tf.keras.layers.Dense(128, activation='relu', input_shape=(48, 48, 1)),
+            tf.keras.layers.Input(shape=input_shape),
+            tf.keras.layers.Flatten(),
+            tf.keras.layers.Dense(128, activation='relu'),
             tf.keras.layers.Dropout(0.5),
             tf.keras.layers.Dense(64, activation='relu'),
             tf.keras.layers.Dropout(0.3),
@@ -79,6 +216,7 @@ class MultimodalEmotionDetector:
         model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
         return model
     
+    @timed_analysis
     def detect_facial_emotions(self, image_path):
         """
         Detect emotions from facial expressions in an image
@@ -90,44 +228,89 @@ class MultimodalEmotionDetector:
             Dictionary containing emotion analysis results
         """
         try:
-            # Load and preprocess image
-            image = cv2.imread(image_path)
+            # Re-submitted images are answered from the result cache
+            with self.instrumentation.stage('cache_lookup'):
+                cache_key = self._result_cache_key(
+                    image_path, 'facial', 'facial_emotion',
+                    f"max_dimension={self.config['detection_max_dimension']}"
+                )
+                cached = self.result_cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                return cached
+            
+            # Load image
+            with self.instrumentation.stage('image_decode'):
+                image = cv2.imread(image_path)
             if image is None:
                 raise ValueError(f"Could not load image from {image_path}")
             
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            result = self.detect_facial_emotions_array(image)
+            self._cache_result(cache_key, result, 'facial_emotion')
+            return result
             
-            # Detect faces
-            faces = self.face_cascade.detectMultiScale(
-                gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30)
-            )
+        except Exception as e:
+            logger.error(f"Error in facial emotion detection: {e}")
+            return self._create_empty_emotion_result()
+    
+    @timed_analysis
+    def detect_facial_emotions_array(self, image, tracker=None):
+        """
+        Detect emotions from facial expressions in an in-memory image
+        
+        Args:
+            image: BGR image as a numpy array (e.g. a decoded video frame)
+            tracker: Optional FaceTracker following faces across the frames
+                of a video; face IDs then persist from frame to frame
+            
+        Returns:
+            Dictionary containing emotion analysis results
+        """
+        try:
+            # Preprocess image
+            with self.instrumentation.stage('preprocessing'):
+                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            
+            # Detect faces, or follow the tracked ones
+            with self.instrumentation.stage('face_detection'):
+                if tracker is not None:
+                    tracked = tracker.update(gray)
+                    face_ids = [face_id for face_id, _ in tracked]
+                    faces = [box for _, box in tracked]
+                else:
+                    faces = detect_faces(self.face_cascade, gray, self.config['detection_max_dimension'])
+                    face_ids = range(len(faces))
             
             if len(faces) == 0:
                 logger.warning("No faces detected in image")
                 return self._create_empty_emotion_result()
             
-            # Process each detected face
-            face_emotions = []
-            for (x, y, w, h) in faces:
-                face_roi = gray[y:y+h, x:x+w]
-                face_resized = cv2.resize(face_roi, (48, 48))
-                
-                # Normalize and reshape for model
-                face_normalized = face_resized.astype('float32') / 255.0
-                face_input = np.expand_dims(face_normalized, axis=0)
-                face_input = np.expand_dims(face_input, axis=-1)
-                
-                # Predict emotions
-                predictions = self.models['facial_emotion'].predict(face_input, verbose=0)
-                emotion_scores = predictions[0]
+            # Crop every detected face and score them in a single forward pass
+            with self.instrumentation.stage('preprocessing'):
+                face_inputs = []
+                for (x, y, w, h) in faces:
+                    face_roi = gray[y:y+h, x:x+w]
+                    face_resized = cv2.resize(face_roi, (48, 48))
+                    
+                    # Normalize for model
+                    face_inputs.append(face_resized.astype('float32') / 255.0)
                 
+                # Stack into a (N, 48, 48, 1) batch
+                face_batch = np.expand_dims(np.stack(face_inputs), axis=-1)
+            
+            # Predict emotions
+            model = self._get_model('facial_emotion')
+            with self.instrumentation.stage('inference'):
+                predictions = model.predict(face_batch, verbose=0)
+            
+            face_emotions = []
+            for face_id, (x, y, w, h), emotion_scores in zip(face_ids, faces, predictions):
                 # Get primary emotion
                 primary_emotion_idx = np.argmax(emotion_scores)
                 primary_emotion = self.emotion_labels[primary_emotion_idx]
                 confidence = float(emotion_scores[primary_emotion_idx])
                 
                 face_emotions.append({
-                    'face_id': len(face_emotions),
+                    'face_id': int(face_id),
                     'primary_emotion': primary_emotion,
                     'confidence': confidence,
                     'all_emotions': dict(zip(self.emotion_labels, emotion_scores.tolist())),
@@ -141,25 +324,67 @@ class MultimodalEmotionDetector:
             logger.error(f"Error in facial emotion detection: {e}")
             return self._create_empty_emotion_result()
     
-    def detect_voice_emotions(self, audio_path):
+    @timed_analysis
+    def detect_voice_emotions(self, audio_path, return_pitch_contour=False):
         """
         Detect emotions from voice characteristics in an audio file
         
         Args:
             audio_path: Path to the audio file
+            return_pitch_contour: Include the per-frame float32 pitch contour
+                in the voice characteristics (not JSON serializable)
             
         Returns:
             Dictionary containing voice emotion analysis results
         """
         try:
+            # Pitch contours are numpy arrays, so those results are not cached
+            cache_key = None
+            with self.instrumentation.stage('cache_lookup'):
+                if not return_pitch_contour:
+                    cache_key = self._result_cache_key(audio_path, 'voice', 'voice_emotion')
+                cached = self.result_cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                return cached
+            
             # Load audio file
-            y, sr = librosa.load(audio_path, sr=22050)
+            with self.instrumentation.stage('audio_decode'):
+                y, sr = librosa.load(audio_path, sr=22050)
             
-            # Extract audio features
-            features = self._extract_audio_features(y, sr)
+            result = self.detect_voice_emotions_array(y, sr, return_pitch_contour)
+            self._cache_result(cache_key, result, 'voice_emotion')
+            return result
+            
+        except Exception as e:
+            logger.error(f"Error in voice emotion detection: {e}")
+            return self._create_empty_emotion_result()
+    
+    @timed_analysis
+    def detect_voice_emotions_array(self, y, sr, return_pitch_contour=False):
+        """
+        Detect emotions from voice characteristics in an in-memory signal
+        
+        Args:
+            y: Mono audio signal as a float numpy array
+            sr: Sample rate of the signal
+            return_pitch_contour: Include the per-frame float32 pitch contour
+                in the voice characteristics (not JSON serializable)
+            
+        Returns:
+            Dictionary containing voice emotion analysis results
+        """
+        try:
+            # Extract model features and voice characteristics from one STFT
+            with self.instrumentation.stage('voice_features'):
+                features, voice_analysis = extract_voice_features(
+                    y, sr, return_pitch_contour=return_pitch_contour
+                )
+            voice_analysis['voice_quality'] = 'normal'  # Could be enhanced with more sophisticated analysis
             
             # Predict emotions
-            predictions = self.models['voice_emotion'].predict(features.reshape(1, -1), verbose=0)
+            model = self._get_model('voice_emotion')
+            with self.instrumentation.stage('inference'):
+                predictions = model.predict(features.reshape(1, -1), verbose=0)
             emotion_scores = predictions[0]
             
             # Get primary emotion
@@ -167,9 +392,6 @@ class MultimodalEmotionDetector:
             primary_emotion = self.emotion_labels[primary_emotion_idx]
             confidence = float(emotion_scores[primary_emotion_idx])
             
-            # Analyze voice characteristics
-            voice_analysis = self._analyze_voice_characteristics(y, sr)
-            
             return {
                 'type': 'voice',
                 'primary_emotion': primary_emotion,
@@ -187,61 +409,115 @@ class MultimodalEmotionDetector:
             logger.error(f"Error in voice emotion detection: {e}")
             return self._create_empty_emotion_result()
     
-    def detect_multimodal_emotions(self, video_path):
+    @timed_analysis
+    def detect_voice_emotions_streaming(self, audio_path, window_seconds=5.0, hop_seconds=None):
         """
-        Detect emotions from both visual and audio components of a video
+        Detect voice emotions window by window over a long recording
+        
+        The recording is read in fixed blocks, so peak memory depends on the
+        window length and not on the recording length.
         
         Args:
-            video_path: Path to the video file
+            audio_path: Path to the audio file
+            window_seconds: Length of each analysis window
+            hop_seconds: Step between windows (defaults to window_seconds)
             
         Returns:
-            Dictionary containing multimodal emotion analysis results
+            Dictionary with a per-window emotion timeline and a
+            duration-weighted summary of the whole recording
         """
         try:
-            cap = cv2.VideoCapture(video_path)
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            
-            # Extract frames and audio
-            frames = []
-            frame_timestamps = []
-            
-            for i in range(0, frame_count, int(fps)):  # Sample every second
-                cap.set(cv2.CAP_PROP_POS_FRAMES, i)
-                ret, frame = cap.read()
-                if ret:
-                    frames.append(frame)
-                    frame_timestamps.append(i / fps)
-            
-            cap.release()
-            
-            # Analyze frames
-            frame_emotions = []
-            for frame, timestamp in zip(frames, frame_timestamps):
-                # Save temporary frame
-                temp_path = f"temp_frame_{timestamp}.jpg"
-                cv2.imwrite(temp_path, frame)
+            sr = 22050
+            timeline = []
+            weighted_scores = np.zeros(len(self.emotion_labels))
+            total_duration = 0.0
+            emotion_counts = {emotion: 0 for emotion in self.emotion_labels}
+            
+            model = self._get_model('voice_emotion')
+            windows = self.instrumentation.iterate(
+                iter_audio_windows(audio_path, sr, window_seconds, hop_seconds), 'audio_decode'
+            )
+            for start, window in windows:
+                with self.instrumentation.stage('voice_features'):
+                    features, voice_analysis = extract_voice_features(window, sr)
+                with self.instrumentation.stage('inference'):
+                    emotion_scores = model.predict(features.reshape(1, -1), verbose=0)[0]
+                
+                primary_emotion_idx = np.argmax(emotion_scores)
+                primary_emotion = self.emotion_labels[primary_emotion_idx]
+                duration = len(window) / sr
                 
-                # Analyze frame
-                frame_result = self.detect_facial_emotions(temp_path)
-                frame_result['timestamp'] = timestamp
-                frame_emotions.append(frame_result)
+                timeline.append({
+                    'start': start,
+                    'end': start + duration,
+                    'primary_emotion': primary_emotion,
+                    'confidence': float(emotion_scores[primary_emotion_idx]),
+                    'all_emotions': dict(zip(self.emotion_labels, emotion_scores.tolist())),
+                    'average_pitch': voice_analysis['average_pitch'],
+                    'energy': voice_analysis['energy']
+                })
                 
-                # Clean up
-                os.remove(temp_path)
+                # Running totals for the summary
+                weighted_scores += emotion_scores * duration
+                total_duration += duration
+                emotion_counts[primary_emotion] += 1
             
-            # Extract audio from video
-            audio_path = f"temp_audio_{datetime.now().timestamp()}.wav"
-            os.system(f"ffmpeg -i {video_path} -vn -acodec pcm_s16le -ar 22050 -ac 1 {audio_path}")
+            if not timeline:
+                raise ValueError(f"No audio read from {audio_path}")
             
-            # Analyze audio
-            audio_result = self.detect_voice_emotions(audio_path)
+            all_emotions = dict(zip(self.emotion_labels, (weighted_scores / total_duration).tolist()))
+            primary_emotion = max(all_emotions, key=all_emotions.get)
             
-            # Clean up
-            os.remove(audio_path)
+            return {
+                'type': 'voice_stream',
+                'primary_emotion': primary_emotion,
+                'confidence': float(all_emotions[primary_emotion]),
+                'all_emotions': all_emotions,
+                'emotion_distribution': {
+                    emotion: count / len(timeline) for emotion, count in emotion_counts.items()
+                },
+                'window_count': len(timeline),
+                'timeline': timeline,
+                'audio_metadata': {
+                    'window_seconds': window_seconds,
+                    'hop_seconds': hop_seconds or window_seconds,
+                    'sample_rate': sr,
+                    'channels': 1
+                }
+            }
+            
+        except Exception as e:
+            logger.error(f"Error in streaming voice emotion detection: {e}")
+            return self._create_empty_emotion_result()
+    
+    @timed_analysis
+    def detect_multimodal_emotions(self, video_path):
+        """
+        Detect emotions from both visual and audio components of a video
+        
+        Args:
+            video_path: Path to the video file
+            
+        Returns:
+            Dictionary containing multimodal emotion analysis results
+        """
+        try:
+            # The visual and audio branches are independent until fusion; each
+            # runs in a copy of this context so its stage timings land here
+            with ThreadPoolExecutor(max_workers=self.config['multimodal_workers']) as executor:
+                visual_future = executor.submit(
+                    contextvars.copy_context().run, self._analyze_video_frames, video_path
+                )
+                audio_future = executor.submit(
+                    contextvars.copy_context().run, self._analyze_video_audio, video_path
+                )
+                
+                frame_emotions = visual_future.result()
+                audio_result = audio_future.result()
             
             # Fuse multimodal results
-            fused_result = self._fuse_multimodal_results(frame_emotions, audio_result)
+            with self.instrumentation.stage('fusion'):
+                fused_result = self._fuse_multimodal_results(frame_emotions, audio_result)
             
             return fused_result
             
@@ -249,6 +525,57 @@ class MultimodalEmotionDetector:
             logger.error(f"Error in multimodal emotion detection: {e}")
             return self._create_empty_emotion_result()
     
+    def _analyze_video_frames(self, video_path):
+        """Analyze one frame per second as the video is decoded"""
+        tracker = None
+        if self.config['face_tracking']:
+            tracker = FaceTracker(
+                self.face_cascade,
+                detect_interval=self.config['face_detect_interval'],
+                max_dimension=self.config['detection_max_dimension']
+            )
+        
+        frame_emotions = []
+        for timestamp, frame in self.instrumentation.iterate(iter_sampled_frames(video_path), 'frame_decode'):
+            frame_result = self.detect_facial_emotions_array(frame, tracker=tracker)
+            frame_result['timestamp'] = timestamp
+            frame_emotions.append(frame_result)
+        
+        return frame_emotions
+    
+    def _analyze_video_audio(self, video_path):
+        """Decode the audio track straight into memory and analyze it"""
+        with self.instrumentation.stage('audio_extraction'):
+            y = load_audio_track(video_path, sr=22050)
+        return self.detect_voice_emotions_array(y, 22050)
+    
+    def analyze_file(self, file_path, analysis_type='facial'):
+        """
+        Run one analysis type on a media file and add the stress analysis
+        
+        Args:
+            file_path: Path to the media file
+            analysis_type: One of facial, voice, voice_stream, multimodal
+            
+        Returns:
+            Dictionary with emotion_analysis and stress_analysis results
+        """
+        if analysis_type == 'facial':
+            result = self.detect_facial_emotions(file_path)
+        elif analysis_type == 'voice':
+            result = self.detect_voice_emotions(file_path)
+        elif analysis_type == 'voice_stream':
+            result = self.detect_voice_emotions_streaming(file_path)
+        elif analysis_type == 'multimodal':
+            result = self.detect_multimodal_emotions(file_path)
+        else:
+            raise ValueError(f"Unknown analysis type: {analysis_type}")
+        
+        return {
+            'emotion_analysis': result,
+            'stress_analysis': self.analyze_crew_stress_levels(result)
+        }
+    
     def analyze_crew_stress_levels(self, emotion_data):
         """
         Analyze crew stress levels based on emotion data
@@ -309,60 +636,6 @@ class MultimodalEmotionDetector:
                 'analysis_confidence': 0.0
             }
     
-    def _extract_audio_features(self, y, sr):
-        """Extract audio features for emotion detection"""
-        # Extract MFCC features
-        mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
-        mfccs_mean = np.mean(mfccs, axis=1)
-        
-        # Extract spectral features
-        spectral_centroids = librosa.feature.spectral_centroid(y=y, sr=sr)
-        spectral_centroids_mean = np.mean(spectral_centroids)
-        
-        # Extract zero crossing rate
-        zcr = librosa.feature.zero_crossing_rate(y)
-        zcr_mean = np.mean(zcr)
-        
-        # Extract chroma features
-        chroma = librosa.feature.chroma_stft(y=y, sr=sr)
-        chroma_mean = np.mean(chroma, axis=1)
-        
-        # Combine features
-        features = np.concatenate([
-            mfccs_mean,
-            [spectral_centroids_mean],
-            [zcr_mean],
-            chroma_mean
-        ])
-        
-        return features
-    
-    def _analyze_voice_characteristics(self, y, sr):
-        """Analyze voice characteristics for additional context"""
-        # Calculate pitch
-        pitches, magnitudes = librosa.piptrack(y=y, sr=sr)
-        pitch_values = []
-        for t in range(pitches.shape[1]):
-            index = magnitudes[:, t].argmax()
-            pitch = pitches[index, t]
-            if pitch > 0:
-                pitch_values.append(pitch)
-        
-        avg_pitch = np.mean(pitch_values) if pitch_values else 0
-        
-        # Calculate energy
-        energy = np.sum(y**2) / len(y)
-        
-        # Calculate speaking rate (approximate)
-        speaking_rate = len(y) / sr
-        
-        return {
-            'average_pitch': float(avg_pitch),
-            'energy': float(energy),
-            'speaking_rate': float(speaking_rate),
-            'voice_quality': 'normal'  # Could be enhanced with more sophisticated analysis
-        }
-    
     def _aggregate_face_emotions(self, face_emotions):
         """Aggregate emotions from multiple faces"""
         if not face_emotions:
@@ -413,7 +686,7 @@ class MultimodalEmotionDetector:
         primary_emotion = max(combined_emotions, key=combined_emotions.get)
         confidence = combined_emotions[primary_emotion]
         
-        return {
+        result = {
             'type': 'multimodal',
             'primary_emotion': primary_emotion,
             'confidence': float(confidence),
@@ -423,6 +696,12 @@ class MultimodalEmotionDetector:
             'frame_count': len(frame_emotions),
             'audio_characteristics': audio_result.get('voice_characteristics', {})
         }
+        
+        # Face IDs only identify the same person across frames when tracked
+        if self.config['face_tracking']:
+            result['face_timelines'] = build_face_timelines(frame_emotions)
+        
+        return result
     
     def _create_empty_emotion_result(self):
         """Create empty emotion result for error cases"""
@@ -476,37 +755,302 @@ class MultimodalEmotionDetector:
         
         return recommendations
 
+class EmotionAnalysisWorker:
+    """
+    Long-lived worker serving JSON-lines analysis requests
+    
+    Each request line is a JSON object such as
+    {"id": "42", "path": "/uploads/crew.jpg", "type": "facial"} and produces
+    one response line carrying the same id, written as soon as it finishes.
+    Requests are processed concurrently, so responses may arrive out of order.
+    
+    With instrumentation enabled, {"id": "m", "metrics": "prometheus"} (or
+    "json") returns the stage timing histograms instead of an analysis.
+    """
+    
+    def __init__(self, detector=None, max_workers=4):
+        """
+        Initialize the worker
+        
+        Args:
+            detector: Detector to serve (a warm one is created by default)
+            max_workers: Number of requests processed concurrently
+        """
+        if detector is None:
+            # Requests are served concurrently, so their predictions are batched
+            detector = MultimodalEmotionDetector(config={
+                'inference_batch_wait_ms': float(os.environ.get('INFERENCE_BATCH_WAIT_MS', 2.0))
+            })
+            detector.preload_models()
+        self.detector = detector
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+    
+    def handle_request(self, line):
+        """Process one request line and return the response dictionary"""
+        request_id = None
+        try:
+            request = json.loads(line)
+            if isinstance(request, dict) and 'metrics' in request:
+                instrumentation = self.detector.instrumentation
+                if request['metrics'] == 'prometheus':
+                    metrics = instrumentation.to_prometheus()
+                else:
+                    metrics = instrumentation.summary()
+                return {'id': request.get('id'), 'metrics': metrics}
+            if not isinstance(request, dict) or 'path' not in request:
+                raise ValueError("Request must be a JSON object with a 'path' field")
+            request_id = request.get('id')
+            
+            response = self.detector.analyze_file(request['path'], request.get('type', 'facial'))
+            response['id'] = request_id
+            return response
+            
+        except Exception as e:
+            logger.error(f"Error handling worker request: {e}")
+            return {'id': request_id, 'error': str(e)}
+    
+    def serve_stream(self, input_stream, output_stream):
+        """
+        Serve requests read from a text stream until it is exhausted
+        
+        Args:
+            input_stream: Text stream of JSON request lines
+            output_stream: Text stream that receives JSON response lines
+        """
+        write_lock = threading.Lock()
+        
+        def respond(line):
+            response = self.handle_request(line)
+            with write_lock:
+                output_stream.write(json.dumps(response) + '\n')
+                output_stream.flush()
+        
+        in_flight = set()
+        for line in input_stream:
+            if not line.strip():
+                continue
+            in_flight = {future for future in in_flight if not future.done()}
+            in_flight.add(self.executor.submit(respond, line))
+        
+        # Let pending requests finish before the stream is closed
+        wait(in_flight)
+    
+    def serve_unix_socket(self, socket_path):
+        """Serve JSON-lines requests on a Unix socket, one stream per connection"""
+        worker = self
+        
+        class RequestHandler(socketserver.StreamRequestHandler):
+            def handle(self):
+                reader = io.TextIOWrapper(self.rfile, encoding='utf-8')
+                writer = io.TextIOWrapper(self.wfile, encoding='utf-8', write_through=True)
+                worker.serve_stream(reader, writer)
+        
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        
+        with socketserver.ThreadingUnixStreamServer(socket_path, RequestHandler) as server:
+            logger.info(f"Emotion analysis worker listening on {socket_path}")
+            try:
+                server.serve_forever()
+            finally:
+                os.remove(socket_path)
+
+# Analysis type chosen for each media extension in batch mode
+BATCH_ANALYSIS_TYPES = {
+    '.jpg': 'facial', '.jpeg': 'facial', '.png': 'facial', '.bmp': 'facial',
+    '.wav': 'voice', '.mp3': 'voice', '.m4a': 'voice', '.flac': 'voice', '.ogg': 'voice',
+    '.mp4': 'multimodal', '.avi': 'multimodal', '.mov': 'multimodal', '.mkv': 'multimodal'
+}
+
+# Detector of the current batch worker process, created once by the pool initializer
+_batch_detector = None
+
+def collect_media_files(source):
+    """
+    List the media files of a directory (recursively) or a glob pattern
+    
+    Returns:
+        Sorted list of paths with a known media extension
+    """
+    if os.path.isdir(source):
+        paths = [
+            os.path.join(root, name)
+            for root, _, names in os.walk(source)
+            for name in names
+        ]
+    else:
+        paths = glob.glob(source, recursive=True)
+    
+    return sorted(
+        path for path in paths
+        if os.path.isfile(path) and os.path.splitext(path)[1].lower() in BATCH_ANALYSIS_TYPES
+    )
+
+def _init_batch_worker(config):
+    """Create the per-process detector; its models load once, on first use"""
+    global _batch_detector
+    _batch_detector = MultimodalEmotionDetector(config=config)
+
+def _analyze_batch_file(file_path, analysis_type):
+    """Analyze one batch file and return its JSON-lines record"""
+    if analysis_type == 'auto':
+        analysis_type = BATCH_ANALYSIS_TYPES[os.path.splitext(file_path)[1].lower()]
+    
+    try:
+        record = {'file': file_path, 'analysis_type': analysis_type}
+        record.update(_batch_detector.analyze_file(file_path, analysis_type))
+        # The detectors catch their own errors and return an empty result
+        if _batch_record_failed(record):
+            record['error'] = f"{analysis_type} analysis failed"
+        return json.dumps(record)
+    except Exception as e:
+        return json.dumps({'file': file_path, 'analysis_type': analysis_type, 'error': str(e)})
+
+def _batch_record_failed(record):
+    """Whether a batch record is an error, raised or reported by the detector"""
+    return 'error' in record or bool(record.get('emotion_analysis', {}).get('error'))
+
+def read_completed_files(output_path):
+    """Files with a successful record in an existing JSON-lines output"""
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    
+    with open(output_path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by an interrupted run
+                continue
+            if not _batch_record_failed(record):
+                completed.add(record['file'])
+    return completed
+
+def run_batch(files, output_path, analysis_type='auto', workers=None, config=None, resume=True):
+    """
+    Analyze many files with a pool of worker processes
+    
+    Each worker builds one detector and reuses its models for every file it
+    handles. Records are appended to ``output_path`` as files finish, so an
+    interrupted run can resume and skip the files already done.
+    
+    Args:
+        files: Media file paths
+        output_path: JSON-lines file results are appended to
+        analysis_type: facial, voice, multimodal, or auto (by file extension)
+        workers: Worker processes (0 analyzes in this process)
+        config: Detector config for every worker
+        resume: Skip files that already have a successful record
+        
+    Returns:
+        Summary dictionary with counts, elapsed time and files per second
+    """
+    completed = read_completed_files(output_path) if resume else set()
+    pending = [path for path in files if path not in completed]
+    if workers is None:
+        workers = min(4, os.cpu_count() or 1)
+    
+    summary = {'total': len(files), 'skipped': len(files) - len(pending), 'processed': 0, 'failed': 0}
+    start = time.perf_counter()
+    
+    with open(output_path, 'a' if resume else 'w') as output:
+        # Terminate a record cut short by an interrupted run before appending
+        if output.tell() > 0:
+            with open(output_path, 'rb') as existing:
+                existing.seek(-1, os.SEEK_END)
+                if existing.read(1) != b'\n':
+                    output.write('\n')
+        
+        def record_result(line, done):
+            output.write(line + '\n')
+            output.flush()
+            summary['processed'] += 1
+            if _batch_record_failed(json.loads(line)):
+                summary['failed'] += 1
+            rate = done / (time.perf_counter() - start)
+            print(f"[{done}/{len(pending)}] {rate:.2f} files/s", file=sys.stderr)
+        
+        if workers == 0:
+            _init_batch_worker(config)
+            for done, path in enumerate(pending, 1):
+                record_result(_analyze_batch_file(path, analysis_type), done)
+        elif pending:
+            # Workers are spawned so that none inherits a forked TensorFlow runtime
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_batch_worker,
+                initargs=(config,)
+            ) as executor:
+                futures = [executor.submit(_analyze_batch_file, path, analysis_type) for path in pending]
+                for done, future in enumerate(as_completed(futures), 1):
+                    record_result(future.result(), done)
+    
+    summary['seconds'] = time.perf_counter() - start
+    summary['files_per_second'] = summary['processed'] / summary['seconds'] if summary['seconds'] else 0.0
+    return summary
+
+def batch_main(argv):
+    """Command line entry point of batch mode"""
+    parser = argparse.ArgumentParser(
+        prog='emotion-detector.py --batch',
+        description='Analyze a directory or glob of media files into a JSON-lines file'
+    )
+    parser.add_argument('source', help='directory (searched recursively) or glob pattern')
+    parser.add_argument('--output', default='emotion-results.jsonl', help='JSON-lines results file')
+    parser.add_argument('--type', default='auto', choices=['auto', 'facial', 'voice', 'voice_stream', 'multimodal'])
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: up to 4)')
+    parser.add_argument('--no-resume', action='store_true', help='overwrite the output instead of resuming')
+    args = parser.parse_args(argv)
+    
+    files = collect_media_files(args.source)
+    if not files:
+        print(f"No media files found in {args.source}")
+        sys.exit(1)
+    
+    summary = run_batch(files, args.output, args.type, args.workers, resume=not args.no_resume)
+    print(json.dumps(summary, indent=2))
+    if summary['failed']:
+        sys.exit(2)
+
 def main():
     """Main function for testing the emotion detection system"""
     if len(sys.argv) < 2:
         print("Usage: python emotion-detector.py <file_path> [analysis_type]")
-        print("Analysis types: facial, voice, multimodal")
+        print("       python emotion-detector.py --worker [socket_path]")
+        print("       python emotion-detector.py --batch <dir_or_glob> [--output results.jsonl] [--workers N]")
+        print("Analysis types: facial, voice, voice_stream, multimodal")
         sys.exit(1)
     
+    if sys.argv[1] == '--batch':
+        batch_main(sys.argv[2:])
+        return
+    
+    if sys.argv[1] == '--worker':
+        # Serve JSON-lines requests on stdin/stdout or on a Unix socket
+        worker = EmotionAnalysisWorker()
+        if len(sys.argv) > 2:
+            worker.serve_unix_socket(sys.argv[2])
+        else:
+            worker.serve_stream(sys.stdin, sys.stdout)
+        return
+    
     file_path = sys.argv[1]
     analysis_type = sys.argv[2] if len(sys.argv) > 2 else 'facial'
     
     detector = MultimodalEmotionDetector()
     
     try:
-        if analysis_type == 'facial':
-            result = detector.detect_facial_emotions(file_path)
-        elif analysis_type == 'voice':
-            result = detector.detect_voice_emotions(file_path)
-        elif analysis_type == 'multimodal':
-            result = detector.detect_multimodal_emotions(file_path)
-        else:
+        if analysis_type not in ('facial', 'voice', 'voice_stream', 'multimodal'):
             print(f"Unknown analysis type: {analysis_type}")
             sys.exit(1)
         
-        # Analyze stress levels
-        stress_analysis = detector.analyze_crew_stress_levels(result)
+        # Analyze emotions and stress levels
+        result = detector.analyze_file(file_path, analysis_type)
         
         # Output results
-        print(json.dumps({
-            'emotion_analysis': result,
-            'stress_analysis': stress_analysis
-        }, indent=2))
+        print(json.dumps(result, indent=2))
         
     except Exception as e:
         logger.error(f"Error in main execution: {e}")
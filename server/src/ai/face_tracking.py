@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Face detection and tracking across video frames
+
+detect_faces runs the Haar cascade on a copy of the image downscaled to a
+maximum dimension and maps the boxes back to full-resolution coordinates.
+Cascade time grows with pixel count, while faces in phone and webcam
+uploads are large enough to survive the downscale.
+
+A full-frame Haar cascade pass is the most expensive step of per-frame facial
+analysis. FaceTracker runs it only every ``detect_interval`` frames. In the
+frames between, each known face is re-detected inside a window around its
+last box, which is a small fraction of the image. When a tracked face cannot
+be found in its window, the tracker falls back to full detection on the next
+frame. Faces keep the same ID for as long as they are tracked.
+"""
+
+import cv2
+import numpy as np
+
+# Cascade parameters used for every detection pass
+SCALE_FACTOR = 1.1
+MIN_NEIGHBORS = 5
+MIN_FACE_SIZE = (30, 30)
+
+# Longest side of the image the cascade runs on by default. Downscaling is
+# opt-in: a cap such as 1280 makes 8-12 MP uploads 3-6x faster but loses
+# faces under about 1% of the image width (see bench-face-detection.py)
+DEFAULT_MAX_DIMENSION = None
+
+
+def detect_faces(face_cascade, gray, max_dimension=DEFAULT_MAX_DIMENSION,
+                 scale_factor=SCALE_FACTOR, min_neighbors=MIN_NEIGHBORS, min_size=MIN_FACE_SIZE):
+    """
+    Detect faces in a grayscale image, on a downscaled copy if it is capped
+
+    Args:
+        face_cascade: cv2.CascadeClassifier used for detection
+        gray: Grayscale image as a numpy array
+        max_dimension: Cap on the longest side the cascade sees (None or 0,
+            the default, to always detect at full resolution)
+        scale_factor: Cascade pyramid scale step
+        min_neighbors: Cascade neighbour threshold
+        min_size: Smallest face to report, in full-resolution pixels
+
+    Returns:
+        (N, 4) int array of (x, y, w, h) boxes in full-resolution coordinates
+    """
+    height, width = gray.shape[:2]
+    scale = 1.0
+    if max_dimension and max(height, width) > max_dimension:
+        scale = max_dimension / max(height, width)
+        gray = cv2.resize(gray, (max(int(width * scale), 1), max(int(height * scale), 1)),
+                          interpolation=cv2.INTER_AREA)
+
+    kwargs = {'scaleFactor': scale_factor, 'minNeighbors': min_neighbors}
+    if min_size:
+        kwargs['minSize'] = tuple(max(int(round(side * scale)), 1) for side in min_size)
+
+    faces = np.asarray(face_cascade.detectMultiScale(gray, **kwargs), dtype=np.float64).reshape(-1, 4)
+    if scale == 1.0:
+        return faces.astype(int)
+
+    # Map boxes back and keep them inside the original image
+    faces = np.round(faces / scale).astype(int)
+    faces[:, 0] = np.clip(faces[:, 0], 0, width - 1)
+    faces[:, 1] = np.clip(faces[:, 1], 0, height - 1)
+    faces[:, 2] = np.minimum(faces[:, 2], width - faces[:, 0])
+    faces[:, 3] = np.minimum(faces[:, 3], height - faces[:, 1])
+    return faces
+
+
+def box_iou(box_a, box_b):
+    """Intersection over union of two (x, y, w, h) boxes"""
+    ax, ay, aw, ah = box_a
+    bx, by, bw, bh = box_b
+    inter_w = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    inter_h = max(0, min(ay + ah, by + bh) - max(ay, by))
+    intersection = inter_w * inter_h
+    union = aw * ah + bw * bh - intersection
+    return intersection / union if union else 0.0
+
+
+class FaceTracker:
+    """Assign persistent IDs to faces while limiting full-frame detection"""
+
+    def __init__(self, face_cascade, detect_interval=5, search_margin=0.5,
+                 iou_threshold=0.3, max_missed=2, max_dimension=DEFAULT_MAX_DIMENSION):
+        """
+        Create a tracker for one video stream
+
+        Args:
+            face_cascade: cv2.CascadeClassifier used for detection
+            detect_interval: Run full-frame detection at least every N frames
+            search_margin: Re-detection window padding, as a fraction of the face size
+            iou_threshold: Minimum overlap for a detection to continue a track
+            max_missed: Full detections a face may be missing from before its track ends
+            max_dimension: Longest side full-frame detection runs on (see detect_faces)
+        """
+        self.face_cascade = face_cascade
+        self.detect_interval = max(int(detect_interval), 1)
+        self.search_margin = search_margin
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.max_dimension = max_dimension
+
+        self.tracks = {}
+        self._missed = {}
+        self._next_id = 0
+        self._frames_since_detection = 0
+        self._force_detection = True
+
+        # Detection pass counters, useful for measuring the savings
+        self.full_detections = 0
+        self.roi_detections = 0
+
+    def update(self, gray):
+        """
+        Locate the tracked faces in the next frame
+
+        Args:
+            gray: Grayscale frame as a numpy array
+
+        Returns:
+            List of (face_id, (x, y, w, h)) tuples for the faces found in
+            this frame, ordered by face ID
+        """
+        if (self._force_detection or not self.tracks
+                or self._frames_since_detection >= self.detect_interval):
+            visible = self._detect_full(gray)
+        else:
+            visible = self._follow_tracks(gray)
+
+        return sorted((face_id, self.tracks[face_id]) for face_id in visible)
+
+    def _detect_full(self, gray):
+        """Run the cascade on the whole frame and return the IDs it matched or created"""
+        self.full_detections += 1
+        self._frames_since_detection = 1
+        self._force_detection = False
+
+        detections = [tuple(int(v) for v in box)
+                      for box in detect_faces(self.face_cascade, gray, self.max_dimension)]
+
+        # Greedy matching, best overlapping (track, detection) pairs first
+        pairs = sorted(
+            ((box_iou(box, detection), face_id, index)
+             for face_id, box in self.tracks.items()
+             for index, detection in enumerate(detections)),
+            reverse=True
+        )
+        matched_tracks, matched_detections = set(), set()
+        for iou, face_id, index in pairs:
+            if iou < self.iou_threshold:
+                break
+            if face_id in matched_tracks or index in matched_detections:
+                continue
+            self.tracks[face_id] = detections[index]
+            self._missed[face_id] = 0
+            matched_tracks.add(face_id)
+            matched_detections.add(index)
+
+        for face_id in list(self.tracks):
+            if face_id not in matched_tracks:
+                self._missed[face_id] += 1
+                if self._missed[face_id] > self.max_missed:
+                    del self.tracks[face_id]
+                    del self._missed[face_id]
+
+        for index, detection in enumerate(detections):
+            if index not in matched_detections:
+                self.tracks[self._next_id] = detection
+                self._missed[self._next_id] = 0
+                matched_tracks.add(self._next_id)
+                self._next_id += 1
+
+        return matched_tracks
+
+    def _follow_tracks(self, gray):
+        """Re-detect each face near its last position and return the IDs found"""
+        self._frames_since_detection += 1
+        frame_h, frame_w = gray.shape[:2]
+
+        visible = set()
+        for face_id, (x, y, w, h) in list(self.tracks.items()):
+            pad_x, pad_y = int(w * self.search_margin), int(h * self.search_margin)
+            x0, y0 = max(x - pad_x, 0), max(y - pad_y, 0)
+            x1, y1 = min(x + w + pad_x, frame_w), min(y + h + pad_y, frame_h)
+
+            self.roi_detections += 1
+            candidates = self.face_cascade.detectMultiScale(
+                gray[y0:y1, x0:x1], scaleFactor=SCALE_FACTOR, minNeighbors=MIN_NEIGHBORS,
+                minSize=MIN_FACE_SIZE
+            )
+            if len(candidates) == 0:
+                # Lost the face: confirm with a full detection on the next frame
+                self._force_detection = True
+                continue
+
+            # Keep the candidate closest to the previous box
+            boxes = [(int(cx) + x0, int(cy) + y0, int(cw), int(ch)) for cx, cy, cw, ch in candidates]
+            self.tracks[face_id] = max(boxes, key=lambda box: box_iou(box, (x, y, w, h)))
+            visible.add(face_id)
+
+        return visible
+
+
+def build_face_timelines(frame_results):
+    """
+    Group tracked face results from sampled frames into per-face timelines
+
+    Args:
+        frame_results: Facial results carrying ``timestamp`` and ``individual_faces``
+
+    Returns:
+        Dictionary mapping face ID, as a string, to a list of timestamped
+        emotion readings
+    """
+    # String keys, so results read back from the JSON disk cache compare
+    # equal to the ones kept in memory
+    timelines = {}
+    for frame_result in frame_results:
+        for face in frame_result.get('individual_faces', []):
+            timelines.setdefault(str(face['face_id']), []).append({
+                'timestamp': frame_result.get('timestamp'),
+                'primary_emotion': face['primary_emotion'],
+                'confidence': face['confidence']
+            })
+    return timelines
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Low-overhead inference backends for the emotion models
+
+Keras ``model.predict`` builds a tf.data pipeline and callback stack on every
+call, which dominates the cost of scoring a single face or clip. The Keras
+backend here traces the model once into a graph with a fixed input signature
+and warms it up at load time, so each call only runs the forward pass.
+
+The TFLite and ONNX backends serve models exported by tools/convert-models.py
+without the full TensorFlow runtime, for CPU-only station hardware. The
+tflite_int8 backend serves the fully quantized models written by
+tools/quantize-model.py. Every backend exposes the same
+``predict(inputs, verbose=0)`` call.
+
+BatchingPredictor wraps any backend and merges concurrent calls from many
+threads or coroutines into one batched forward pass.
+"""
+
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('keras', 'tflite', 'tflite_int8', 'onnx')
+
+# Model file extension produced for each backend
+MODEL_EXTENSIONS = {
+    'keras': '.h5',
+    'tflite': '.tflite',
+    'tflite_int8': '.int8.tflite',
+    'onnx': '.onnx'
+}
+
+
+class CompiledPredictor:
+    """Drop-in replacement for ``model.predict`` backed by a traced tf.function"""
+
+    def __init__(self, model, input_shape=None, warmup=True):
+        """
+        Compile a Keras model for inference
+
+        Args:
+            model: Loaded Keras model
+            input_shape: Per-sample input shape (read from the model by default)
+            warmup: Run one dummy batch now so the first real call is fast
+        """
+        import tensorflow as tf
+
+        self.model = model
+        self.input_shape = tuple(input_shape or model.input_shape[1:])
+
+        # Variable batch size, fixed sample shape: one trace serves every call
+        self._forward = tf.function(
+            lambda inputs: model(inputs, training=False),
+            input_signature=[tf.TensorSpec(shape=(None,) + self.input_shape, dtype=tf.float32)]
+        )
+
+        if warmup:
+            self.predict(np.zeros((1,) + self.input_shape, dtype=np.float32))
+
+    def predict(self, inputs, verbose=0):
+        """
+        Score a batch of samples
+
+        Args:
+            inputs: Array of shape (batch,) + input_shape
+            verbose: Ignored, accepted for compatibility with ``model.predict``
+
+        Returns:
+            Numpy array of model outputs
+        """
+        inputs = np.asarray(inputs, dtype=np.float32).reshape((-1,) + self.input_shape)
+        return self._forward(inputs).numpy()
+
+
+class TFLitePredictor:
+    """Run a .tflite model with the standalone TFLite interpreter"""
+
+    def __init__(self, model_path, num_threads=None):
+        """
+        Load a TFLite model
+
+        Args:
+            model_path: Path to the .tflite file
+            num_threads: Interpreter threads (TFLite default if None)
+        """
+        try:
+            # The slim runtime avoids importing TensorFlow entirely
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self.input_shape = tuple(int(dim) for dim in self._input['shape'][1:])
+        self._batch_size = int(self._input['shape'][0])
+
+        # Integer-quantized models take and return int8/uint8 tensors
+        self.quantized = np.issubdtype(self._input['dtype'], np.integer)
+
+        # A TFLite interpreter must not be invoked from several threads at once
+        self._lock = threading.Lock()
+
+    def predict(self, inputs, verbose=0):
+        """Score a batch of samples (see CompiledPredictor.predict)"""
+        inputs = np.asarray(inputs, dtype=np.float32).reshape((-1,) + self.input_shape)
+
+        with self._lock:
+            if inputs.shape[0] != self._batch_size:
+                self.interpreter.resize_tensor_input(self._input['index'], inputs.shape)
+                self.interpreter.allocate_tensors()
+                self._batch_size = inputs.shape[0]
+
+            self.interpreter.set_tensor(self._input['index'], self._quantize(inputs))
+            self.interpreter.invoke()
+            return self._dequantize(self.interpreter.get_tensor(self._output['index']))
+
+    def _quantize(self, inputs):
+        """Map float inputs onto the model's integer input scale"""
+        if not self.quantized:
+            return inputs
+        scale, zero_point = self._input['quantization']
+        info = np.iinfo(self._input['dtype'])
+        quantized = np.round(inputs / scale + zero_point)
+        return np.clip(quantized, info.min, info.max).astype(self._input['dtype'])
+
+    def _dequantize(self, outputs):
+        """Convert integer outputs back to float scores"""
+        scale, zero_point = self._output['quantization']
+        if not np.issubdtype(outputs.dtype, np.integer) or not scale:
+            return outputs.copy()
+        return (outputs.astype(np.float32) - zero_point) * scale
+
+
+class ONNXPredictor:
+    """Run a .onnx model with ONNX Runtime on the CPU"""
+
+    def __init__(self, model_path, num_threads=None):
+        """
+        Load an ONNX model
+
+        Args:
+            model_path: Path to the .onnx file
+            num_threads: Intra-op threads (ONNX Runtime default if None)
+        """
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("The onnx backend requires onnxruntime (pip install onnxruntime)")
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+
+        self.session = ort.InferenceSession(
+            model_path, sess_options=options, providers=['CPUExecutionProvider']
+        )
+        model_input = self.session.get_inputs()[0]
+        self._input_name = model_input.name
+        self.input_shape = tuple(int(dim) for dim in model_input.shape[1:])
+
+    def predict(self, inputs, verbose=0):
+        """Score a batch of samples (see CompiledPredictor.predict)"""
+        inputs = np.asarray(inputs, dtype=np.float32).reshape((-1,) + self.input_shape)
+        return self.session.run(None, {self._input_name: inputs})[0]
+
+
+class BatchingPredictor:
+    """
+    Micro-batching dispatcher shared by concurrent callers of one model
+
+    Requests are queued and a dispatcher thread collects them until
+    ``max_batch_size`` samples are pending or ``max_wait_ms`` has passed since
+    the first one arrived. It then runs a single forward pass and resolves
+    each caller's future with its own rows of the output.
+    """
+
+    def __init__(self, predictor, max_batch_size=32, max_wait_ms=2.0):
+        """
+        Start a dispatcher in front of a predictor
+
+        Args:
+            predictor: Any backend exposing ``predict(inputs, verbose=0)``
+            max_batch_size: Samples per forward pass before dispatching early
+            max_wait_ms: Longest a request waits for others to join its batch
+        """
+        self.predictor = predictor
+        self.input_shape = predictor.input_shape
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        # Forward passes and samples scored, for measuring the achieved batch size
+        self.batches = 0
+        self.samples = 0
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._dispatch_loop, name='batching-predictor', daemon=True)
+        self._thread.start()
+
+    def submit(self, inputs):
+        """
+        Queue a batch of samples for scoring
+
+        Returns:
+            concurrent.futures.Future resolving to the model outputs for ``inputs``
+        """
+        inputs = np.asarray(inputs, dtype=np.float32).reshape((-1,) + self.input_shape)
+        future = Future()
+        self._queue.put((inputs, future))
+        return future
+
+    def predict(self, inputs, verbose=0):
+        """Score samples, blocking until their batch has run (see CompiledPredictor.predict)"""
+        return self.submit(inputs).result()
+
+    async def apredict(self, inputs):
+        """Score samples from a coroutine without blocking the event loop"""
+        return await asyncio.wrap_future(self.submit(inputs))
+
+    def close(self):
+        """Stop the dispatcher once queued requests are served"""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _dispatch_loop(self):
+        """Collect pending requests into batches and run them"""
+        while True:
+            request = self._queue.get()
+            if request is None:
+                return
+
+            pending = [request]
+            pending_rows = len(request[0])
+            deadline = time.monotonic() + self.max_wait
+            stop = False
+            while pending_rows < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                pending.append(request)
+                pending_rows += len(request[0])
+
+            # Claim each future so it can no longer be cancelled; callers
+            # that already gave up are dropped from the batch
+            pending = [(inputs, future) for inputs, future in pending if future.set_running_or_notify_cancel()]
+            try:
+                self._run_batch(pending)
+            except Exception as e:
+                # Never let one bad batch end the thread, or every later call hangs
+                logger.error(f"Batched prediction failed: {e}")
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+            if stop:
+                return
+
+    def _run_batch(self, pending):
+        """Run one forward pass and hand each caller its slice of the output"""
+        if not pending:
+            return
+        try:
+            outputs = self.predictor.predict(np.concatenate([inputs for inputs, _ in pending]), verbose=0)
+        except Exception as e:
+            for _, future in pending:
+                future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.samples += len(outputs)
+        start = 0
+        for inputs, future in pending:
+            future.set_result(outputs[start:start + len(inputs)])
+            start += len(inputs)
+
+
+def backend_model_path(model_path, backend):
+    """Return the artifact path of ``model_path`` for the given backend"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}")
+    return os.path.splitext(model_path)[0] + MODEL_EXTENSIONS[backend]
+
+
+def load_predictor(model_path, backend='keras'):
+    """
+    Load a model file with the requested inference backend
+
+    Args:
+        model_path: Path to the model artifact for that backend
+        backend: One of keras, tflite, tflite_int8, onnx
+
+    Returns:
+        Predictor exposing ``predict(inputs, verbose=0)``
+    """
+    if backend == 'keras':
+        from tensorflow.keras.models import load_model
+        return CompiledPredictor(load_model(model_path))
+    elif backend in ('tflite', 'tflite_int8'):
+        return TFLitePredictor(model_path)
+    elif backend == 'onnx':
+        return ONNXPredictor(model_path)
+    else:
+        raise ValueError(f"Unknown inference backend: {backend}")
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Opt-in per-stage timing for the emotion analysis pipelines
+
+Pipelines wrap each stage (decode, face detection, preprocessing, inference,
+feature extraction, storage) in ``instrumentation.stage(name)`` and mark their
+public analysis methods with ``@timed_analysis``. Every stage duration is added
+to an in-process histogram and summed into the ``timings`` block of the
+analysis it ran for. Stages of parallel branches overlap, so their sum can
+exceed ``total``.
+
+Disabled instrumentation (the default) hands out a shared no-op context
+manager, so the wrapped pipelines pay no timing or locking cost.
+
+The current collection is held in a context variable, so stages that run on
+helper threads count towards the right analysis as long as the work is
+submitted with ``contextvars.copy_context().run``.
+
+Histograms can be read with ``summary()`` (JSON), rendered in the Prometheus
+text exposition format with ``to_prometheus()``, or written to a file on a
+timer with ``start_export()``.
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds (Prometheus default-style buckets)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Stage totals of the analysis being collected in the current context
+_current_timings = contextvars.ContextVar('emotion_pipeline_timings', default=None)
+
+# Returned by disabled instrumentation; reusable and free to enter
+NULL_STAGE = nullcontext()
+
+_EXHAUSTED = object()
+
+
+def timed_analysis(method):
+    """Decorate an analysis method of an object with an ``instrumentation`` attribute"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self.instrumentation.timed(method, self, *args, **kwargs)
+    return wrapper
+
+
+class StageHistogram:
+    """Cumulative-bucket histogram of one stage's durations"""
+
+    def __init__(self):
+        self.bucket_counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.bucket_counts[i] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+
+class PipelineInstrumentation:
+    """Stage timers, per-analysis timing blocks and histograms for one pipeline"""
+
+    def __init__(self, pipeline='detector', enabled=True):
+        """
+        Args:
+            pipeline: Label distinguishing this pipeline in exported metrics
+            enabled: Record timings (False makes every hook a no-op)
+        """
+        self.pipeline = pipeline
+        self.enabled = enabled
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._export_stop = None
+
+    def stage(self, name):
+        """Context manager timing the enclosed block as stage ``name``"""
+        if not self.enabled:
+            return NULL_STAGE
+        return self._timed_stage(name)
+
+    def iterate(self, iterable, name):
+        """Yield from ``iterable``, timing each step as stage ``name`` (e.g. frame decoding)"""
+        if not self.enabled:
+            return iterable
+        return self._timed_iteration(iterable, name)
+
+    @contextmanager
+    def _timed_stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def _timed_iteration(self, iterable, name):
+        iterator = iter(iterable)
+        while True:
+            with self._timed_stage(name):
+                item = next(iterator, _EXHAUSTED)
+            if item is _EXHAUSTED:
+                return
+            yield item
+
+    def observe(self, name, seconds):
+        """Record one stage duration"""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = StageHistogram()
+            histogram.observe(seconds)
+
+            timings = _current_timings.get()
+            if timings is not None:
+                timings[name] = timings.get(name, 0.0) + seconds
+
+    def timed(self, analyze, *args, **kwargs):
+        """
+        Run an analysis and attach its per-stage ``timings`` block
+
+        Nested analyses (e.g. a file analysis calling the array analysis)
+        add to the outermost block instead of starting their own.
+
+        Returns:
+            The analysis result, with ``timings`` in seconds per stage plus
+            ``total`` when the result is a dictionary
+        """
+        if not self.enabled or _current_timings.get() is not None:
+            return analyze(*args, **kwargs)
+
+        timings = {}
+        token = _current_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            result = analyze(*args, **kwargs)
+        finally:
+            _current_timings.reset(token)
+        total = time.perf_counter() - start
+        self.observe('total', total)
+
+        if isinstance(result, dict):
+            result['timings'] = {name: round(seconds, 6) for name, seconds in timings.items()}
+            result['timings']['total'] = round(total, 6)
+        return result
+
+    def summary(self):
+        """JSON-serializable snapshot of every stage histogram"""
+        with self._lock:
+            stages = {}
+            for name, histogram in sorted(self._histograms.items()):
+                stages[name] = {
+                    'count': histogram.count,
+                    'sum_seconds': histogram.total,
+                    'mean_seconds': histogram.total / histogram.count if histogram.count else 0.0,
+                    'max_seconds': histogram.max,
+                    'buckets': {str(bound): count for bound, count in zip(BUCKETS, histogram.bucket_counts)}
+                }
+        return {'pipeline': self.pipeline, 'timestamp': time.time(), 'stages': stages}
+
+    def to_prometheus(self, metric='emotion_pipeline_stage_seconds'):
+        """Render the histograms in the Prometheus text exposition format"""
+        lines = [
+            f"# HELP {metric} Duration of emotion pipeline stages in seconds.",
+            f"# TYPE {metric} histogram"
+        ]
+        with self._lock:
+            for name, histogram in sorted(self._histograms.items()):
+                labels = f'pipeline="{self.pipeline}",stage="{name}"'
+                for bound, count in zip(BUCKETS, histogram.bucket_counts):
+                    lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f'{metric}_sum{{{labels}}} {histogram.total}')
+                lines.append(f'{metric}_count{{{labels}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def write_export(self, path):
+        """Write the metrics to ``path``: Prometheus text for .prom files, JSON otherwise"""
+        content = self.to_prometheus() if path.endswith('.prom') else json.dumps(self.summary(), indent=2)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            f.write(content)
+        # Readers such as the node_exporter textfile collector never see a partial file
+        os.replace(temp_path, path)
+
+    def start_export(self, path, interval_seconds=60.0):
+        """Rewrite the export file every ``interval_seconds`` on a daemon thread"""
+        self.stop_export()
+        stop = self._export_stop = threading.Event()
+
+        def export_loop():
+            while not stop.wait(interval_seconds):
+                try:
+                    self.write_export(path)
+                except OSError as e:
+                    logger.error(f"Error exporting pipeline metrics to {path}: {e}")
+
+        threading.Thread(target=export_loop, name='metrics-export', daemon=True).start()
+
+    def stop_export(self):
+        """Stop the periodic export, if running"""
+        if self._export_stop is not None:
+            self._export_stop.set()
+            self._export_stop = None
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Shared media decoding helpers for the emotion analysis pipelines
+"""
+
+import subprocess
+
+import cv2
+import numpy as np
+
+
+def iter_sampled_frames(video_path, interval=1.0):
+    """
+    Decode a video forward and yield one frame per sampling interval
+
+    Frames between sample points are only grabbed, never retrieved, so the
+    decoder reads the stream sequentially instead of seeking back to a
+    keyframe for every sample. Frames are yielded as soon as they are decoded
+    and nothing is buffered, so memory use does not grow with video length.
+
+    Args:
+        video_path: Path to the video file
+        interval: Seconds between sampled frames
+
+    Yields:
+        (timestamp, frame) tuples with the timestamp in seconds and the
+        frame as a BGR numpy array
+    """
+    cap = cv2.VideoCapture(video_path)
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        if not fps or fps <= 0:
+            raise ValueError(f"Could not read frame rate from {video_path}")
+
+        step = max(int(fps * interval), 1)
+        frame_index = 0
+
+        while cap.grab():
+            if frame_index % step == 0:
+                ret, frame = cap.retrieve()
+                if ret:
+                    yield frame_index / fps, frame
+            frame_index += 1
+    finally:
+        cap.release()
+
+
+def load_audio_track(media_path, sr=22050):
+    """
+    Decode the audio track of a media file into memory
+
+    ffmpeg resamples and downmixes the track and writes raw float32 PCM to a
+    pipe, so no temporary WAV file is written and the audio is decoded once.
+
+    Args:
+        media_path: Path to the audio or video file
+        sr: Target sample rate
+
+    Returns:
+        Mono float32 numpy array sampled at ``sr``
+    """
+    process = subprocess.run(_pcm_decode_command(media_path, sr), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if process.returncode != 0:
+        error = process.stderr.decode(errors='replace').strip()
+        raise RuntimeError(f"Could not decode audio from {media_path}: {error}")
+
+    return np.frombuffer(process.stdout, dtype=np.float32)
+
+
+def _pcm_decode_command(media_path, sr):
+    """ffmpeg command writing a media file's audio as mono float32 PCM to stdout"""
+    return [
+        'ffmpeg', '-nostdin', '-loglevel', 'error',
+        '-i', media_path,
+        '-vn', '-ac', '1', '-ar', str(sr),
+        '-f', 'f32le', '-acodec', 'pcm_f32le', 'pipe:1'
+    ]
+
+
+def iter_audio_windows(audio_path, sr=22050, window_seconds=5.0, hop_seconds=None,
+                       min_window_seconds=1.0):
+    """
+    Read an audio file in fixed windows without loading the whole recording
+
+    Blocks are read from disk with soundfile, downmixed to mono and resampled
+    window by window, so at most one window is held in memory at a time.
+    Formats libsndfile cannot read (e.g. .m4a, .aac) are decoded by ffmpeg
+    instead and windowed as the samples arrive on its pipe.
+
+    Args:
+        audio_path: Path to the audio file
+        sr: Target sample rate of the yielded windows
+        window_seconds: Length of each analysis window
+        hop_seconds: Step between window starts, at most window_seconds
+            (defaults to window_seconds, i.e. no overlap)
+        min_window_seconds: Drop a trailing partial window shorter than this,
+            unless it is the only window
+
+    Yields:
+        (start_seconds, window) tuples with the window as a mono float32 array
+        sampled at ``sr``
+    """
+    if hop_seconds is None:
+        hop_seconds = window_seconds
+    # Checked here rather than on first iteration, where the caller would
+    # only see the error once it starts consuming windows
+    if window_seconds <= 0:
+        raise ValueError(f"window_seconds must be positive, got {window_seconds}")
+    if not 0 < hop_seconds <= window_seconds:
+        raise ValueError(f"hop_seconds must be in (0, window_seconds], got {hop_seconds}")
+    return _iter_file_windows(audio_path, sr, window_seconds, hop_seconds, min_window_seconds)
+
+
+def _iter_file_windows(audio_path, sr, window_seconds, hop_seconds, min_window_seconds):
+    """Yield the windows of iter_audio_windows, reading blocks with soundfile when it can"""
+    import librosa
+    import soundfile as sf
+
+    try:
+        audio_file = sf.SoundFile(audio_path)
+    except RuntimeError:
+        yield from _iter_decoded_windows(audio_path, sr, window_seconds, hop_seconds, min_window_seconds)
+        return
+
+    with audio_file:
+        native_sr = audio_file.samplerate
+        window_frames = max(int(window_seconds * native_sr), 1)
+        hop_frames = max(int(hop_seconds * native_sr), 1)
+
+        start_frame = 0
+        for block in audio_file.blocks(blocksize=window_frames, overlap=window_frames - hop_frames,
+                                       dtype='float32', always_2d=True):
+            if start_frame > 0 and len(block) < min_window_seconds * native_sr:
+                break
+
+            window = block.mean(axis=1)
+            if native_sr != sr:
+                window = librosa.resample(window, orig_sr=native_sr, target_sr=sr)
+            yield start_frame / native_sr, window
+            start_frame += hop_frames
+
+
+def _iter_decoded_windows(media_path, sr, window_seconds, hop_seconds, min_window_seconds):
+    """Yield the windows of iter_audio_windows from audio streamed through ffmpeg"""
+    window_samples = max(int(window_seconds * sr), 1)
+    hop_samples = max(int(hop_seconds * sr), 1)
+
+    process = subprocess.Popen(_pcm_decode_command(media_path, sr), stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE)
+    try:
+        window = np.zeros(0, dtype=np.float32)
+        start_sample = 0
+        while True:
+            needed = window_samples - len(window)
+            data = process.stdout.read(needed * 4)
+            samples = np.frombuffer(data[:len(data) // 4 * 4], dtype=np.float32)
+            if start_sample > 0 and len(samples) == 0:
+                break
+            window = np.concatenate([window, samples])
+            if len(window) == 0 or (start_sample > 0 and len(window) < min_window_seconds * sr):
+                break
+
+            yield start_sample / sr, window
+            if len(samples) < needed:
+                break
+            window = window[hop_samples:]
+            start_sample += hop_samples
+
+        error = process.stderr.read().decode(errors='replace').strip()
+        if process.wait() != 0:
+            raise RuntimeError(f"Could not decode audio from {media_path}: {error}")
+    finally:
+        # Stops ffmpeg when the caller abandons the windows early
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+        process.stdout.close()
+        process.stderr.close()
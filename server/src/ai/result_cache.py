@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache for emotion analysis results
+
+Results are keyed by a SHA-256 of the media bytes together with the analysis
+type and a model version string, so re-submitting the same file (upload
+retries, repeated CLI calls, re-captured images) returns the stored result
+instead of re-running inference. A changed model or setting produces a new
+key rather than a stale hit.
+
+Two tiers are kept: an in-memory LRU bounded by entry count and an optional
+directory of JSON files bounded by total size. Disk hits are promoted to
+memory and evicted least recently used first.
+"""
+
+import copy
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Read size used while hashing media files
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def file_digest(file_path):
+    """SHA-256 hex digest of a file's contents, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def model_file_version(model_path, backend):
+    """
+    Version string for a model artifact
+
+    Uses the backend, path, size and modification time, so replacing the
+    model file invalidates cached results. Missing files return None: the
+    randomly initialized stand-in models differ between processes, so their
+    results must not be cached.
+    """
+    try:
+        stat = os.stat(model_path)
+    except OSError:
+        return None
+    return f"{backend}:{os.path.abspath(model_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class ResultCache:
+    """Two-tier (memory LRU + optional disk) cache of JSON-serializable results"""
+
+    def __init__(self, max_entries=128, disk_dir=None, max_disk_bytes=64 * 1024 * 1024):
+        """
+        Create a result cache
+
+        Args:
+            max_entries: Results kept in the in-memory LRU tier
+            disk_dir: Directory for the on-disk tier (None disables it)
+            max_disk_bytes: Total size the on-disk tier is trimmed to
+        """
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def key_for_file(self, file_path, analysis_type, model_version):
+        """Build the cache key for analysing ``file_path``"""
+        parts = f"{file_digest(file_path)}|{analysis_type}|{model_version}"
+        return hashlib.sha256(parts.encode()).hexdigest()
+
+    def get(self, key):
+        """
+        Look up a result
+
+        Returns:
+            A copy of the cached result, or None on a miss
+        """
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return copy.deepcopy(self._memory[key])
+
+        result = self._read_disk(key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, result)
+        return copy.deepcopy(result)
+
+    def put(self, key, result):
+        """Store a result in both tiers"""
+        result = copy.deepcopy(result)
+        with self._lock:
+            self._remember(key, result)
+        self._write_disk(key, result)
+
+    def stats(self):
+        """Hit/miss counters and tier sizes"""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': hits / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory),
+                'disk_bytes': self._disk_usage()[0] if self.disk_dir else 0
+            }
+
+    def _remember(self, key, result):
+        """Insert into the memory tier, evicting the least recently used entry"""
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _read_disk(self, key):
+        """Load a result from the disk tier and mark it recently used"""
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path) as f:
+                result = json.load(f)
+            os.utime(path)
+            return result
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable cache entry {path}: {e}")
+            return None
+
+    def _write_disk(self, key, result):
+        """Write a result to the disk tier, then trim the tier to its size bound"""
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(result, f)
+            os.replace(temp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not write cache entry {path}: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        self._evict_disk()
+
+    def _disk_usage(self):
+        """Return (total bytes, [(mtime, size, path), ...]) of the disk tier"""
+        entries = []
+        for name in os.listdir(self.disk_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.disk_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return sum(size for _, size, _ in entries), entries
+
+    def _evict_disk(self):
+        """Remove least recently used files until the tier fits its bound"""
+        total, entries = self._disk_usage()
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -7,6 +7,7 @@ This system can run independently without internet connection
 import os
 import sys
 import json
+import importlib.util
 import sqlite3
 import logging
 import threading
@@ -16,10 +17,20 @@ from typing import Dict, List, Optional, Tuple
 import cv2
 import numpy as np
 import librosa
-import tensorflow as tf
-from tensorflow.keras.models import load_model
 import queue
 import multiprocessing as mp
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+# Shared helpers live alongside the AI modules
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'ai'))
+from media_io import iter_sampled_frames, load_audio_track
+from audio_features import extract_voice_features
+from inference import BatchingPredictor, CompiledPredictor, backend_model_path, load_predictor
+from face_tracking import DEFAULT_MAX_DIMENSION, FaceTracker, build_face_timelines, detect_faces
+from result_cache import ResultCache, model_file_version
+from instrumentation import PipelineInstrumentation, timed_analysis
+from conversation_store import ConversationStore
 
 # Configure logging
 logging.basicConfig(
@@ -33,12 +44,13 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class OfflineSpaceStationSystem:
-    def __init__(self, data_dir: str = "./space_station_data"):
+    def __init__(self, data_dir: str = "./space_station_data", config: Optional[Dict] = None):
         """
         Initialize the offline space station monitoring system
         
         Args:
             data_dir: Directory to store all data and models
+            config: Optional dictionary overriding runtime settings
         """
         self.data_dir = data_dir
         self.db_path = os.path.join(data_dir, "crew_monitoring.db")
@@ -61,6 +73,42 @@ class OfflineSpaceStationSystem:
             'anxiety': 0.8,
             'isolation': 0.5
         }
+        # Pipeline settings shared with MultimodalEmotionDetector, whose config
+        # documents them; only the offline-specific ones are described here
+        self.config = {
+            'multimodal_workers': 2,
+            'backend': os.environ.get('EMOTION_MODEL_BACKEND', 'keras'),
+            'model_backends': {},
+            'face_tracking': True,
+            'face_detect_interval': 5,
+            'detection_max_dimension': DEFAULT_MAX_DIMENSION,
+            'result_cache_entries': 128,
+            # Keep cached results on disk under data_dir/cache, bounded in size
+            'result_cache_disk': True,
+            'result_cache_max_bytes': 64 * 1024 * 1024,
+            'inference_batch_wait_ms': float(os.environ.get('INFERENCE_BATCH_WAIT_MS', 0)),
+            'inference_batch_max_size': 32,
+            'instrumentation': os.environ.get('EMOTION_PIPELINE_TIMINGS', '') not in ('', '0'),
+            'metrics_export_path': os.environ.get('EMOTION_METRICS_EXPORT'),
+            'metrics_export_interval': 60.0
+        }
+        self.config.update(config or {})
+        
+        # Per-stage timings of analyze_media
+        self.instrumentation = PipelineInstrumentation('offline', enabled=self.config['instrumentation'])
+        if self.instrumentation.enabled and self.config['metrics_export_path']:
+            self.instrumentation.start_export(
+                self.config['metrics_export_path'], self.config['metrics_export_interval']
+            )
+        
+        # Cache of analysis results keyed by media content and model version
+        self.result_cache = None
+        if self.config['result_cache_entries']:
+            self.result_cache = ResultCache(
+                max_entries=self.config['result_cache_entries'],
+                disk_dir=os.path.join(data_dir, "cache") if self.config['result_cache_disk'] else None,
+                max_disk_bytes=self.config['result_cache_max_bytes']
+            )
         
         # Initialize database
         self._init_database()
@@ -194,25 +242,57 @@ class OfflineSpaceStationSystem:
         conn.commit()
         conn.close()
     
+    def _model_backend(self, model_name: str) -> str:
+        """Inference backend configured for a model"""
+        return self.config['model_backends'].get(model_name, self.config['backend'])
+    
+    def _model_path(self, model_name: str) -> str:
+        """Artifact path of a model for its configured backend"""
+        return backend_model_path(
+            os.path.join(self.models_dir, f"{model_name}_model.h5"), self._model_backend(model_name)
+        )
+    
+    def _check_model_artifacts(self):
+        """
+        Check that every model selected for a non-Keras backend has its artifact
+        
+        Only missing Keras models fall back to the dummy models; serving random
+        weights in place of a requested tflite or onnx artifact would go unnoticed,
+        so a missing one raises FileNotFoundError.
+        """
+        for model_name in ("facial_emotion", "voice_emotion"):
+            backend = self._model_backend(model_name)
+            model_path = self._model_path(model_name)
+            if backend != 'keras' and not os.path.exists(model_path):
+                raise FileNotFoundError(
+                    f"No {backend} artifact for the {model_name} model: {model_path} "
+                    f"(see tools/convert-models.py and tools/quantize-model.py)"
+                )
+    
     def _load_models(self):
         """Load pre-trained models for emotion detection"""
+        self._check_model_artifacts()
+        # Models replaced by a randomly initialized dummy, whose results are not cached
+        self.dummy_models = set()
         try:
-            # Try to load existing models
-            facial_model_path = os.path.join(self.models_dir, "facial_emotion_model.h5")
-            voice_model_path = os.path.join(self.models_dir, "voice_emotion_model.h5")
+            # Try to load existing models for their configured backends
+            facial_model_path = self._model_path("facial_emotion")
+            voice_model_path = self._model_path("voice_emotion")
             
             if os.path.exists(facial_model_path):
-                self.facial_model = load_model(facial_model_path)
+                self.facial_model = load_predictor(facial_model_path, self._model_backend("facial_emotion"))
                 logger.info("Loaded facial emotion model")
             else:
-                self.facial_model = self._create_dummy_facial_model()
+                self.facial_model = CompiledPredictor(self._create_dummy_facial_model())
+                self.dummy_models.add("facial_emotion")
                 logger.warning("Using dummy facial emotion model")
             
             if os.path.exists(voice_model_path):
-                self.voice_model = load_model(voice_model_path)
+                self.voice_model = load_predictor(voice_model_path, self._model_backend("voice_emotion"))
                 logger.info("Loaded voice emotion model")
             else:
-                self.voice_model = self._create_dummy_voice_model()
+                self.voice_model = CompiledPredictor(self._create_dummy_voice_model())
+                self.dummy_models.add("voice_emotion")
                 logger.warning("Using dummy voice emotion model")
             
             # Initialize face detection
@@ -222,13 +302,27 @@ class OfflineSpaceStationSystem:
             
         except Exception as e:
             logger.error(f"Error loading models: {e}")
-            self.facial_model = self._create_dummy_facial_model()
-            self.voice_model = self._create_dummy_voice_model()
+            self.facial_model = CompiledPredictor(self._create_dummy_facial_model())
+            self.voice_model = CompiledPredictor(self._create_dummy_voice_model())
+            self.dummy_models.update(["facial_emotion", "voice_emotion"])
+        
+        # Share each model between concurrent analyses through a batching queue
+        if self.config['inference_batch_wait_ms']:
+            self.facial_model = BatchingPredictor(
+                self.facial_model, self.config['inference_batch_max_size'], self.config['inference_batch_wait_ms']
+            )
+            self.voice_model = BatchingPredictor(
+                self.voice_model, self.config['inference_batch_max_size'], self.config['inference_batch_wait_ms']
+            )
     
     def _create_dummy_facial_model(self):
         """Create a dummy facial emotion model for development"""
+        import tensorflow as tf
+        
         model = tf.keras.Sequential([
-            tf.keras.layers.Dense(128, activation='relu', input_shape=(48, 48, 1)),
+            tf.keras.layers.Input(shape=(48, 48, 1)),
+            tf.keras.layers.Flatten(),
+            tf.keras.layers.Dense(128, activation='relu'),
             tf.keras.layers.Dropout(0.5),
             tf.keras.layers.Dense(64, activation='relu'),
             tf.keras.layers.Dropout(0.3),
@@ -239,8 +333,10 @@ class OfflineSpaceStationSystem:
     
     def _create_dummy_voice_model(self):
         """Create a dummy voice emotion model for development"""
+        import tensorflow as tf
+        
         model = tf.keras.Sequential([
-            tf.keras.layers.Dense(128, activation='relu', input_shape=(26,)),
+            tf.keras.layers.Dense(128, activation='relu', input_shape=(27,)),
             tf.keras.layers.Dropout(0.5),
             tf.keras.layers.Dense(64, activation='relu'),
             tf.keras.layers.Dropout(0.3),
@@ -252,11 +348,14 @@ class OfflineSpaceStationSystem:
     def _init_ai_companion(self):
         """Initialize the AI companion system"""
         try:
-            # Import the AI companion module
-            sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'ai'))
-            from ai_companion import AISpaceCompanion
+            # Import the AI companion module (its file name is not importable directly)
+            ai_dir = os.path.join(os.path.dirname(__file__), '..', 'ai')
+            spec = importlib.util.spec_from_file_location('ai_companion', os.path.join(ai_dir, 'ai-companion.py'))
+            ai_companion = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(ai_companion)
             
-            self.ai_companion = AISpaceCompanion()
+            # Conversations and crew context are written behind to the monitoring database
+            self.ai_companion = ai_companion.AISpaceCompanion(conversation_store=ConversationStore(self.db_path))
             logger.info("AI companion system initialized")
         except Exception as e:
             logger.error(f"Error initializing AI companion: {e}")
@@ -308,6 +407,7 @@ class OfflineSpaceStationSystem:
             logger.error(f"Error stopping monitoring: {e}")
             return False
     
+    @timed_analysis
     def analyze_media(self, file_path: str, crew_member_id: int, 
                      analysis_type: str = "auto") -> Dict:
         """
@@ -319,7 +419,8 @@ class OfflineSpaceStationSystem:
             analysis_type: Type of analysis (facial, voice, auto)
             
         Returns:
-            Dictionary containing analysis results
+            Dictionary containing analysis results, with a per-stage
+            ``timings`` block when instrumentation is enabled
         """
         try:
             # Determine analysis type based on file extension
@@ -334,18 +435,31 @@ class OfflineSpaceStationSystem:
                 else:
                     return {"error": "Unsupported file type"}
             
-            # Perform analysis based on type
-            if analysis_type == "facial":
-                result = self._analyze_facial_emotion(file_path)
-            elif analysis_type == "voice":
-                result = self._analyze_voice_emotion(file_path)
-            elif analysis_type == "multimodal":
-                result = self._analyze_multimodal_emotion(file_path)
-            else:
+            if analysis_type not in ("facial", "voice", "multimodal"):
                 return {"error": "Invalid analysis type"}
             
+            # Re-submitted media is answered from the result cache; the
+            # per-crew storage and alerting below still run every time
+            with self.instrumentation.stage("cache_lookup"):
+                cache_key = self._result_cache_key(file_path, analysis_type)
+                result = self.result_cache.get(cache_key) if cache_key else None
+            
+            if result is None:
+                # Perform analysis based on type
+                if analysis_type == "facial":
+                    result = self._analyze_facial_emotion(file_path)
+                elif analysis_type == "voice":
+                    result = self._analyze_voice_emotion(file_path)
+                else:
+                    result = self._analyze_multimodal_emotion(file_path)
+                
+                if cache_key and not result.get("error"):
+                    with self.instrumentation.stage("cache_store"):
+                        self.result_cache.put(cache_key, result)
+            
             # Store results in database
-            self._store_analysis_result(crew_member_id, result, file_path)
+            with self.instrumentation.stage("sqlite_write"):
+                self._store_analysis_result(crew_member_id, result, file_path)
             
             # Check for critical issues
             critical_issues = self._check_critical_issues(crew_member_id, result)
@@ -365,36 +479,87 @@ class OfflineSpaceStationSystem:
             logger.error(f"Error analyzing media: {e}")
             return {"error": str(e)}
     
+    def _result_cache_key(self, file_path: str, analysis_type: str) -> Optional[str]:
+        """Cache key for analysing a file, or None if caching is off or cannot apply"""
+        if self.result_cache is None:
+            return None
+        
+        model_names = {
+            "facial": ["facial_emotion"],
+            "voice": ["voice_emotion"],
+            "multimodal": ["facial_emotion", "voice_emotion"]
+        }[analysis_type]
+        # Dummy models get new random weights in every process, so a result
+        # from one must never be served again, least of all from disk
+        if self.dummy_models.intersection(model_names):
+            return None
+        model_versions = [model_file_version(self._model_path(name), self._model_backend(name))
+                          for name in model_names]
+        if None in model_versions:
+            return None
+        model_version = "|".join(model_versions)
+        settings = f"max_dimension={self.config['detection_max_dimension']}"
+        try:
+            return self.result_cache.key_for_file(file_path, analysis_type, f"{model_version}|{settings}")
+        except OSError:
+            return None
+    
     def _analyze_facial_emotion(self, image_path: str) -> Dict:
         """Analyze facial emotions in an image"""
         try:
-            # Load and preprocess image
-            image = cv2.imread(image_path)
+            # Load image
+            with self.instrumentation.stage("image_decode"):
+                image = cv2.imread(image_path)
             if image is None:
                 raise ValueError(f"Could not load image: {image_path}")
             
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            return self._analyze_facial_emotion_array(image)
             
-            # Detect faces
-            faces = self.face_cascade.detectMultiScale(
-                gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30)
-            )
+        except Exception as e:
+            logger.error(f"Error in facial emotion analysis: {e}")
+            return self._create_empty_emotion_result("facial")
+    
+    def _analyze_facial_emotion_array(self, image: np.ndarray, tracker: Optional[FaceTracker] = None) -> Dict:
+        """
+        Analyze facial emotions in an in-memory BGR image or video frame
+        
+        Args:
+            image: BGR image as a numpy array
+            tracker: Optional FaceTracker following faces across the frames of
+                a video; every tracked face is then scored and reported under
+                individual_faces with its persistent ID
+        """
+        try:
+            # Preprocess image
+            with self.instrumentation.stage("preprocessing"):
+                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            
+            # Detect faces (on a downscaled copy if capped), or follow the tracked ones
+            with self.instrumentation.stage("face_detection"):
+                if tracker is not None:
+                    tracked = tracker.update(gray)
+                    face_ids = [face_id for face_id, _ in tracked]
+                    faces = [box for _, box in tracked]
+                else:
+                    faces = detect_faces(self.face_cascade, gray, self.config['detection_max_dimension'])
             
             if len(faces) == 0:
                 return self._create_empty_emotion_result("facial")
             
-            # Process first detected face
-            x, y, w, h = faces[0]
-            face_roi = gray[y:y+h, x:x+w]
-            face_resized = cv2.resize(face_roi, (48, 48))
-            
-            # Normalize and reshape for model
-            face_normalized = face_resized.astype('float32') / 255.0
-            face_input = np.expand_dims(face_normalized, axis=0)
-            face_input = np.expand_dims(face_input, axis=-1)
+            # Images are scored on their first face, tracked frames on every face
+            scored_faces = faces if tracker is not None else faces[:1]
+            with self.instrumentation.stage("preprocessing"):
+                face_inputs = []
+                for (x, y, w, h) in scored_faces:
+                    face_resized = cv2.resize(gray[y:y+h, x:x+w], (48, 48))
+                    face_inputs.append(face_resized.astype('float32') / 255.0)
+                
+                # Stack into a (N, 48, 48, 1) batch
+                face_input = np.expand_dims(np.stack(face_inputs), axis=-1)
             
             # Predict emotions
-            predictions = self.facial_model.predict(face_input, verbose=0)
+            with self.instrumentation.stage("inference"):
+                predictions = self.facial_model.predict(face_input, verbose=0)
             emotion_scores = predictions[0]
             
             # Get primary emotion
@@ -402,8 +567,9 @@ class OfflineSpaceStationSystem:
             primary_emotion_idx = np.argmax(emotion_scores)
             primary_emotion = emotion_labels[primary_emotion_idx]
             confidence = float(emotion_scores[primary_emotion_idx])
+            x, y, w, h = scored_faces[0]
             
-            return {
+            result = {
                 "type": "facial",
                 "primary_emotion": primary_emotion,
                 "confidence": confidence,
@@ -412,6 +578,20 @@ class OfflineSpaceStationSystem:
                 "face_region": {"x": int(x), "y": int(y), "w": int(w), "h": int(h)}
             }
             
+            if tracker is not None:
+                result["individual_faces"] = [
+                    {
+                        "face_id": int(face_id),
+                        "primary_emotion": emotion_labels[int(np.argmax(scores))],
+                        "confidence": float(np.max(scores)),
+                        "emotion_scores": dict(zip(emotion_labels, scores.tolist())),
+                        "face_region": {"x": int(fx), "y": int(fy), "w": int(fw), "h": int(fh)}
+                    }
+                    for face_id, (fx, fy, fw, fh), scores in zip(face_ids, scored_faces, predictions)
+                ]
+            
+            return result
+            
         except Exception as e:
             logger.error(f"Error in facial emotion analysis: {e}")
             return self._create_empty_emotion_result("facial")
@@ -420,13 +600,25 @@ class OfflineSpaceStationSystem:
         """Analyze voice emotions in an audio file"""
         try:
             # Load audio file
-            y, sr = librosa.load(audio_path, sr=22050)
+            with self.instrumentation.stage("audio_decode"):
+                y, sr = librosa.load(audio_path, sr=22050)
             
-            # Extract audio features
-            features = self._extract_audio_features(y, sr)
+            return self._analyze_voice_emotion_array(y, sr)
+            
+        except Exception as e:
+            logger.error(f"Error in voice emotion analysis: {e}")
+            return self._create_empty_emotion_result("voice")
+    
+    def _analyze_voice_emotion_array(self, y: np.ndarray, sr: int) -> Dict:
+        """Analyze voice emotions in an in-memory mono audio signal"""
+        try:
+            # Extract model features and voice characteristics from one STFT
+            with self.instrumentation.stage("voice_features"):
+                features, voice_analysis = extract_voice_features(y, sr)
             
             # Predict emotions
-            predictions = self.voice_model.predict(features.reshape(1, -1), verbose=0)
+            with self.instrumentation.stage("inference"):
+                predictions = self.voice_model.predict(features.reshape(1, -1), verbose=0)
             emotion_scores = predictions[0]
             
             # Get primary emotion
@@ -435,9 +627,6 @@ class OfflineSpaceStationSystem:
             primary_emotion = emotion_labels[primary_emotion_idx]
             confidence = float(emotion_scores[primary_emotion_idx])
             
-            # Analyze voice characteristics
-            voice_analysis = self._analyze_voice_characteristics(y, sr)
-            
             return {
                 "type": "voice",
                 "primary_emotion": primary_emotion,
@@ -458,104 +647,50 @@ class OfflineSpaceStationSystem:
     def _analyze_multimodal_emotion(self, video_path: str) -> Dict:
         """Analyze emotions from video (both visual and audio)"""
         try:
-            # Extract frames from video
-            cap = cv2.VideoCapture(video_path)
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            
-            # Sample frames for analysis
-            frames = []
-            for i in range(0, frame_count, int(fps)):  # Sample every second
-                cap.set(cv2.CAP_PROP_POS_FRAMES, i)
-                ret, frame = cap.read()
-                if ret:
-                    frames.append(frame)
-            
-            cap.release()
-            
-            # Analyze frames
-            frame_emotions = []
-            for frame in frames:
-                # Save temporary frame
-                temp_path = f"temp_frame_{datetime.now().timestamp()}.jpg"
-                cv2.imwrite(temp_path, frame)
-                
-                # Analyze frame
-                frame_result = self._analyze_facial_emotion(temp_path)
-                frame_emotions.append(frame_result)
+            # Branches run as in MultimodalEmotionDetector.detect_multimodal_emotions
+            with ThreadPoolExecutor(max_workers=self.config['multimodal_workers']) as executor:
+                visual_future = executor.submit(
+                    contextvars.copy_context().run, self._analyze_video_frames, video_path
+                )
+                audio_future = executor.submit(
+                    contextvars.copy_context().run, self._analyze_video_audio, video_path
+                )
                 
-                # Clean up
-                os.remove(temp_path)
-            
-            # Extract audio from video
-            audio_path = f"temp_audio_{datetime.now().timestamp()}.wav"
-            os.system(f"ffmpeg -i {video_path} -vn -acodec pcm_s16le -ar 22050 -ac 1 {audio_path}")
-            
-            # Analyze audio
-            audio_result = self._analyze_voice_emotion(audio_path)
-            
-            # Clean up
-            os.remove(audio_path)
+                frame_emotions = visual_future.result()
+                audio_result = audio_future.result()
             
             # Fuse results
-            return self._fuse_multimodal_results(frame_emotions, audio_result)
+            with self.instrumentation.stage("fusion"):
+                return self._fuse_multimodal_results(frame_emotions, audio_result)
             
         except Exception as e:
             logger.error(f"Error in multimodal emotion analysis: {e}")
             return self._create_empty_emotion_result("multimodal")
     
-    def _extract_audio_features(self, y, sr):
-        """Extract audio features for emotion detection"""
-        # Extract MFCC features
-        mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
-        mfccs_mean = np.mean(mfccs, axis=1)
-        
-        # Extract spectral features
-        spectral_centroids = librosa.feature.spectral_centroid(y=y, sr=sr)
-        spectral_centroids_mean = np.mean(spectral_centroids)
-        
-        # Extract zero crossing rate
-        zcr = librosa.feature.zero_crossing_rate(y)
-        zcr_mean = np.mean(zcr)
-        
-        # Extract chroma features
-        chroma = librosa.feature.chroma_stft(y=y, sr=sr)
-        chroma_mean = np.mean(chroma, axis=1)
-        
-        # Combine features
-        features = np.concatenate([
-            mfccs_mean,
-            [spectral_centroids_mean],
-            [zcr_mean],
-            chroma_mean
-        ])
-        
-        return features
-    
-    def _analyze_voice_characteristics(self, y, sr):
-        """Analyze voice characteristics"""
-        # Calculate pitch
-        pitches, magnitudes = librosa.piptrack(y=y, sr=sr)
-        pitch_values = []
-        for t in range(pitches.shape[1]):
-            index = magnitudes[:, t].argmax()
-            pitch = pitches[index, t]
-            if pitch > 0:
-                pitch_values.append(pitch)
-        
-        avg_pitch = np.mean(pitch_values) if pitch_values else 0
-        
-        # Calculate energy
-        energy = np.sum(y**2) / len(y)
+    def _analyze_video_frames(self, video_path: str) -> List[Dict]:
+        """Analyze one frame per second as the video is decoded"""
+        # Follow faces between periodic full-frame detections, keeping their IDs
+        tracker = None
+        if self.config['face_tracking']:
+            tracker = FaceTracker(
+                self.face_cascade,
+                detect_interval=self.config['face_detect_interval'],
+                max_dimension=self.config['detection_max_dimension']
+            )
         
-        # Calculate speaking rate
-        speaking_rate = len(y) / sr
+        frame_emotions = []
+        for timestamp, frame in self.instrumentation.iterate(iter_sampled_frames(video_path), "frame_decode"):
+            frame_result = self._analyze_facial_emotion_array(frame, tracker=tracker)
+            frame_result["timestamp"] = timestamp
+            frame_emotions.append(frame_result)
         
-        return {
-            "average_pitch": float(avg_pitch),
-            "energy": float(energy),
-            "speaking_rate": float(speaking_rate)
-        }
+        return frame_emotions
+    
+    def _analyze_video_audio(self, video_path: str) -> Dict:
+        """Decode the audio track straight into memory and analyze it"""
+        with self.instrumentation.stage("audio_extraction"):
+            y = load_audio_track(video_path, sr=22050)
+        return self._analyze_voice_emotion_array(y, 22050)
     
     def _fuse_multimodal_results(self, frame_emotions, audio_result):
         """Fuse results from multiple modalities"""
@@ -583,7 +718,7 @@ class OfflineSpaceStationSystem:
         primary_emotion = max(combined_emotions, key=combined_emotions.get)
         confidence = combined_emotions[primary_emotion]
         
-        return {
+        result = {
             "type": "multimodal",
             "primary_emotion": primary_emotion,
             "confidence": float(confidence),
@@ -593,6 +728,12 @@ class OfflineSpaceStationSystem:
             "frame_count": len(frame_emotions),
             "audio_characteristics": audio_result.get('voice_characteristics', {})
         }
+        
+        # Face IDs only identify the same person across frames when tracked
+        if self.config['face_tracking']:
+            result["face_timelines"] = build_face_timelines(frame_emotions)
+        
+        return result
     
     def _create_empty_emotion_result(self, analysis_type: str) -> Dict:
         """Create empty emotion result for error cases"""
@@ -662,7 +803,8 @@ class OfflineSpaceStationSystem:
         
         # Store critical issues in database
         if critical_issues:
-            self._store_critical_issues(critical_issues)
+            with self.instrumentation.stage("sqlite_write"):
+                self._store_critical_issues(critical_issues)
         
         return critical_issues
     
@@ -4,6 +4,8 @@ Test Suite for MAITRI Space Station AI/ML Components
 """
 
 import unittest
+import asyncio
+import threading
 import sys
 import os
 import json
@@ -12,10 +14,61 @@ import numpy as np
 import cv2
 import librosa
 import tensorflow as tf
+import importlib.util
 from unittest.mock import Mock, patch, MagicMock
 
 # Add the src directory to the path
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+SRC_DIR = os.path.join(os.path.dirname(__file__), '..', 'src')
+sys.path.append(SRC_DIR)
+
+def load_source_module(module_name, relative_path):
+    """Load a source file with a hyphenated name (e.g. ai/emotion-detector.py)"""
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(SRC_DIR, relative_path))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def load_offline_system():
+    """Load standalone/offline-system.py without its module-level log file handler"""
+    with patch('logging.basicConfig'), patch('logging.FileHandler'):
+        return load_source_module('offline_system', 'standalone/offline-system.py')
+
+def create_test_image(path, size=100):
+    """Write a square test image with a drawn face, scaled to ``size`` pixels"""
+    # Create a simple test image
+    img = np.zeros((size, size, 3), dtype=np.uint8)
+    scale = size / 100
+    point = lambda x, y: (int(x * scale), int(y * scale))
+    # Draw a simple face
+    cv2.circle(img, point(50, 50), int(30 * scale), (255, 255, 255), -1)  # Face
+    cv2.circle(img, point(40, 45), int(5 * scale), (0, 0, 0), -1)        # Left eye
+    cv2.circle(img, point(60, 45), int(5 * scale), (0, 0, 0), -1)        # Right eye
+    cv2.ellipse(img, point(50, 60), point(10, 5), 0, 0, 180, (0, 0, 0), max(int(2 * scale), 1))  # Mouth
+    
+    cv2.imwrite(path, img)
+    return path
+
+def create_test_audio(path, duration=2.0, sample_rate=22050, frequency=440):
+    """Write a sine tone (A4 by default) as a WAV file"""
+    import soundfile as sf
+    t = np.linspace(0, duration, int(sample_rate * duration))
+    audio = np.sin(2 * np.pi * frequency * t)
+    
+    sf.write(path, audio, sample_rate)
+    return path
+
+def create_test_video(path, frames=10, size=100, fps=1.0):
+    """Write a video of frames with a gradually changing colour"""
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    out = cv2.VideoWriter(path, fourcc, fps, (size, size))
+    
+    for i in range(frames):
+        frame = np.zeros((size, size, 3), dtype=np.uint8)
+        frame[:, :] = (i * 25 % 256, i * 25 % 256, i * 25 % 256)  # Gradually changing color
+        out.write(frame)
+    
+    out.release()
+    return path
 
 class TestEmotionDetector(unittest.TestCase):
     """Test cases for the emotion detection system"""
@@ -37,49 +90,19 @@ class TestEmotionDetector(unittest.TestCase):
     
     def _create_test_image(self):
         """Create a test image with a face"""
-        # Create a simple test image
-        img = np.zeros((100, 100, 3), dtype=np.uint8)
-        # Draw a simple face
-        cv2.circle(img, (50, 50), 30, (255, 255, 255), -1)  # Face
-        cv2.circle(img, (40, 45), 5, (0, 0, 0), -1)        # Left eye
-        cv2.circle(img, (60, 45), 5, (0, 0, 0), -1)        # Right eye
-        cv2.ellipse(img, (50, 60), (10, 5), 0, 0, 180, (0, 0, 0), 2)  # Mouth
-        
-        # Save to temporary file
         temp_file = tempfile.NamedTemporaryFile(suffix='.jpg', delete=False)
-        cv2.imwrite(temp_file.name, img)
         temp_file.close()
-        return temp_file.name
+        return create_test_image(temp_file.name)
     
     def _create_test_audio(self):
         """Create a test audio file"""
-        # Generate a simple sine wave
-        duration = 2.0
-        sample_rate = 22050
-        frequency = 440  # A4 note
-        t = np.linspace(0, duration, int(sample_rate * duration))
-        audio = np.sin(2 * np.pi * frequency * t)
-        
-        # Save to temporary file
         temp_file = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-        import soundfile as sf
-        sf.write(temp_file.name, audio, sample_rate)
         temp_file.close()
-        return temp_file.name
+        return create_test_audio(temp_file.name)
     
     def _create_test_video(self):
         """Create a test video file"""
-        # Create a simple video with frames
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter('temp_video.mp4', fourcc, 1.0, (100, 100))
-        
-        for i in range(10):
-            frame = np.zeros((100, 100, 3), dtype=np.uint8)
-            frame[:, :] = (i * 25, i * 25, i * 25)  # Gradually changing color
-            out.write(frame)
-        
-        out.release()
-        return 'temp_video.mp4'
+        return create_test_video('temp_video.mp4')
     
     @patch('src.ai.emotion-detector.MultimodalEmotionDetector')
     def test_facial_emotion_detection(self, mock_detector):
@@ -219,6 +242,704 @@ class TestEmotionDetector(unittest.TestCase):
         emotion_scores = valid_result['emotion_scores']
         total_score = sum(emotion_scores.values())
         self.assertAlmostEqual(total_score, 1.0, places=2)
+    
+    def _create_detector(self):
+        """Create a real detector (models are only loaded on first use)"""
+        emotion_detector = load_source_module('emotion_detector', 'ai/emotion-detector.py')
+        return emotion_detector.MultimodalEmotionDetector()
+    
+    def test_models_load_lazily_per_modality(self):
+        """Test that only the model of the requested modality is loaded, once"""
+        detector = self._create_detector()
+        self.assertEqual(detector.models, {})
+        
+        voice_model = Mock()
+        with patch.object(detector, '_load_model', return_value=voice_model) as mock_load:
+            threads = [
+                threading.Thread(target=detector._get_model, args=('voice_emotion',))
+                for _ in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        
+        mock_load.assert_called_once_with('voice_emotion')
+        self.assertEqual(detector.models, {'voice_emotion': voice_model})
+    
+    def test_worker_serves_json_lines_concurrently(self):
+        """Test that the worker answers JSON-lines requests concurrently by id"""
+        import io
+        emotion_detector = load_source_module('emotion_detector', 'ai/emotion-detector.py')
+        both_in_flight = threading.Barrier(2, timeout=5)
+        
+        def analyze_file(path, analysis_type):
+            if analysis_type == 'unknown':
+                raise ValueError(f"Unknown analysis type: {analysis_type}")
+            both_in_flight.wait()
+            return {'emotion_analysis': {'type': analysis_type, 'path': path}, 'stress_analysis': {}}
+        
+        detector = Mock()
+        detector.analyze_file.side_effect = analyze_file
+        worker = emotion_detector.EmotionAnalysisWorker(detector, max_workers=4)
+        
+        requests = io.StringIO(
+            '{"id": "a", "path": "crew.jpg", "type": "facial"}\n'
+            '{"id": "b", "path": "crew.wav", "type": "voice"}\n'
+            'not json\n'
+            '{"id": "c", "path": "crew.bin", "type": "unknown"}\n'
+        )
+        responses = io.StringIO()
+        worker.serve_stream(requests, responses)
+        
+        results = [json.loads(line) for line in responses.getvalue().splitlines()]
+        by_id = {result['id']: result for result in results}
+        self.assertEqual(len(results), 4)
+        self.assertEqual(by_id['a']['emotion_analysis'], {'type': 'facial', 'path': 'crew.jpg'})
+        self.assertEqual(by_id['b']['emotion_analysis']['type'], 'voice')
+        self.assertIn('error', by_id[None])
+        self.assertIn('Unknown analysis type', by_id['c']['error'])
+    
+    def test_compiled_predictor_matches_keras_predict(self):
+        """Test that the compiled inference wrapper matches model.predict"""
+        inference = load_source_module('inference', 'ai/inference.py')
+        model = tf.keras.Sequential([
+            tf.keras.layers.Input(shape=(48, 48, 1)),
+            tf.keras.layers.Flatten(),
+            tf.keras.layers.Dense(7, activation='softmax')
+        ])
+        compiled = inference.CompiledPredictor(model)
+        
+        for batch_size in (1, 3):
+            batch = np.random.rand(batch_size, 48, 48, 1).astype(np.float32)
+            np.testing.assert_allclose(
+                compiled.predict(batch, verbose=0), model.predict(batch, verbose=0), atol=1e-6
+            )
+        self.assertEqual(compiled.input_shape, (48, 48, 1))
+    
+    def test_batching_predictor_merges_concurrent_calls(self):
+        """Test that concurrent callers share forward passes and get their own rows back"""
+        inference = load_source_module('inference', 'ai/inference.py')
+        backend = Mock()
+        backend.input_shape = (27,)
+        backend.predict.side_effect = lambda batch, verbose=0: batch[:, :7] * 2
+        batcher = inference.BatchingPredictor(backend, max_batch_size=64, max_wait_ms=50)
+        
+        requests = [np.full((1 + i % 3, 27), i, dtype=np.float32) for i in range(12)]
+        results = [None] * len(requests)
+        start = threading.Barrier(len(requests))
+        
+        def caller(index):
+            start.wait()
+            results[index] = batcher.predict(requests[index])
+        
+        threads = [threading.Thread(target=caller, args=(i,)) for i in range(len(requests))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        for request, result in zip(requests, results):
+            np.testing.assert_array_equal(result, request[:, :7] * 2)
+        self.assertLess(backend.predict.call_count, len(requests))
+        self.assertEqual(batcher.samples, sum(len(request) for request in requests))
+        
+        async def score_concurrently():
+            return await asyncio.gather(*(batcher.apredict(request) for request in requests[:4]))
+        
+        for request, result in zip(requests, asyncio.run(score_concurrently())):
+            np.testing.assert_array_equal(result, request[:, :7] * 2)
+        
+        # A failing forward pass is raised in every caller of that batch
+        backend.predict.side_effect = RuntimeError('model failed')
+        with self.assertRaises(RuntimeError):
+            batcher.predict(requests[0])
+        batcher.close()
+    
+    def test_batching_predictor_survives_cancelled_callers(self):
+        """Test that a caller cancelling its request does not stall later predictions"""
+        inference = load_source_module('inference', 'ai/inference.py')
+        backend = Mock()
+        backend.input_shape = (27,)
+        backend.predict.side_effect = lambda batch, verbose=0: batch[:, :7] * 2
+        batcher = inference.BatchingPredictor(backend, max_batch_size=64, max_wait_ms=50)
+        request = np.ones((2, 27), dtype=np.float32)
+        
+        async def cancel_one_awaiter():
+            task = asyncio.ensure_future(batcher.apredict(request))
+            await asyncio.sleep(0)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+        
+        asyncio.run(cancel_one_awaiter())
+        for _ in range(2):
+            np.testing.assert_array_equal(batcher.submit(request).result(timeout=10), request[:, :7] * 2)
+        self.assertTrue(batcher._thread.is_alive())
+        batcher.close()
+    
+    def test_exported_backends_match_keras(self):
+        """Test that TFLite and ONNX exports score like the Keras model"""
+        inference = load_source_module('inference', 'ai/inference.py')
+        convert = load_source_module('convert_models', '../tools/convert-models.py')
+        model = tf.keras.Sequential([
+            tf.keras.layers.Input(shape=(27,)),
+            tf.keras.layers.Dense(16, activation='relu'),
+            tf.keras.layers.Dense(7, activation='softmax')
+        ])
+        batch = np.random.rand(3, 27).astype(np.float32)
+        expected = model.predict(batch, verbose=0)
+        
+        backends = ['tflite']
+        if importlib.util.find_spec('onnxruntime') and importlib.util.find_spec('onnx'):
+            backends.append('onnx')
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            h5_path = os.path.join(temp_dir, 'voice_emotion_model.h5')
+            model.save(h5_path)
+            for backend in backends:
+                artifact = convert.convert_model(h5_path, [backend])[0]
+                self.assertEqual(artifact, inference.backend_model_path(h5_path, backend))
+                predictor = inference.load_predictor(artifact, backend)
+                np.testing.assert_allclose(predictor.predict(batch), expected, atol=1e-5)
+                # Batch size is dynamic after export
+                self.assertEqual(predictor.predict(batch[:1]).shape, (1, 7))
+    
+    def test_int8_quantized_model_serves_float_scores(self):
+        """Test that the calibrated int8 model loads and tracks the float model"""
+        inference = load_source_module('inference', 'ai/inference.py')
+        quantize = load_source_module('quantize_model', '../tools/quantize-model.py')
+        model = tf.keras.Sequential([
+            tf.keras.layers.Input(shape=(48, 48, 1)),
+            tf.keras.layers.Conv2D(8, (3, 3), activation='relu'),
+            tf.keras.layers.MaxPooling2D(4, 4),
+            tf.keras.layers.Flatten(),
+            tf.keras.layers.Dense(7, activation='softmax')
+        ])
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for split in ('train', 'validation'):
+                for emotion in ('happy', 'sad'):
+                    class_dir = os.path.join(temp_dir, split, emotion)
+                    os.makedirs(class_dir)
+                    for i in range(4):
+                        cv2.imwrite(os.path.join(class_dir, f'{i}.png'),
+                                    np.random.randint(0, 256, (64, 64), dtype=np.uint8))
+            
+            images, labels = quantize.load_split(os.path.join(temp_dir, 'train'))
+            self.assertEqual(images.shape, (8, 48, 48, 1))
+            self.assertEqual(sorted(set(labels)), [0, 1])
+            
+            h5_path = os.path.join(temp_dir, 'facial_emotion_model.h5')
+            model.save(h5_path)
+            int8_path = inference.backend_model_path(h5_path, 'tflite_int8')
+            with open(int8_path, 'wb') as f:
+                f.write(quantize.quantize_model(model, images))
+            
+            predictor = inference.load_predictor(int8_path, 'tflite_int8')
+            self.assertTrue(predictor.quantized)
+            scores = predictor.predict(images)
+            self.assertEqual(scores.dtype, np.float32)
+            np.testing.assert_allclose(scores, model.predict(images, verbose=0), atol=0.05)
+            
+            report = quantize.build_report(h5_path, model, int8_path, *quantize.load_split(
+                os.path.join(temp_dir, 'validation')
+            ))
+            self.assertLess(report['int8']['size_bytes'], report['float']['size_bytes'])
+            self.assertIn('accuracy_delta', report)
+    
+    def test_missing_backend_artifact_raises_instead_of_dummy(self):
+        """Test that a selected non-Keras backend without its artifact is an error"""
+        emotion_detector = load_source_module('emotion_detector', 'ai/emotion-detector.py')
+        offline_system = load_offline_system()
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            detector = emotion_detector.MultimodalEmotionDetector(
+                model_paths={'voice_emotion': os.path.join(temp_dir, 'voice_emotion_model.h5')},
+                config={'model_backends': {'voice_emotion': 'tflite_int8'}}
+            )
+            with self.assertRaises(FileNotFoundError):
+                detector._load_model('voice_emotion')
+            
+            # Only the facial model has an int8 artifact; voice stays on its own backend
+            system = offline_system.OfflineSpaceStationSystem.__new__(offline_system.OfflineSpaceStationSystem)
+            system.models_dir = temp_dir
+            system.config = {'backend': 'keras', 'model_backends': {'facial_emotion': 'tflite_int8'}}
+            self.assertEqual(system._model_path('facial_emotion'),
+                             os.path.join(temp_dir, 'facial_emotion_model.int8.tflite'))
+            self.assertEqual(system._model_path('voice_emotion'), os.path.join(temp_dir, 'voice_emotion_model.h5'))
+            with self.assertRaises(FileNotFoundError):
+                system._check_model_artifacts()
+            open(os.path.join(temp_dir, 'facial_emotion_model.int8.tflite'), 'wb').close()
+            system._check_model_artifacts()
+    
+    def test_facial_emotion_detection_batches_faces(self):
+        """Test that all detected faces are scored in one forward pass"""
+        detector = self._create_detector()
+        detector.face_cascade = Mock()
+        detector.face_cascade.detectMultiScale.return_value = np.array([
+            [0, 0, 40, 40], [50, 50, 40, 40], [10, 60, 30, 30]
+        ])
+        
+        scores = np.eye(7, dtype=np.float32)[[3, 5, 3]]
+        facial_model = Mock()
+        facial_model.predict.return_value = scores
+        detector.models = {'facial_emotion': facial_model}
+        
+        result = detector.detect_facial_emotions(self.test_image_path)
+        
+        facial_model.predict.assert_called_once()
+        batch = facial_model.predict.call_args[0][0]
+        self.assertEqual(batch.shape, (3, 48, 48, 1))
+        self.assertEqual(result['face_count'], 3)
+        self.assertEqual(result['primary_emotion'], 'happy')
+        self.assertEqual(
+            [face['primary_emotion'] for face in result['individual_faces']],
+            ['happy', 'sad', 'happy']
+        )
+        self.assertEqual(result['individual_faces'][1]['face_region'], {'x': 50, 'y': 50, 'w': 40, 'h': 40})
+    
+    def test_facial_emotion_detection_from_array(self):
+        """Test that in-memory frames are analyzed like image files"""
+        detector = self._create_detector()
+        detector.face_cascade = Mock()
+        detector.face_cascade.detectMultiScale.return_value = np.array([[20, 20, 60, 60]])
+        
+        facial_model = Mock()
+        facial_model.predict.return_value = np.eye(7, dtype=np.float32)[[4]]
+        detector.models = {'facial_emotion': facial_model}
+        
+        frame = cv2.imread(self.test_image_path)
+        from_array = detector.detect_facial_emotions_array(frame)
+        from_file = detector.detect_facial_emotions(self.test_image_path)
+        
+        self.assertEqual(from_array, from_file)
+        self.assertEqual(from_array['primary_emotion'], 'neutral')
+    
+    def test_sampled_frames_stream_forward(self):
+        """Test that the video sampler yields one frame per second without seeking"""
+        media_io = load_source_module('media_io', 'ai/media_io.py')
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            video_path = os.path.join(temp_dir, 'sampled.mp4')
+            out = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'mp4v'), 5.0, (64, 64))
+            for i in range(12):
+                out.write(np.full((64, 64, 3), i * 20, dtype=np.uint8))
+            out.release()
+            
+            with patch.object(cv2.VideoCapture, 'set') as mock_set:
+                samples = list(media_io.iter_sampled_frames(video_path))
+        
+        mock_set.assert_not_called()
+        self.assertEqual([timestamp for timestamp, _ in samples], [0.0, 1.0, 2.0])
+        self.assertEqual(samples[0][1].shape, (64, 64, 3))
+    
+    def test_audio_track_decoded_through_pipe(self):
+        """Test that video audio is decoded into memory without a shell or temp file"""
+        media_io = load_source_module('media_io', 'ai/media_io.py')
+        pcm = np.linspace(-1.0, 1.0, 8, dtype=np.float32)
+        
+        with patch.object(media_io.subprocess, 'run') as mock_run:
+            mock_run.return_value = Mock(returncode=0, stdout=pcm.tobytes(), stderr=b'')
+            audio = media_io.load_audio_track(self.test_video_path, sr=16000)
+        
+        command = mock_run.call_args[0][0]
+        self.assertIsInstance(command, list)
+        self.assertIn(self.test_video_path, command)
+        self.assertEqual(command[command.index('-ar') + 1], '16000')
+        self.assertEqual(command[-1], 'pipe:1')
+        self.assertEqual(audio.dtype, np.float32)
+        np.testing.assert_array_equal(audio, pcm)
+    
+    def test_multimodal_branches_run_concurrently(self):
+        """Test that the visual and audio branches overlap before fusion"""
+        detector = self._create_detector()
+        both_started = threading.Barrier(2, timeout=5)
+        
+        def visual_branch(video_path):
+            both_started.wait()
+            return [{'all_emotions': {emotion: 0.0 for emotion in detector.emotion_labels}}]
+        
+        def audio_branch(video_path):
+            both_started.wait()
+            return {'all_emotions': {emotion: 0.0 for emotion in detector.emotion_labels}}
+        
+        detector._analyze_video_frames = visual_branch
+        detector._analyze_video_audio = audio_branch
+        
+        result = detector.detect_multimodal_emotions(self.test_video_path)
+        
+        self.assertEqual(result['type'], 'multimodal')
+        self.assertEqual(result['frame_count'], 1)
+    
+    def _bright_square_cascade(self):
+        """Stand-in cascade that 'detects' white squares and counts the pixels it scans"""
+        cascade = Mock()
+        cascade.scanned_pixels = []
+        
+        def detect(gray, **kwargs):
+            cascade.scanned_pixels.append(gray.size)
+            contours, _ = cv2.findContours(
+                (gray > 200).astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+            )
+            return np.array([cv2.boundingRect(c) for c in contours]).reshape(-1, 4)
+        
+        cascade.detectMultiScale.side_effect = detect
+        return cascade
+    
+    def test_face_tracker_keeps_ids_between_full_detections(self):
+        """Test that tracked faces keep their IDs while full detection runs every N frames"""
+        face_tracking = load_source_module('face_tracking', 'ai/face_tracking.py')
+        cascade = self._bright_square_cascade()
+        tracker = face_tracking.FaceTracker(cascade, detect_interval=5)
+        
+        ids_per_frame = []
+        for i in range(10):
+            frame = np.zeros((240, 320), dtype=np.uint8)
+            frame[40:80, 20 + 3 * i:60 + 3 * i] = 255     # Face drifting right
+            frame[150:200, 250:300] = 255                 # Still face
+            tracked = tracker.update(frame)
+            ids_per_frame.append([face_id for face_id, _ in tracked])
+        
+        self.assertEqual(ids_per_frame, [[0, 1]] * 10)
+        self.assertEqual(tracker.full_detections, 2)
+        self.assertEqual(sorted(tracker.tracks.values()), [(47, 40, 40, 40), (250, 150, 50, 50)])
+        # Re-detection windows are a fraction of the full frame
+        self.assertLess(max(cascade.scanned_pixels[1:5]), 240 * 320 / 4)
+        
+        # A face leaving its window forces a full detection on the next frame
+        frame = np.zeros((240, 320), dtype=np.uint8)
+        frame[150:200, 250:300] = 255
+        tracker.update(frame)
+        tracker.update(frame)
+        self.assertEqual(tracker.full_detections, 3)
+    
+    def test_downscaled_detection_maps_boxes_to_full_resolution(self):
+        """Test that detection runs under the resolution cap and boxes are remapped"""
+        face_tracking = load_source_module('face_tracking', 'ai/face_tracking.py')
+        cascade = self._bright_square_cascade()
+        gray = np.zeros((2000, 3000), dtype=np.uint8)
+        gray[400:1000, 1200:1800] = 255
+        gray[1500:1900, 2500:2900] = 255
+        
+        faces = face_tracking.detect_faces(cascade, gray, max_dimension=600)
+        
+        self.assertEqual(cascade.scanned_pixels, [400 * 600])
+        self.assertEqual(cascade.detectMultiScale.call_args.kwargs['minSize'], (6, 6))
+        for (x, y, w, h), expected in zip(sorted(faces.tolist()), [(1200, 400, 600, 600), (2500, 1500, 400, 400)]):
+            np.testing.assert_allclose((x, y, w, h), expected, atol=5)
+        
+        # Images under the cap are scanned as they are
+        self.assertEqual(len(face_tracking.detect_faces(cascade, gray[:500, :500], max_dimension=600)), 0)
+        self.assertEqual(cascade.scanned_pixels[-1], 500 * 500)
+        
+        # Without an explicit cap large images are scanned at full resolution
+        face_tracking.detect_faces(cascade, gray)
+        self.assertEqual(cascade.scanned_pixels[-1], 2000 * 3000)
+    
+    def test_multimodal_result_reports_face_timelines(self):
+        """Test that tracked face IDs produce per-face emotion timelines"""
+        emotion_detector = load_source_module('emotion_detector', 'ai/emotion-detector.py')
+        detector = emotion_detector.MultimodalEmotionDetector()
+        detector.face_cascade = self._bright_square_cascade()
+        facial_model = Mock()
+        facial_model.predict.side_effect = lambda batch, verbose=0: np.tile(
+            np.eye(7, dtype=np.float32)[3], (len(batch), 1)
+        )
+        detector.models = {'facial_emotion': facial_model}
+        
+        frames = []
+        for i in range(3):
+            frame = np.zeros((240, 320, 3), dtype=np.uint8)
+            frame[40:100, 30 + 5 * i:90 + 5 * i] = 255
+            frames.append((float(i), frame))
+        
+        with patch.object(emotion_detector, 'iter_sampled_frames', return_value=iter(frames)):
+            frame_emotions = detector._analyze_video_frames(self.test_video_path)
+        result = detector._fuse_multimodal_results(frame_emotions, {})
+        
+        self.assertEqual(list(result['face_timelines']), ['0'])
+        self.assertEqual([entry['timestamp'] for entry in result['face_timelines']['0']], [0.0, 1.0, 2.0])
+        self.assertEqual(result['face_timelines']['0'][0]['primary_emotion'], 'happy')
+        # Unchanged by the JSON round trip of the disk cache
+        self.assertEqual(json.loads(json.dumps(result['face_timelines'])), result['face_timelines'])
+    
+    def test_offline_multimodal_result_reports_face_timelines(self):
+        """Test that the offline system tracks faces across video frames too"""
+        offline_system = load_offline_system()
+        system = offline_system.OfflineSpaceStationSystem.__new__(offline_system.OfflineSpaceStationSystem)
+        system.config = {'face_tracking': True, 'face_detect_interval': 5, 'detection_max_dimension': None}
+        system.instrumentation = offline_system.PipelineInstrumentation('offline', enabled=False)
+        system.face_cascade = self._bright_square_cascade()
+        system.facial_model = Mock()
+        system.facial_model.predict.side_effect = lambda batch, verbose=0: np.tile(
+            np.eye(7, dtype=np.float32)[3], (len(batch), 1)
+        )
+        
+        frames = []
+        for i in range(3):
+            frame = np.zeros((240, 320, 3), dtype=np.uint8)
+            frame[40:100, 30 + 5 * i:90 + 5 * i] = 255
+            frame[140:200, 200:260] = 255
+            frames.append((float(i), frame))
+        
+        with patch.object(offline_system, 'iter_sampled_frames', return_value=iter(frames)):
+            frame_emotions = system._analyze_video_frames(self.test_video_path)
+        result = system._fuse_multimodal_results(frame_emotions, {})
+        
+        self.assertEqual(sorted(result['face_timelines']), ['0', '1'])
+        self.assertEqual([entry['timestamp'] for entry in result['face_timelines']['1']], [0.0, 1.0, 2.0])
+        self.assertEqual(result['face_timelines']['0'][0]['primary_emotion'], 'happy')
+        # Both faces of a frame are scored in one forward pass
+        self.assertEqual([call.args[0].shape[0] for call in system.facial_model.predict.call_args_list], [2, 2, 2])
+    
+    def test_streaming_voice_analysis_emits_window_timeline(self):
+        """Test that long recordings are analyzed window by window with a weighted summary"""
+        import soundfile as sf
+        detector = self._create_detector()
+        voice_model = Mock()
+        voice_model.predict.side_effect = [
+            np.eye(7, dtype=np.float32)[[3]], np.eye(7, dtype=np.float32)[[3]], np.eye(7, dtype=np.float32)[[5]]
+        ]
+        detector.models = {'voice_emotion': voice_model}
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            audio_path = os.path.join(temp_dir, 'debrief.wav')
+            t = np.arange(12 * 44100) / 44100
+            sf.write(audio_path, 0.5 * np.sin(2 * np.pi * 220 * t), 44100)
+            
+            result = detector.detect_voice_emotions_streaming(audio_path, window_seconds=5.0)
+        
+        self.assertEqual(result['type'], 'voice_stream')
+        self.assertEqual([window['start'] for window in result['timeline']], [0.0, 5.0, 10.0])
+        self.assertAlmostEqual(result['timeline'][-1]['end'], 12.0)
+        self.assertEqual([window['primary_emotion'] for window in result['timeline']], ['happy', 'happy', 'sad'])
+        # Each window is resampled to the model rate and scored on its own
+        self.assertEqual(voice_model.predict.call_args.args[0].shape, (1, 27))
+        self.assertAlmostEqual(result['all_emotions']['happy'], 10 / 12, places=5)
+        self.assertAlmostEqual(result['emotion_distribution']['happy'], 2 / 3)
+        self.assertEqual(result['primary_emotion'], 'happy')
+    
+    def test_audio_windows_reject_invalid_hop(self):
+        """Test that a hop outside (0, window] is an error rather than silently adjusted"""
+        media_io = load_source_module('media_io', 'ai/media_io.py')
+        for hop_seconds in (0, -1.0, 6.0):
+            with self.assertRaises(ValueError):
+                media_io.iter_audio_windows(self.test_audio_path, window_seconds=5.0, hop_seconds=hop_seconds)
+    
+    def test_audio_windows_fall_back_to_ffmpeg(self):
+        """Test that formats libsndfile cannot read are windowed from ffmpeg's output like files it can"""
+        import io
+        import soundfile as sf
+        media_io = load_source_module('media_io', 'ai/media_io.py')
+        audio = np.sin(np.arange(1200) / 7).astype(np.float32)
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            wav_path = os.path.join(temp_dir, 'debrief.wav')
+            sf.write(wav_path, audio, 100, subtype='FLOAT')
+            expected = list(media_io.iter_audio_windows(wav_path, sr=100, window_seconds=5.0, hop_seconds=3.0))
+            
+            m4a_path = os.path.join(temp_dir, 'debrief.m4a')
+            with open(m4a_path, 'wb') as f:
+                f.write(b'not a libsndfile format')
+            process = Mock(stdout=io.BytesIO(audio.tobytes()), stderr=io.BytesIO(b''))
+            process.poll.return_value = 0
+            process.wait.return_value = 0
+            with patch.object(media_io.subprocess, 'Popen', return_value=process) as mock_popen:
+                windows = list(media_io.iter_audio_windows(m4a_path, sr=100, window_seconds=5.0, hop_seconds=3.0))
+        
+        self.assertIn(m4a_path, mock_popen.call_args.args[0])
+        self.assertEqual([start for start, _ in windows], [start for start, _ in expected])
+        self.assertEqual([start for start, _ in windows], [0.0, 3.0, 6.0, 9.0])
+        for (_, window), (_, expected_window) in zip(windows, expected):
+            np.testing.assert_allclose(window, expected_window)
+    
+    def test_result_cache_tiers_and_eviction(self):
+        """Test the memory LRU, the size-bounded disk tier and the counters"""
+        result_cache = load_source_module('result_cache', 'ai/result_cache.py')
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_dir = os.path.join(temp_dir, 'cache')
+            cache = result_cache.ResultCache(max_entries=2, disk_dir=cache_dir, max_disk_bytes=250)
+            key = cache.key_for_file(self.test_image_path, 'facial', 'keras:dummy')
+            self.assertNotEqual(key, cache.key_for_file(self.test_image_path, 'voice', 'keras:dummy'))
+            self.assertNotEqual(key, cache.key_for_file(self.test_image_path, 'facial', 'onnx:dummy'))
+            
+            self.assertIsNone(cache.get(key))
+            cache.put(key, {'primary_emotion': 'happy', 'confidence': 0.9})
+            cached = cache.get(key)
+            cached['primary_emotion'] = 'sad'
+            self.assertEqual(cache.get(key)['primary_emotion'], 'happy')
+            
+            # Memory tier keeps the two most recent entries
+            for i in range(3):
+                cache.put(f'key-{i}', {'padding': 'x' * 50, 'index': i})
+            self.assertEqual(cache.stats()['memory_entries'], 2)
+            self.assertLessEqual(cache.stats()['disk_bytes'], 250)
+            
+            # A new process sees entries through the disk tier
+            reopened = result_cache.ResultCache(max_entries=2, disk_dir=cache_dir, max_disk_bytes=250)
+            self.assertEqual(reopened.get('key-2'), {'padding': 'x' * 50, 'index': 2})
+            self.assertEqual(reopened.stats()['disk_hits'], 1)
+            self.assertEqual(cache.stats()['misses'], 1)
+            self.assertEqual(cache.stats()['memory_hits'], 2)
+    
+    def test_facial_results_cached_by_content(self):
+        """Test that re-submitted images skip inference until their bytes change"""
+        detector = self._create_detector()
+        detector.face_cascade = Mock()
+        detector.face_cascade.detectMultiScale.return_value = np.array([[10, 10, 60, 60]])
+        facial_model = Mock()
+        facial_model.predict.return_value = np.eye(7, dtype=np.float32)[[3]]
+        detector.models = {'facial_emotion': facial_model}
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # Without a model file the model is a dummy and nothing is cached
+            detector.model_paths['facial_emotion'] = os.path.join(temp_dir, 'facial_emotion_model.h5')
+            detector.detect_facial_emotions(self.test_image_path)
+            detector.detect_facial_emotions(self.test_image_path)
+            self.assertEqual(facial_model.predict.call_count, 2)
+            self.assertEqual(detector.result_cache.stats()['memory_entries'], 0)
+            
+            open(detector.model_paths['facial_emotion'], 'wb').close()
+            first = detector.detect_facial_emotions(self.test_image_path)
+            second = detector.detect_facial_emotions(self.test_image_path)
+            
+            self.assertEqual(first, second)
+            self.assertEqual(facial_model.predict.call_count, 3)
+            
+            cv2.imwrite(self.test_image_path, np.full((100, 100, 3), 128, dtype=np.uint8))
+            detector.detect_facial_emotions(self.test_image_path)
+            self.assertEqual(facial_model.predict.call_count, 4)
+            self.assertEqual(detector.result_cache.stats()['memory_hits'], 1)
+            
+            # A model file that fails to load falls back to a dummy, also uncached
+            detector.dummy_models.add('facial_emotion')
+            detector.detect_facial_emotions(self.test_image_path)
+            self.assertEqual(facial_model.predict.call_count, 5)
+    
+    def test_stage_timings_reported_and_exported(self):
+        """Test that instrumented analyses carry per-stage timings and feed the histograms"""
+        emotion_detector = load_source_module('emotion_detector', 'ai/emotion-detector.py')
+        detector = emotion_detector.MultimodalEmotionDetector(
+            config={'instrumentation': True, 'result_cache_entries': 0}
+        )
+        detector.face_cascade = Mock()
+        detector.face_cascade.detectMultiScale.return_value = np.array([[10, 10, 60, 60]])
+        facial_model = Mock()
+        facial_model.predict.return_value = np.eye(7, dtype=np.float32)[[3]]
+        detector.models = {'facial_emotion': facial_model}
+        
+        result = detector.detect_facial_emotions(self.test_image_path)
+        
+        self.assertEqual(
+            set(result['timings']),
+            {'cache_lookup', 'image_decode', 'preprocessing', 'face_detection', 'inference', 'total'}
+        )
+        self.assertGreaterEqual(result['timings']['total'], result['timings']['inference'])
+        
+        # The nested array analysis adds to the outer block instead of starting its own
+        stages = detector.instrumentation.summary()['stages']
+        self.assertEqual(stages['total']['count'], 1)
+        self.assertEqual(stages['inference']['count'], 1)
+        prometheus = detector.instrumentation.to_prometheus()
+        self.assertIn('emotion_pipeline_stage_seconds_count{pipeline="detector",stage="inference"} 1', prometheus)
+        
+        # Disabled instrumentation leaves results untouched
+        detector = emotion_detector.MultimodalEmotionDetector(config={'result_cache_entries': 0})
+        detector.face_cascade = Mock()
+        detector.face_cascade.detectMultiScale.return_value = np.array([[10, 10, 60, 60]])
+        detector.models = {'facial_emotion': facial_model}
+        self.assertNotIn('timings', detector.detect_facial_emotions(self.test_image_path))
+        
+    def test_batch_mode_writes_json_lines_and_resumes(self):
+        """Test that batch runs append one record per file and skip finished files"""
+        emotion_detector = load_source_module('emotion_detector', 'ai/emotion-detector.py')
+        analysis = {'emotion_analysis': {'primary_emotion': 'happy'}, 'stress_analysis': {}}
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for name in ('a.jpg', 'b.wav', 'notes.txt'):
+                open(os.path.join(temp_dir, name), 'wb').close()
+            output_path = os.path.join(temp_dir, 'results.jsonl')
+            
+            files = emotion_detector.collect_media_files(temp_dir)
+            self.assertEqual([os.path.basename(path) for path in files], ['a.jpg', 'b.wav'])
+            
+            with patch.object(emotion_detector.MultimodalEmotionDetector, 'analyze_file',
+                              return_value=analysis) as mock_analyze:
+                summary = emotion_detector.run_batch(files[:1], output_path, workers=0)
+                # Simulate a run interrupted in the middle of writing a record
+                with open(output_path, 'a') as f:
+                    f.write('{"file": "b.w')
+                resumed = emotion_detector.run_batch(files, output_path, workers=0)
+            
+            self.assertEqual(summary['processed'], 1)
+            self.assertEqual((resumed['skipped'], resumed['processed']), (1, 1))
+            self.assertEqual([call.args for call in mock_analyze.call_args_list],
+                             [(files[0], 'facial'), (files[1], 'voice')])
+            self.assertIn('files_per_second', resumed)
+            self.assertEqual(emotion_detector.read_completed_files(output_path), set(files))
+    
+    def test_batch_mode_counts_corrupt_files_as_failed(self):
+        """Test that files the detector cannot read are failed and retried on resume"""
+        emotion_detector = load_source_module('emotion_detector', 'ai/emotion-detector.py')
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            bad_path = os.path.join(temp_dir, 'bad.jpg')
+            with open(bad_path, 'wb') as f:
+                f.write(b'not a jpeg')
+            output_path = os.path.join(temp_dir, 'results.jsonl')
+            
+            summary = emotion_detector.run_batch([bad_path], output_path, workers=0,
+                                                 config={'result_cache_entries': 0})
+            with open(output_path) as f:
+                record = json.loads(f.readline())
+            
+            self.assertEqual((summary['processed'], summary['failed']), (1, 1))
+            self.assertTrue(record['emotion_analysis']['error'])
+            self.assertIn('error', record)
+            self.assertEqual(emotion_detector.read_completed_files(output_path), set())
+    
+    def test_shared_audio_features_match_librosa(self):
+        """Test that the single-STFT feature engine matches per-feature librosa calls"""
+        audio_features = load_source_module('audio_features', 'ai/audio_features.py')
+        y, sr = librosa.load(self.test_audio_path, sr=22050)
+        
+        features, characteristics = audio_features.extract_voice_features(y, sr)
+        
+        expected = np.concatenate([
+            np.mean(librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13), axis=1),
+            [np.mean(librosa.feature.spectral_centroid(y=y, sr=sr))],
+            [np.mean(librosa.feature.zero_crossing_rate(y))],
+            np.mean(librosa.feature.chroma_stft(y=y, sr=sr), axis=1)
+        ])
+        self.assertEqual(features.shape, (27,))
+        np.testing.assert_allclose(features, expected, rtol=1e-5)
+        self.assertAlmostEqual(characteristics['speaking_rate'], len(y) / sr)
+        self.assertGreater(characteristics['average_pitch'], 0)
+    
+    def test_vectorized_pitch_matches_frame_loop(self):
+        """Test that vectorized pitch extraction matches the per-frame loop"""
+        audio_features = load_source_module('audio_features', 'ai/audio_features.py')
+        y, sr = librosa.load(self.test_audio_path, sr=22050)
+        
+        pitches, magnitudes = librosa.piptrack(y=y, sr=sr)
+        pitch_values = []
+        for t in range(pitches.shape[1]):
+            pitch = pitches[magnitudes[:, t].argmax(), t]
+            if pitch > 0:
+                pitch_values.append(pitch)
+        
+        characteristics = audio_features.analyze_voice_characteristics(
+            y, sr, return_pitch_contour=True
+        )
+        
+        self.assertEqual(characteristics['average_pitch'], float(np.mean(pitch_values)))
+        contour = characteristics['pitch_contour']
+        self.assertEqual(contour.dtype, np.float32)
+        self.assertEqual(contour.shape, (pitches.shape[1],))
+        np.testing.assert_array_equal(contour[contour > 0], pitch_values)
+        self.assertNotIn('pitch_contour', audio_features.analyze_voice_characteristics(y, sr))
 
 class TestAICompanion(unittest.TestCase):
     """Test cases for the AI companion system"""
@@ -326,6 +1047,178 @@ class TestAICompanion(unittest.TestCase):
             self.assertIn(intervention, result['recommendations'][0]['type'])
             self.assertIn('action', result['recommendations'][0])
             self.assertIn('duration', result['recommendations'][0])
+    
+    def test_message_keywords_match_whole_words(self):
+        """Test that emotion and urgency keywords only match as whole words"""
+        ai_companion = load_source_module('ai_companion', 'ai/ai-companion.py')
+        companion = ai_companion.AISpaceCompanion()
+        
+        analysis = companion._analyze_message_emotion("I feel DOWN and blue, I can't sleep!")
+        self.assertEqual(analysis['primary_emotion'], 'sadness')
+        self.assertAlmostEqual(analysis['emotion_scores']['sadness'], 2 / 6)
+        self.assertTrue(analysis['urgency'])
+        
+        # Keywords inside longer words are not hits
+        analysis = companion._analyze_message_emotion("Download made, hardware helpful")
+        self.assertEqual(analysis['primary_emotion'], 'neutral')
+        self.assertEqual(analysis['emotion_scores'], {})
+        self.assertFalse(analysis['urgency'])
+    
+    def test_conversation_history_bounded_per_crew(self):
+        """Test that each crew member keeps only their latest conversations, in order"""
+        ai_companion = load_source_module('ai_companion', 'ai/ai-companion.py')
+        companion = ai_companion.AISpaceCompanion()
+        
+        for i in range(250):
+            companion.process_message(f"Status report {i}", 'alpha' if i % 5 else 'bravo')
+        
+        alpha = companion.get_conversation_history('alpha')
+        self.assertEqual(len(alpha), ai_companion.MAX_CONVERSATIONS_PER_CREW)
+        self.assertEqual(alpha[-1]['user_message'], "Status report 249")
+        self.assertEqual(len(companion.get_conversation_history('bravo')), 50)
+        
+        latest = companion.get_conversation_history('alpha', limit=2)
+        self.assertEqual([c['user_message'] for c in latest], ["Status report 248", "Status report 249"])
+        self.assertEqual(companion.get_conversation_history('charlie'), [])
+    
+    def test_conversations_persisted_and_rehydrated(self):
+        """Test that conversations and context are written behind and read back lazily"""
+        ai_companion = load_source_module('ai_companion', 'ai/ai-companion.py')
+        conversation_store = load_source_module('conversation_store', 'ai/conversation_store.py')
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        db_path = os.path.join(temp_dir.name, 'companion.db')
+        
+        store = conversation_store.ConversationStore(db_path, flush_interval=60, max_batch=1000)
+        companion = ai_companion.AISpaceCompanion(conversation_store=store)
+        for i in range(5):
+            companion.process_message(f"I'm worried about docking {i}", 7)
+        self.assertEqual(store.batches_written, 0)
+        self.assertTrue(store.flush(timeout=10))
+        self.assertEqual(store.batches_written, 1)
+        companion.process_message("Feeling happy now", 7)
+        store.close()
+        self.assertEqual(store.conversations_written, 6)
+        
+        # A new companion only reads a crew member's state when first asked for it
+        restarted = ai_companion.AISpaceCompanion(
+            conversation_store=conversation_store.ConversationStore(db_path)
+        )
+        self.assertEqual(restarted.crew_context, {})
+        history = restarted.get_conversation_history(7)
+        self.assertEqual([c['user_message'] for c in history][-2:], ["I'm worried about docking 4", "Feeling happy now"])
+        summary = restarted.get_crew_psychological_summary(7)
+        self.assertEqual(summary['conversation_count'], 6)
+        self.assertEqual(summary['psychological_profile'], 'high_stress')
+        restarted.conversation_store.close()
+    
+    def test_failed_rehydration_retried(self):
+        """Test that a crew member whose state failed to load is read again on next access"""
+        ai_companion = load_source_module('ai_companion', 'ai/ai-companion.py')
+        store = Mock()
+        conversation = {'crew_member_id': 7, 'user_message': "Hello", 'ai_response': "Hi"}
+        store.load_crew.side_effect = [RuntimeError('database locked'), (None, [conversation])]
+        companion = ai_companion.AISpaceCompanion(conversation_store=store)
+        
+        with self.assertRaises(RuntimeError):
+            companion.get_conversation_history(7)
+        self.assertEqual(companion.get_conversation_history(7), [conversation])
+        self.assertEqual(store.load_crew.call_count, 2)
+    
+    def test_conversation_store_survives_write_errors(self):
+        """Test that a failing write neither stops the writer nor hangs flush and close"""
+        conversation_store = load_source_module('conversation_store', 'ai/conversation_store.py')
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        store = conversation_store.ConversationStore(os.path.join(temp_dir.name, 'companion.db'), flush_interval=60)
+        
+        with patch.object(store, '_write', side_effect=RuntimeError('disk failed')):
+            store.record_context(7, {'conversation_count': 1})
+            self.assertTrue(store.flush(timeout=10))
+        store.record_context(7, {'conversation_count': 2})
+        self.assertTrue(store.flush(timeout=10))
+        self.assertEqual(store.batches_written, 1)
+        self.assertEqual(store.load_crew(7, 10)[0], {'conversation_count': 2})
+        
+        # If the writer thread does end, flush and close return instead of waiting on it
+        with patch.object(store, '_should_write', side_effect=RuntimeError('writer bug')):
+            store.record_context(7, {'conversation_count': 3})
+            store._writer.join(timeout=10)
+        self.assertFalse(store._writer.is_alive())
+        self.assertFalse(store.flush())
+        store.close()
+    
+    def test_concurrent_messages_consistent(self):
+        """Test that threads and asyncio tasks sharing a companion lose no updates"""
+        ai_companion = load_source_module('ai_companion', 'ai/ai-companion.py')
+        companion = ai_companion.AISpaceCompanion()
+        
+        def send(worker):
+            for i in range(60):
+                companion.process_message(f"I'm worried [{worker}:{i}]", f'crew-{i % 3}')
+        
+        workers = [threading.Thread(target=send, args=(worker,)) for worker in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        
+        for crew_member_id in ('crew-0', 'crew-1', 'crew-2'):
+            self.assertEqual(companion.crew_context[crew_member_id]['conversation_count'], 80)
+            history = companion.get_conversation_history(crew_member_id)
+            self.assertEqual(len(history), 80)
+            for worker in range(4):
+                sent = [c['user_message'] for c in history if f'[{worker}:' in c['user_message']]
+                self.assertEqual(sent, [f"I'm worried [{worker}:{i}]" for i in range(60) if i % 3 == int(crew_member_id[-1])])
+        
+        async def send_async():
+            return await asyncio.gather(*(companion.aprocess_message("Feeling happy", 'crew-async') for _ in range(20)))
+        
+        results = asyncio.run(send_async())
+        self.assertEqual(len(results), 20)
+        self.assertEqual(companion.crew_context['crew-async']['conversation_count'], 20)
+        self.assertEqual(companion.get_crew_psychological_summary('crew-async')['dominant_emotions'], [('happiness', 10)])
+    
+    def test_process_messages_matches_per_message(self):
+        """Test that a message batch gives the same results as processing messages one by one"""
+        ai_companion = load_source_module('ai_companion', 'ai/ai-companion.py')
+        
+        texts = ["I CAN'T sleep, I'm exhausted", "'can't' xcan't can'tx", "Download made, hardware helpful",
+                 "Café: sad, hopeless — can't", "", "_sad sad_ SAD sad2", "Feeling happy and pleased today"]
+        batch = [(f'crew-{i % 3}', texts[i % len(texts)], {'mission_phase': 'docking'} if i == 40 else None)
+                 for i in range(300)]
+        one_by_one = ai_companion.AISpaceCompanion()
+        expected = [one_by_one.process_message(message, crew_member_id, context)
+                    for crew_member_id, message, context in batch]
+        batched = ai_companion.AISpaceCompanion()
+        results = batched.process_messages(batch)
+        
+        templates = [template for group in batched.support_templates.values() for template in group]
+        
+        def without_template(response):
+            return next((response[len(t):] for t in templates if response.startswith(t)), response)
+        
+        self.assertEqual(len(results), len(batch))
+        for one, result, (crew_member_id, _, _) in zip(expected, results, batch):
+            self.assertEqual(result['crew_member_id'], crew_member_id)
+            for key in ('recommendations', 'emotional_support', 'intervention_needed'):
+                self.assertEqual(result[key], one[key])
+            # Only the randomly chosen template sentence may differ
+            self.assertEqual(without_template(result['response']), without_template(one['response']))
+        
+        for crew_member_id, context in one_by_one.crew_context.items():
+            self.assertEqual({**batched.crew_context[crew_member_id], 'last_interaction': None},
+                             {**context, 'last_interaction': None})
+            self.assertEqual([c['emotional_analysis'] for c in batched.get_conversation_history(crew_member_id)],
+                             [c['emotional_analysis'] for c in one_by_one.get_conversation_history(crew_member_id)])
+        self.assertEqual(batched.crew_context['crew-1']['mission_phase'], 'docking')
+        self.assertEqual(batched.process_messages([]), [])
+        
+        # Results with the same plan do not share recommendation entries
+        results[0]['recommendations'][-1]['technique']['steps'].append('edited')
+        results[0]['recommendations'][-1]['priority'] = 'edited'
+        self.assertEqual(results[len(texts)]['recommendations'], expected[len(texts)]['recommendations'])
+        self.assertNotIn('edited', batched.intervention_strategies['mindfulness_meditation']['steps'])
 
 class TestOfflineSystem(unittest.TestCase):
     """Test cases for the offline standalone system"""
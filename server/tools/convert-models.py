@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Export Keras .h5 emotion models to lightweight CPU inference formats
+
+Converted files are written next to their source with the extension the
+inference backends look for (facial_emotion_model.h5 ->
+facial_emotion_model.tflite / facial_emotion_model.onnx), so selecting a
+backend with EMOTION_MODEL_BACKEND=tflite|onnx picks them up directly.
+
+Usage:
+    python tools/convert-models.py <model.h5 | models_dir> [...] [--format tflite|onnx|all]
+"""
+
+import argparse
+import glob
+import logging
+import os
+import sys
+
+import tensorflow as tf
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'ai'))
+from inference import backend_model_path
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def export_tflite(model, output_path):
+    """Convert a Keras model to a float32 TFLite flatbuffer"""
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+
+
+def export_onnx(model, output_path):
+    """Convert a Keras model to ONNX with a dynamic batch dimension"""
+    input_shape = (None,) + tuple(model.input_shape[1:])
+    try:
+        # Keras 3 ships its own ONNX exporter, which needs a model that has been called
+        model(tf.zeros((1,) + input_shape[1:]), training=False)
+        model.export(output_path, format='onnx')
+    except TypeError:
+        # Keras 2 (TensorFlow 2.15) goes through tf2onnx
+        import tf2onnx
+        input_signature = [tf.TensorSpec(input_shape, tf.float32, name='input')]
+        tf2onnx.convert.from_keras(model, input_signature=input_signature, opset=13, output_path=output_path)
+
+
+EXPORTERS = {
+    'tflite': export_tflite,
+    'onnx': export_onnx
+}
+
+
+def convert_model(model_path, formats):
+    """
+    Convert one .h5 model to each requested format
+
+    Returns:
+        List of written file paths
+    """
+    model = tf.keras.models.load_model(model_path, compile=False)
+    written = []
+    for backend in formats:
+        output_path = backend_model_path(model_path, backend)
+        EXPORTERS[backend](model, output_path)
+        logger.info(f"Exported {model_path} -> {output_path}")
+        written.append(output_path)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('paths', nargs='+', help='.h5 model files or directories containing them')
+    parser.add_argument('--format', choices=['tflite', 'onnx', 'all'], default='all')
+    args = parser.parse_args()
+
+    formats = list(EXPORTERS) if args.format == 'all' else [args.format]
+
+    model_paths = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            model_paths.extend(sorted(glob.glob(os.path.join(path, '*.h5'))))
+        else:
+            model_paths.append(path)
+
+    if not model_paths:
+        logger.error("No .h5 models found")
+        sys.exit(1)
+
+    for model_path in model_paths:
+        convert_model(model_path, formats)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Post-training int8 quantization of the facial emotion CNN
+
+Calibrates on a sample of the 48x48 grayscale training images, writes a fully
+int8 TFLite model next to the source (facial_emotion_model.h5 ->
+facial_emotion_model.int8.tflite) and reports accuracy, size and latency of
+the float and int8 models on the held-out validation split. The quantized
+model is served with EMOTION_MODEL_BACKEND=tflite_int8.
+
+The dataset uses the layout of moodtracker/basic_model.ipynb:
+data_dir/train/<emotion>/*.jpg and data_dir/validation/<emotion>/*.jpg
+
+Usage:
+    python tools/quantize-model.py <model.h5> <data_dir> [--calibration-samples N] [--eval-samples N]
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+import tensorflow as tf
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'ai'))
+from inference import CompiledPredictor, TFLitePredictor, backend_model_path
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def load_split(split_dir, limit=None, seed=0):
+    """
+    Load a random sample of 48x48 grayscale images from one dataset split
+
+    Classes are indexed in sorted directory order, the same as
+    flow_from_directory during training.
+
+    Returns:
+        (images, labels) with images scaled to [0, 1] and shaped (N, 48, 48, 1)
+    """
+    class_names = sorted(
+        name for name in os.listdir(split_dir) if os.path.isdir(os.path.join(split_dir, name))
+    )
+    samples = []
+    for label, class_name in enumerate(class_names):
+        class_dir = os.path.join(split_dir, class_name)
+        for file_name in sorted(os.listdir(class_dir)):
+            if file_name.lower().endswith(IMAGE_EXTENSIONS):
+                samples.append((os.path.join(class_dir, file_name), label))
+
+    rng = np.random.default_rng(seed)
+    rng.shuffle(samples)
+    if limit:
+        samples = samples[:limit]
+
+    images = np.empty((len(samples), 48, 48, 1), dtype=np.float32)
+    labels = np.empty(len(samples), dtype=np.int64)
+    for i, (path, label) in enumerate(samples):
+        image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        images[i, :, :, 0] = cv2.resize(image, (48, 48)).astype(np.float32) / 255.0
+        labels[i] = label
+    return images, labels
+
+
+def quantize_model(model, calibration_images):
+    """
+    Convert a Keras model to a fully int8 TFLite flatbuffer
+
+    Args:
+        model: Float Keras model
+        calibration_images: Representative inputs used to pick activation ranges
+
+    Returns:
+        Serialized TFLite model
+    """
+    def representative_dataset():
+        for image in calibration_images:
+            yield [image[np.newaxis]]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.int8
+    converter.inference_output_type = tf.int8
+    return converter.convert()
+
+
+def evaluate(predictor, images, labels, latency_calls=100):
+    """Return accuracy, predictions and p50 single-image latency (ms)"""
+    predictions = np.concatenate([
+        predictor.predict(images[start:start + 64]).argmax(axis=1)
+        for start in range(0, len(images), 64)
+    ])
+
+    sample = images[:1]
+    predictor.predict(sample)
+    timings = []
+    for _ in range(latency_calls):
+        start = time.perf_counter()
+        predictor.predict(sample)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return float(np.mean(predictions == labels)), predictions, float(np.percentile(timings, 50))
+
+
+def build_report(model_path, model, int8_path, images, labels):
+    """Compare the float and int8 models on held-out images"""
+    float_accuracy, float_predictions, float_latency = evaluate(CompiledPredictor(model), images, labels)
+    int8_accuracy, int8_predictions, int8_latency = evaluate(TFLitePredictor(int8_path), images, labels)
+
+    float_size = os.path.getsize(model_path)
+    int8_size = os.path.getsize(int8_path)
+    return {
+        'eval_samples': int(len(labels)),
+        'float': {'accuracy': float_accuracy, 'size_bytes': float_size, 'p50_latency_ms': float_latency},
+        'int8': {'accuracy': int8_accuracy, 'size_bytes': int8_size, 'p50_latency_ms': int8_latency},
+        'accuracy_delta': int8_accuracy - float_accuracy,
+        'prediction_agreement': float(np.mean(float_predictions == int8_predictions)),
+        'size_ratio': int8_size / float_size,
+        'latency_speedup': float_latency / int8_latency
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('model_path', help='float .h5 facial emotion model')
+    parser.add_argument('data_dir', help='dataset root with train/ and validation/ splits')
+    parser.add_argument('--calibration-samples', type=int, default=500, help='training images used for calibration')
+    parser.add_argument('--eval-samples', type=int, default=2000, help='validation images used for the report')
+    parser.add_argument('--seed', type=int, default=0, help='sampling seed, fixed for reproducible artifacts')
+    args = parser.parse_args()
+
+    model = tf.keras.models.load_model(args.model_path, compile=False)
+    calibration_images, _ = load_split(
+        os.path.join(args.data_dir, 'train'), args.calibration_samples, args.seed
+    )
+
+    int8_path = backend_model_path(args.model_path, 'tflite_int8')
+    with open(int8_path, 'wb') as f:
+        f.write(quantize_model(model, calibration_images))
+    logger.info(f"Calibrated on {len(calibration_images)} images, wrote {int8_path}")
+
+    images, labels = load_split(os.path.join(args.data_dir, 'validation'), args.eval_samples, args.seed)
+    report = build_report(args.model_path, model, int8_path, images, labels)
+
+    report_path = os.path.splitext(int8_path)[0] + '.json'
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()